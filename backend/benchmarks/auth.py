@@ -0,0 +1,59 @@
+"""Micro-benchmark of the steps of authenticating workers.
+
+Compares verifying a signed message with and without parsing the public key
+first, as done by /auth/authenticate with and without the public key cache,
+and decoding an access token, as done by every authenticated request.
+
+Usage (POSTGRES_URI and JWT_SECRET must be set, no database is needed):
+
+    python benchmarks/auth.py [--number 1000]
+"""
+
+import argparse
+import timeit
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from mirrors_qa_backend.cryptography import (
+    load_public_key,
+    serialize_public_key,
+    sign_message,
+    verify_message_signature,
+    verify_signed_message,
+)
+from mirrors_qa_backend.settings.api import APISettings
+from mirrors_qa_backend.tokens import generate_access_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key_data = serialize_public_key(private_key.public_key())
+    public_key = load_public_key(public_key_data)
+    message = b"worker:2024-06-01T12:00:00+00:00"
+    signature = sign_message(private_key, message)
+    access_token = generate_access_token("worker")
+
+    benchmarks = {
+        "load public key": lambda: load_public_key(public_key_data),
+        "verify signature (uncached key)": lambda: verify_signed_message(
+            public_key_data, signature, message
+        ),
+        "verify signature (cached key)": lambda: verify_message_signature(
+            public_key, signature, message
+        ),
+        "decode access token": lambda: jwt.decode(
+            access_token, APISettings.JWT_SECRET, algorithms=["HS256"]
+        ),
+    }
+    for name, func in benchmarks.items():
+        seconds = timeit.timeit(func, number=args.number)
+        print(f"{name:<35} {seconds / args.number * 1e6:>10.1f} µs/op")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
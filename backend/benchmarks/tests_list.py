@@ -0,0 +1,80 @@
+"""Micro-benchmark of the serialization of listings of tests.
+
+Compares building a model for each listed test and serializing the whole
+listing with pydantic, as GET /tests used to, with encoding the rows of the
+listed tests straight to JSON, as done by GET /tests.
+
+Usage (POSTGRES_URI and JWT_SECRET must be set, no database is needed):
+
+    python benchmarks/tests_list.py [--number 100]
+"""
+
+import argparse
+import datetime
+import timeit
+import uuid
+from ipaddress import IPv4Address
+
+from mirrors_qa_backend import schemas
+from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.serializer import serialize_tests_list
+
+
+def get_rows(nb_rows: int) -> list[tuple]:
+    """Rows of LISTED_TEST_COLUMNS of succeeded tests"""
+    requested_on = datetime.datetime(2024, 6, 1, 12, 0, 0)
+    return [
+        (
+            requested_on + datetime.timedelta(minutes=1, microseconds=index),
+            None,
+            "Some ISP",
+            IPv4Address("192.0.2.1"),
+            "AS1234",
+            "Lagos",
+            120.5,
+            1_000_000,
+            2.5,
+            400_000.0,
+            StatusEnum.SUCCEEDED,
+            uuid.uuid4(),
+            requested_on,
+            "ng",
+            "https://mirror.example.org/kiwix/",
+            "worker",
+        )
+        for index in range(nb_rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100)
+    args = parser.parse_args()
+
+    fields = list(schemas.Test.model_fields)
+    for nb_rows in (20, 500, 5000):
+        rows = get_rows(nb_rows)
+        metadata = schemas.calculate_pagination_metadata(
+            nb_rows, page_size=nb_rows, current_page=1
+        )
+        benchmarks = {
+            "pydantic models": lambda rows=rows, metadata=metadata: schemas.TestsList(
+                tests=[
+                    schemas.Test(**dict(zip(fields, row, strict=False))) for row in rows
+                ],
+                metadata=metadata,
+            ).model_dump_json(),
+            "rows to JSON": lambda rows=rows, metadata=metadata: serialize_tests_list(
+                rows, metadata
+            ),
+        }
+        for name, func in benchmarks.items():
+            seconds = timeit.timeit(func, number=args.number)
+            print(  # noqa: T201
+                f"{nb_rows:>5} rows, {name:<20} "
+                f"{seconds / args.number * 1e3:>10.3f} ms/op"
+            )
+
+
+if __name__ == "__main__":
+    main()
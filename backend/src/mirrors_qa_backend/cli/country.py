@@ -3,6 +3,7 @@ import csv
 from mirrors_qa_backend import logger
 from mirrors_qa_backend.db import Session
 from mirrors_qa_backend.db.country import create_country
+from mirrors_qa_backend.db.country_cache import invalidate_country_cache
 from mirrors_qa_backend.db.region import create_region
 from mirrors_qa_backend.schemas import Country, Region
 
@@ -24,6 +25,8 @@ def create_regions_and_countries(countries: list[Country]) -> None:
                 )
                 db_country.region = db_region
                 session.add(db_country)
+        # Reload the countries and regions with the ones just created
+        invalidate_country_cache(session)
 
 
 def extract_country_regions_from_csv(csv_data: list[str]) -> list[Country]:
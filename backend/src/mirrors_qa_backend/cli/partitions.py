@@ -0,0 +1,30 @@
+import datetime
+
+from mirrors_qa_backend import logger
+from mirrors_qa_backend.db import Session
+from mirrors_qa_backend.db.partitions import (
+    create_test_partitions,
+    remove_test_partitions,
+)
+
+
+def maintain_partitions(
+    *, months_ahead: int, retention_seconds: float | None, detach: bool
+) -> None:
+    """Create the upcoming partitions of tests and remove the expired ones.
+
+    No partition is removed if retention_seconds is None.
+    """
+    now = datetime.datetime.now()
+    with Session.begin() as session:
+        for name in create_test_partitions(session, now=now, months_ahead=months_ahead):
+            logger.info(f"Created partition {name!r}")
+        if retention_seconds is None:
+            return
+        for name in remove_test_partitions(
+            session,
+            now=now,
+            retention=datetime.timedelta(seconds=retention_seconds),
+            detach=detach,
+        ):
+            logger.info(f"{'Detached' if detach else 'Dropped'} partition {name!r}")
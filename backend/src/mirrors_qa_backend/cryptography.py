@@ -5,18 +5,29 @@ from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
+from cryptography.hazmat.primitives.asymmetric.types import PublicKeyTypes
 
 from mirrors_qa_backend.exceptions import PEMPublicKeyLoadError
 
 
-def verify_signed_message(public_key: bytes, signature: bytes, message: bytes) -> bool:
+def load_public_key(public_key: bytes) -> PublicKeyTypes:
+    """Load a PEM-encoded public key"""
     try:
-        pem_public_key = serialization.load_pem_public_key(public_key)
+        return serialization.load_pem_public_key(public_key)
     except Exception as exc:
         raise PEMPublicKeyLoadError("Unable to load public key") from exc
 
+
+def verify_signed_message(public_key: bytes, signature: bytes, message: bytes) -> bool:
+    return verify_message_signature(load_public_key(public_key), signature, message)
+
+
+def verify_message_signature(
+    public_key: PublicKeyTypes, signature: bytes, message: bytes
+) -> bool:
+    """Verify the signature of a message using an already loaded public key"""
     try:
-        pem_public_key.verify(  # pyright: ignore
+        public_key.verify(  # pyright: ignore
             signature,
             message,
             padding.PSS(  # pyright: ignore
@@ -1,29 +1,228 @@
+import math
 import subprocess
-from collections.abc import Generator
+import time
+from collections.abc import Awaitable, Callable, Generator
+from contextlib import AbstractContextManager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Annotated, Any
 
-from sqlalchemy import SelectBase, create_engine, func, select
+from fastapi import Cookie, Request, Response
+from sqlalchemy import (
+    Connection,
+    Engine,
+    Executable,
+    Select,
+    SelectBase,
+    create_engine,
+    event,
+    func,
+    select,
+)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session as OrmSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import SessionTransaction, sessionmaker
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.compiler import SQLCompiler
 
 from mirrors_qa_backend import logger
 from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.instrumentation import (
+    InstrumentedQueuePool,
+    SlowQueryLogger,
+    instrument_engine,
+)
 from mirrors_qa_backend.db.mirrors import create_or_update_mirror_status
 from mirrors_qa_backend.extract import get_current_mirrors
 from mirrors_qa_backend.settings import Settings
 
-Session = sessionmaker(
-    bind=create_engine(url=Settings.DATABASE_URL, echo=False),
+
+def _create_engine(url: str, name: str) -> Engine:
+    """Create an instrumented engine whose metrics are labelled with name."""
+    engine = create_engine(
+        url=url,
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+    )
+    instrument_engine(
+        engine,
+        slow_query_logger=(
+            SlowQueryLogger(
+                Settings.SLOW_QUERY_SECONDS,
+                explain_ratio=Settings.SLOW_QUERY_EXPLAIN_RATIO,
+            )
+            if Settings.SLOW_QUERY_SECONDS is not None
+            else None
+        ),
+    )
+    return engine
+
+
+engine = _create_engine(Settings.DATABASE_URL, "primary")
+# Read-only sessions use the replica if there is one. Sessions which write, and
+# so read what they have written, always use the primary.
+read_engine = (
+    _create_engine(Settings.REPLICA_DATABASE_URL, "replica")
+    if Settings.REPLICA_DATABASE_URL
+    else engine
+)
+# cookie holding the timestamp until which the reads of a client which wrote are
+# served from the primary, as the replica may not have replayed its writes yet
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+Session = sessionmaker(bind=engine, expire_on_commit=False)
+# Sessions whose transactions are READ ONLY and whose statements time out after
+# Settings.READ_ONLY_STATEMENT_TIMEOUT_SECONDS so that read paths can neither
+# write nor hold a connection for long.
+ReadOnlySession = sessionmaker(
+    bind=read_engine.execution_options(postgresql_readonly=True),
+    expire_on_commit=False,
+)
+# Same as ReadOnlySession but on the primary, for the clients which just wrote
+PrimaryReadOnlySession = sessionmaker(
+    bind=engine.execution_options(postgresql_readonly=True),
     expire_on_commit=False,
 )
 
 
+@event.listens_for(PrimaryReadOnlySession, "after_begin")
+@event.listens_for(ReadOnlySession, "after_begin")
+def _set_read_only_statement_timeout(
+    _session: OrmSession, _transaction: SessionTransaction, connection: Connection
+) -> None:
+    connection.execute(
+        select(
+            func.set_config(
+                "statement_timeout",
+                str(int(Settings.READ_ONLY_STATEMENT_TIMEOUT_SECONDS * 1000)),
+                True,  # local to the transaction
+            )
+        )
+    )
+
+
+@dataclass
+class RequestWrites:
+    """Writes made to the primary while handling a request."""
+
+    # rows were written by the transaction in progress
+    pending: bool = False
+    # rows were written by a committed transaction
+    committed: bool = False
+
+
+# writes of the request being handled, None outside of requests
+current_request_writes: ContextVar[RequestWrites | None] = ContextVar(
+    "current_request_writes", default=None
+)
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_request_write(
+    _conn: Connection,
+    cursor: Any,
+    _statement: str,
+    _parameters: Any,
+    context: Any,
+    _executemany: bool,  # noqa: FBT001
+) -> None:
+    if (request_writes := current_request_writes.get()) is None:
+        return
+    # rowcount is -1 if unknown
+    if (context.isinsert or context.isupdate or context.isdelete) and (
+        cursor.rowcount != 0
+    ):
+        request_writes.pending = True
+
+
+@event.listens_for(engine, "commit")
+def _commit_request_writes(_conn: Connection) -> None:
+    if (request_writes := current_request_writes.get()) is not None:
+        request_writes.committed |= request_writes.pending
+        request_writes.pending = False
+
+
+@event.listens_for(engine, "rollback")
+def _rollback_request_writes(_conn: Connection) -> None:
+    if (request_writes := current_request_writes.get()) is not None:
+        request_writes.pending = False
+
+
+async def read_primary_after_write(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Middleware serving the reads of a client from the primary for a while
+    once it committed writes, as the replica may not have replayed them yet.
+
+    Requests which wrote nothing (e.g failed or leased no test) don't change
+    where the client reads from.
+    """
+    if read_engine is engine:
+        return await call_next(request)
+    # the context, and so the writes, are shared with the route handler
+    request_writes = RequestWrites()
+    token = current_request_writes.set(request_writes)
+    try:
+        response = await call_next(request)
+    finally:
+        current_request_writes.reset(token)
+    if request_writes.committed:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + Settings.READ_PRIMARY_AFTER_WRITE_SECONDS),
+            max_age=math.ceil(Settings.READ_PRIMARY_AFTER_WRITE_SECONDS),
+            httponly=True,
+        )
+    return response
+
+
 def gen_dbsession() -> Generator[OrmSession, None, None]:
     """FastAPI's Depends() compatible helper to provide a begin DB Session"""
     with Session.begin() as session:
         yield session
 
 
+def get_dbsession_maker() -> Callable[[], AbstractContextManager[OrmSession]]:
+    """FastAPI's Depends() compatible helper to provide a factory of begin DB
+    Sessions.
+
+    For endpoints which must not hold a connection for the whole request, e.g
+    while waiting: each session is closed as soon as its block is exited.
+    """
+    return Session.begin
+
+
+def get_readonly_dbsession_maker(
+    read_primary_until: Annotated[
+        float | None, Cookie(alias=READ_PRIMARY_COOKIE, include_in_schema=False)
+    ] = None,
+) -> Callable[[], AbstractContextManager[OrmSession]]:
+    """FastAPI's Depends() compatible helper to provide a factory of begin
+    read-only DB Sessions.
+
+    For endpoints which only need a session once in a while, e.g on cache
+    misses. Sessions use the replica, if any, unless the client wrote recently.
+    """
+    if read_primary_until is not None and read_primary_until > time.time():
+        return PrimaryReadOnlySession.begin
+    return ReadOnlySession.begin
+
+
+def gen_readonly_dbsession(
+    read_primary_until: Annotated[
+        float | None, Cookie(alias=READ_PRIMARY_COOKIE, include_in_schema=False)
+    ] = None,
+) -> Generator[OrmSession, None, None]:
+    """FastAPI's Depends() compatible helper to provide a read-only DB Session
+
+    The session uses the replica, if any, unless the client wrote recently.
+    """
+    with get_readonly_dbsession_maker(read_primary_until)() as session:
+        yield session
+
+
 def upgrade_db_schema():
     """Checks if Alembic schema has been applied to the DB"""
     src_dir = Path(__file__).parent.parent
@@ -31,13 +230,50 @@ def upgrade_db_schema():
     subprocess.check_output(args=["alembic", "upgrade", "head"], cwd=src_dir)
 
 
-def count_from_stmt(session: OrmSession, stmt: SelectBase) -> int:
-    """Count all records returned by any statement `stmt` passed as parameter"""
+def count_from_stmt(
+    session: OrmSession, stmt: Select[Any], limit: int | None = None
+) -> int:
+    """Count all records returned by any statement `stmt` passed as parameter
+
+    If limit is set, counting stops after limit records.
+    """
+    if limit is not None:
+        stmt = stmt.limit(limit)
     return session.execute(
         select(func.count()).select_from(stmt.subquery())
     ).scalar_one()
 
 
+class _ExplainJson(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement.
+
+    The statement is compiled and its parameters processed as if it was
+    executed itself.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, stmt: SelectBase):
+        self.stmt = stmt
+
+
+@compiles(_ExplainJson)
+def _compile_explain_json(
+    element: _ExplainJson, compiler: SQLCompiler, **kwargs: Any
+) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kwargs)
+
+
+def estimate_count_from_stmt(session: OrmSession, stmt: SelectBase) -> int:
+    """Estimate the number of records returned by `stmt` using the query planner.
+
+    The estimate is based on the table statistics maintained by ANALYZE and
+    is obtained without executing the statement.
+    """
+    plan = session.execute(_ExplainJson(stmt)).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 def initialize_mirrors() -> None:
     with Session.begin() as session:
         current_mirrors = get_current_mirrors()
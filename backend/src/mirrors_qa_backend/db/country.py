@@ -2,6 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session as OrmSession
 
+from mirrors_qa_backend.db.country_cache import invalidate_country_cache
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
 from mirrors_qa_backend.db.models import Country
 
@@ -36,15 +37,33 @@ def create_country(
     session: OrmSession, *, country_code: str, country_name: str
 ) -> Country:
     """Creates a new country in the database."""
-    session.execute(
+    if session.scalars(
         insert(Country)
         .values(code=country_code, name=country_name)
         .on_conflict_do_nothing(index_elements=["code"])
-    )
+        .returning(Country.code)
+    ).first():
+        invalidate_country_cache(session)
     return get_country(session, country_code)
 
 
 def update_countries(session: OrmSession, country_mapping: dict[str, str]) -> None:
-    """Updates the list of countries in the database."""
-    for country_code, country_name in country_mapping.items():
-        create_country(session, country_code=country_code, country_name=country_name)
+    """Creates the countries of the mapping which don't exist yet in the database.
+
+    Countries are created with a single statement and caches of countries are
+    only invalidated if a country was actually created.
+    """
+    if not country_mapping:
+        return
+    if session.scalars(
+        insert(Country)
+        .values(
+            [
+                {"code": country_code, "name": country_name}
+                for country_code, country_name in sorted(country_mapping.items())
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["code"])
+        .returning(Country.code)
+    ).first():
+        invalidate_country_cache(session)
@@ -0,0 +1,75 @@
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.models import Country
+from mirrors_qa_backend.db.notifications import (
+    COUNTRIES_UPDATED_CHANNEL,
+    notifications_listener,
+    notify,
+)
+
+
+@dataclass(frozen=True)
+class CountryRegions:
+    """Snapshot of the countries and the regions they belong to."""
+
+    # region code of each country, None if the country has no region
+    country_regions: dict[str, str | None] = field(default_factory=dict)
+    # codes of the countries of each region
+    region_countries: dict[str, list[str]] = field(default_factory=dict)
+
+    def get_region_code(self, country_code: str) -> str | None:
+        return self.country_regions.get(country_code)
+
+    def get_country_codes(self, region_code: str) -> list[str]:
+        return self.region_countries.get(region_code, [])
+
+
+class CountryCache:
+    """In-process read-through cache of the countries and their regions.
+
+    Countries and regions rarely change (create-countries) so they are loaded
+    with a single query and kept until invalidated.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._country_regions: CountryRegions | None = None
+
+    def get(self, session: OrmSession) -> CountryRegions:
+        with self._lock:
+            if self._country_regions is None:
+                self._country_regions = self._load(session)
+            return self._country_regions
+
+    def invalidate(self, _: str | None = None) -> None:
+        with self._lock:
+            self._country_regions = None
+
+    @staticmethod
+    def _load(session: OrmSession) -> CountryRegions:
+        country_regions: dict[str, str | None] = {}
+        region_countries: dict[str, list[str]] = defaultdict(list)
+        for country_code, region_code in session.execute(
+            select(Country.code, Country.region_code).order_by(Country.code)
+        ).all():
+            country_regions[country_code] = region_code
+            if region_code:
+                region_countries[region_code].append(country_code)
+        return CountryRegions(
+            country_regions=country_regions, region_countries=dict(region_countries)
+        )
+
+
+country_cache = CountryCache()
+notifications_listener.add_handler(COUNTRIES_UPDATED_CHANNEL, country_cache.invalidate)
+
+
+def invalidate_country_cache(session: OrmSession) -> None:
+    """Invalidate the cache of this process and, once committed, of the others."""
+    country_cache.invalidate()
+    notify(session, COUNTRIES_UPDATED_CHANNEL, "")
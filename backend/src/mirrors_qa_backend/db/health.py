@@ -0,0 +1,44 @@
+import datetime
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.models import Test, Worker
+from mirrors_qa_backend.enums import StatusEnum
+
+
+@dataclass
+class HealthSummary:
+    """Figures on the activity of the workers used to report the health."""
+
+    # start of the most recent successful test, None if no test succeeded yet
+    last_test_succeeded_on: datetime.datetime | None
+    # number of workers seen in the interval
+    nb_active_workers: int
+
+
+def get_health_summary(
+    session: OrmSession, *, workers_interval: datetime.timedelta
+) -> HealthSummary:
+    """Summary of the activity of the workers, computed with a single query.
+
+    The most recent successful test is found with a probe of the index on the
+    start of SUCCEEDED tests rather than by counting recent tests.
+    """
+    end = datetime.datetime.now()
+    begin = end - workers_interval
+    last_test_succeeded_on, nb_active_workers = session.execute(
+        select(
+            select(func.max(Test.started_on))
+            .where(Test.status == StatusEnum.SUCCEEDED)
+            .scalar_subquery(),
+            select(func.count(Worker.id))
+            .where(Worker.last_seen_on.between(begin, end))
+            .scalar_subquery(),
+        )
+    ).one()
+    return HealthSummary(
+        last_test_succeeded_on=last_test_succeeded_on,
+        nb_active_workers=nb_active_workers,
+    )
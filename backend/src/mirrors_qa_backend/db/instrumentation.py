@@ -0,0 +1,136 @@
+import random
+import time
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+
+from mirrors_qa_backend import logger
+from mirrors_qa_backend.metrics import (
+    DB_POOL_CHECKOUT_DURATION,
+    DB_POOL_CONNECTIONS_IN_USE,
+    DB_STATEMENT_DURATION,
+    current_request_statements,
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording how long checking out a connection takes.
+
+    Metrics are labelled with the logging name of the pool (pool_logging_name
+    of create_engine).
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_on = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.labels(self.logging_name).observe(
+                time.perf_counter() - started_on
+            )
+
+
+class SlowQueryLogger:
+    """Log statements slower than threshold_seconds along with their parameters.
+
+    The plan of a sample (explain_ratio) of the slow SELECT statements is
+    logged too. As EXPLAIN ANALYZE runs the statement again, other statements
+    are never explained and the plan is obtained within a savepoint so that
+    a failure does not abort the transaction.
+    """
+
+    def __init__(self, threshold_seconds: float, explain_ratio: float = 0) -> None:
+        self.threshold_seconds = threshold_seconds
+        self.explain_ratio = explain_ratio
+
+    def log(
+        self,
+        conn: Connection,
+        statement: str,
+        parameters: Any,
+        duration: float,
+        *,
+        executemany: bool = False,
+    ) -> None:
+        if duration < self.threshold_seconds:
+            return
+        logger.warning(
+            f"Slow query ({duration:.3f}s): {statement} "
+            f"with parameters: {parameters!r}"
+        )
+        if (
+            not executemany
+            and _get_operation(statement) == "SELECT"
+            and random.random() < self.explain_ratio  # noqa: S311
+        ):
+            try:
+                plan = self._explain(conn, statement, parameters)
+            except Exception as exc:
+                logger.error(f"error while explaining slow query: {exc!s}")
+            else:
+                logger.warning(f"Plan of slow query:\n{plan}")
+
+    @staticmethod
+    def _explain(conn: Connection, statement: str, parameters: Any) -> str:
+        # The raw DBAPI cursor does not go through the engine events again
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT explain_slow_query")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+                raise
+            cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+            return plan
+        finally:
+            cursor.close()
+
+
+def _get_operation(statement: str) -> str:
+    return statement.lstrip().split(maxsplit=1)[0].upper()
+
+
+def instrument_engine(
+    engine: Engine, *, slow_query_logger: SlowQueryLogger | None = None
+) -> None:
+    """Record the metrics of the connection pool and statements of engine.
+
+    Statements are also logged by slow_query_logger if it is set.
+    """
+    DB_POOL_CONNECTIONS_IN_USE.labels(engine.pool.logging_name).set_function(
+        engine.pool.checkedout
+    )
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Connection, *_: Any) -> None:
+        conn.info.setdefault("statements_started_on", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        executemany: bool,  # noqa: FBT001
+    ) -> None:
+        duration = time.perf_counter() - conn.info["statements_started_on"].pop()
+        DB_STATEMENT_DURATION.labels(_get_operation(statement)).observe(duration)
+        if (request_statements := current_request_statements.get()) is not None:
+            request_statements.count += 1
+        if slow_query_logger is not None:
+            slow_query_logger.log(
+                conn, statement, parameters, duration, executemany=executemany
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context: ExceptionContext) -> None:
+        # after_cursor_execute is not called for failed statements
+        if context.connection is None or context.execution_context is None:
+            return
+        if started_on := context.connection.info.get("statements_started_on"):
+            started_on.pop()
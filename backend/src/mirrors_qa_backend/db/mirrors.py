@@ -1,18 +1,16 @@
 from dataclasses import dataclass
-from itertools import chain
+from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session as OrmSession
 
 from mirrors_qa_backend import logger, schemas
-from mirrors_qa_backend.db.country import get_country, get_country_or_none
+from mirrors_qa_backend.db.country import get_country
+from mirrors_qa_backend.db.country_cache import CountryRegions, country_cache
 from mirrors_qa_backend.db.exceptions import EmptyMirrorsError, RecordDoesNotExistError
 from mirrors_qa_backend.db.models import Mirror
-from mirrors_qa_backend.db.region import (
-    get_countries_for,
-    get_region,
-    get_region_or_none,
-)
+from mirrors_qa_backend.db.region import get_region
 
 
 @dataclass
@@ -29,11 +27,16 @@ def _update_mirror_country_and_region(
     """Update the mirror country and region using the country code if they exist.
 
     Used during mirror list update to set region and country as these fields
-    were missing in old DB schema.
+    were missing in old DB schema. Countries and regions are resolved from the
+    country cache so that no query is made per mirror.
     """
-    mirror.country = get_country_or_none(session, country_code)
-    if mirror.country and mirror.country.region_code:
-        mirror.region = get_region_or_none(session, mirror.country.region_code)
+    country_regions = country_cache.get(session)
+    if country_code in country_regions.country_regions:
+        mirror.country_code = country_code
+        if region_code := country_regions.get_region_code(country_code):
+            mirror.region_code = region_code
+    else:
+        mirror.country_code = None
     session.add(mirror)
     return mirror
 
@@ -69,11 +72,23 @@ def create_mirrors(session: OrmSession, mirrors: list[schemas.Mirror]) -> int:
     return nb_created
 
 
+def _resolve_country_and_region(
+    country_regions: CountryRegions, country_code: str | None
+) -> tuple[str | None, str | None]:
+    """Country and region codes of a mirror if they exist in the database."""
+    if country_code is None or country_code not in country_regions.country_regions:
+        return None, None
+    return country_code, country_regions.get_region_code(country_code)
+
+
 def create_or_update_mirror_status(
     session: OrmSession, mirrors: list[schemas.Mirror]
 ) -> MirrorsUpdateResult:
     """Updates the status of mirrors in the database and creates any new mirrors.
 
+    New mirrors are inserted and existing ones are re-enabled with a single
+    upsert while mirrors missing from the list are disabled with a single update.
+
     Raises:
         EmptyMirrorsError if the provided list of mirrors is empty.
 
@@ -81,48 +96,78 @@ def create_or_update_mirror_status(
     if not mirrors:
         raise EmptyMirrorsError("mirrors list must not be empty")
 
-    result = MirrorsUpdateResult()
-    # Map the id (hostname) of each mirror from the mirrors list for comparison
-    # against the id of mirrors from the database. To be used in determining
-    # if this mirror is a new mirror, in which case it should be added
+    # Map the id (hostname) of each mirror as a mirror can only be upserted
+    # once per statement
     current_mirrors: dict[str, schemas.Mirror] = {
         mirror.id: mirror for mirror in mirrors
     }
 
-    # Map the id (hostname) of each mirror from the database for comparison
-    # against the id of mirrors in current_mirrors. To be used in determining
-    # if this mirror should be disabled
-    db_mirrors: dict[str, Mirror] = {
-        mirror.id: mirror for mirror in session.scalars(select(Mirror)).all()
-    }
+    country_regions = country_cache.get(session)
+    rows: list[dict[str, Any]] = []
+    for mirror in current_mirrors.values():
+        country_code, region_code = _resolve_country_and_region(
+            country_regions, mirror.country_code
+        )
+        rows.append(
+            {
+                "id": mirror.id,
+                "base_url": mirror.base_url,
+                "enabled": mirror.enabled,
+                "asn": mirror.asn,
+                "score": mirror.score,
+                "latitude": mirror.latitude,
+                "longitude": mirror.longitude,
+                "country_only": mirror.country_only,
+                "region_only": mirror.region_only,
+                "as_only": mirror.as_only,
+                "other_countries": mirror.other_countries,
+                "country_code": country_code,
+                "region_code": region_code,
+            }
+        )
 
-    # Create any mirror that doesn't exist on the database
-    for mirror_id, mirror in current_mirrors.items():
-        if mirror_id not in db_mirrors:
-            # Create the mirror as it doesn't exist on the database.
-            result.nb_mirrors_added += create_mirrors(session, [mirror])
+    # Existing mirrors are re-enabled and, as new mirrors DB model contain
+    # country data, their country and region are updated when known.
+    stmt = insert(Mirror).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Mirror.id],
+        set_={
+            "enabled": True,
+            "country_code": func.coalesce(
+                stmt.excluded.country_code, Mirror.country_code
+            ),
+            "region_code": func.coalesce(stmt.excluded.region_code, Mirror.region_code),
+        },
+    ).returning(
+        Mirror.id,
+        # xmax is only zero for the rows that were inserted
+        literal_column("xmax = 0").label("inserted"),
+        # subqueries see the table as it was before the statement
+        Mirror.id.in_(
+            select(Mirror.id).where(Mirror.enabled == False)  # noqa: E712
+        ).label("was_disabled"),
+    )
 
-    # Disable any mirror in the database that doesn't exist on the current
-    # list of mirrors. However, if a mirror is disabled in the database and
-    # exists in the list, re-enable it
-    for db_mirror_id, db_mirror in db_mirrors.items():
-        if db_mirror_id not in current_mirrors:
-            logger.debug(f"Disabling mirror: {db_mirror.id}")
-            db_mirror.enabled = False
-            session.add(db_mirror)
-            result.nb_mirrors_disabled += 1
-        elif not db_mirror.enabled:  # re-enable mirror if it was disabled
-            logger.debug(f"Re-enabling mirror: {db_mirror.id}")
-            db_mirror.enabled = True
-            session.add(db_mirror)
+    result = MirrorsUpdateResult()
+    for mirror_id, inserted, was_disabled in session.execute(stmt).all():
+        if inserted:
+            logger.debug(f"Registered new mirror: {mirror_id}.")
+            result.nb_mirrors_added += 1
+        elif was_disabled:
+            logger.debug(f"Re-enabling mirror: {mirror_id}")
             result.nb_mirrors_added += 1
 
-        # New mirrors DB model contain country data. As such, we update the
-        # country information regardless of the status update.
-        if db_mirror_id in current_mirrors:
-            country_code = current_mirrors[db_mirror_id].country_code
-            if country_code:
-                _update_mirror_country_and_region(session, country_code, db_mirror)
+    # Disable any mirror in the database that doesn't exist on the current
+    # list of mirrors.
+    disabled_mirror_ids = session.scalars(
+        update(Mirror)
+        .where(Mirror.id.not_in(list(current_mirrors)))
+        .values(enabled=False)
+        .returning(Mirror.id)
+    ).all()
+    for mirror_id in disabled_mirror_ids:
+        logger.debug(f"Disabling mirror: {mirror_id}")
+    result.nb_mirrors_disabled = len(disabled_mirror_ids)
     return result
 
 
@@ -162,11 +207,11 @@ def update_mirror_countries_from_regions(
     if mirror.region_code:
         region_codes.add(mirror.region_code)
 
+    country_regions = country_cache.get(session)
     country_codes = [
-        country.code
-        for country in chain.from_iterable(
-            get_countries_for(session, region_code) for region_code in region_codes
-        )
+        country_code
+        for region_code in region_codes
+        for country_code in country_regions.get_country_codes(region_code)
     ]
     if not country_codes:
         raise ValueError("No countries found in provided regions.")
@@ -5,11 +5,14 @@ from ipaddress import IPv4Address
 from uuid import UUID
 
 from sqlalchemy import (
+    DDL,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     String,
     UniqueConstraint,
+    event,
     text,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, INET
@@ -24,6 +27,9 @@ from sqlalchemy.sql.schema import MetaData
 
 from mirrors_qa_backend.enums import StatusEnum
 
+# name of the partition of the test table holding the tests of no monthly partition
+TEST_DEFAULT_PARTITION = "test_default"
+
 
 class Base(MappedAsDataclass, DeclarativeBase):
     # This map details the specific transformation of types between Python and
@@ -176,8 +182,9 @@ class Test(Base):
     id: Mapped[UUID] = mapped_column(
         init=False, primary_key=True, server_default=text("uuid_generate_v4()")
     )
+    # part of the primary key as the table is partitioned by month on it
     requested_on: Mapped[datetime.datetime] = mapped_column(
-        default_factory=datetime.datetime.now
+        primary_key=True, default_factory=datetime.datetime.now
     )
     started_on: Mapped[datetime.datetime | None] = mapped_column(default=None)
     status: Mapped[StatusEnum] = mapped_column(
@@ -209,6 +216,10 @@ class Test(Base):
     worker_id: Mapped[str | None] = mapped_column(
         ForeignKey("worker.id"), init=False, default=None
     )
+    # date after which a LEASED test is returned to the PENDING tests
+    lease_expires_on: Mapped[datetime.datetime | None] = mapped_column(
+        init=False, default=None
+    )
 
     worker: Mapped[Worker | None] = relationship(
         back_populates="tests", init=False, repr=False
@@ -217,3 +228,91 @@ class Test(Base):
     mirror: Mapped[Mirror | None] = relationship(
         back_populates="tests", init=False, repr=False
     )
+
+    __table_args__ = (
+        # pending tests of a worker (worker manager polls) and listings
+        # filtered on worker
+        Index(
+            "ix_test_worker_id_status_requested_on",
+            "worker_id",
+            "status",
+            "requested_on",
+        ),
+        Index(
+            "ix_test_country_code_status_requested_on",
+            "country_code",
+            "status",
+            "requested_on",
+        ),
+        # tests by status (listings)
+        Index("ix_test_status_requested_on", "status", "requested_on"),
+        # PENDING tests only (batched expiry of PENDING tests)
+        Index(
+            "ix_test_pending_requested_on",
+            "requested_on",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        # start of SUCCEEDED tests only (health check)
+        Index(
+            "ix_test_succeeded_started_on",
+            "started_on",
+            postgresql_where=text("status = 'SUCCEEDED'"),
+        ),
+        # monthly partitions are managed by maintain-partitions
+        {"postgresql_partition_by": "RANGE (requested_on)"},
+    )
+
+
+# Tests requested outside of the monthly partitions go to the default partition
+event.listen(
+    Test.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE {TEST_DEFAULT_PARTITION} PARTITION OF test DEFAULT"),
+)
+
+
+class TestRollup(Base):
+    """Results of the tests requested in an hour for a mirror and country.
+
+    Rows are maintained incrementally as results are reported (see db.rollup).
+    Sums and bounds of the metrics only take the tests reporting them into
+    account (i.e mostly SUCCEEDED tests).
+    """
+
+    __tablename__ = "test_rollup"
+
+    # start of the hour the tests were requested in
+    hour: Mapped[datetime.datetime] = mapped_column(primary_key=True)
+    mirror_id: Mapped[str] = mapped_column(ForeignKey("mirror.id"), primary_key=True)
+    country_code: Mapped[str] = mapped_column(primary_key=True)
+    # number of tests with a result (SUCCEEDED, ERRORED or MISSED)
+    nb_tests: Mapped[int] = mapped_column(default=0)
+    nb_succeeded: Mapped[int] = mapped_column(default=0)
+    nb_errored: Mapped[int] = mapped_column(default=0)
+    nb_missed: Mapped[int] = mapped_column(default=0)
+    speed_sum: Mapped[float] = mapped_column(default=0)  # bytes per second
+    speed_min: Mapped[float | None] = mapped_column(default=None)
+    speed_max: Mapped[float | None] = mapped_column(default=None)
+    latency_sum: Mapped[float] = mapped_column(default=0)  # milliseconds
+    latency_min: Mapped[float | None] = mapped_column(default=None)
+    latency_max: Mapped[float | None] = mapped_column(default=None)
+    duration_sum: Mapped[float] = mapped_column(default=0)  # seconds
+    duration_min: Mapped[float | None] = mapped_column(default=None)
+    duration_max: Mapped[float | None] = mapped_column(default=None)
+
+
+class TestSketch(Base):
+    """Distributions of the speed and latency of the tests requested in a day
+    for a mirror and country.
+
+    Distributions are serialized sketch.LogHistogram which are maintained
+    incrementally as results are reported (see db.sketches).
+    """
+
+    __tablename__ = "test_sketch"
+
+    day: Mapped[datetime.date] = mapped_column(primary_key=True)
+    mirror_id: Mapped[str] = mapped_column(ForeignKey("mirror.id"), primary_key=True)
+    country_code: Mapped[str] = mapped_column(primary_key=True)
+    speed: Mapped[bytes]  # bytes per second
+    latency: Mapped[bytes]  # milliseconds
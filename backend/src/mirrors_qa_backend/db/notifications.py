@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+
+import psycopg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend import logger
+from mirrors_qa_backend.settings import Settings
+
+# Postgres channel on which the id of a worker is sent when tests are created
+NEW_TESTS_CHANNEL = "new_tests"
+# Postgres channel on which the id of a worker is sent when its id or public key
+# change, which are the fields cached by the API processes
+WORKER_UPDATED_CHANNEL = "worker_updated"
+# Postgres channel notified when countries or regions are created or updated
+COUNTRIES_UPDATED_CHANNEL = "countries_updated"
+
+# Handler of the notifications of a channel. It is called with the payload of
+# the notification or None when notifications might have been missed.
+NotificationHandler = Callable[[str | None], None]
+
+
+def notify(session: OrmSession, channel: str, payload: str) -> None:
+    """Send a notification on channel.
+
+    The notification is only delivered once the session's transaction commits.
+    """
+    session.execute(select(func.pg_notify(channel, payload)))
+
+
+class NotificationsListener:
+    """Dispatch Postgres notifications to handlers of this process.
+
+    A single connection listens for notifications of all the channels with
+    handlers from a background thread.
+    """
+
+    def __init__(self, database_url: str, retry_seconds: float = 5) -> None:
+        # psycopg does not understand SQLAlchemy's driver-qualified URLs
+        self.conninfo = (
+            make_url(database_url)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._handlers: dict[str, list[NotificationHandler]] = {}
+        self._thread: threading.Thread | None = None
+
+    def add_handler(self, channel: str, handler: NotificationHandler) -> None:
+        """Call handler on notifications of channel.
+
+        Handlers must be added before the listener is started.
+        """
+        with self._lock:
+            if self._thread is not None:
+                raise RuntimeError("Cannot add handlers to a started listener.")
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def start(self) -> None:
+        """Start listening in a background thread if not started yet."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen, name="notifications-listener", daemon=True
+                )
+                self._thread.start()
+
+    def _dispatch(self, channel: str | None, payload: str | None) -> None:
+        """Call the handlers of channel or of all the channels if channel is None"""
+        for handler_channel, handlers in self._handlers.items():
+            if channel is None or channel == handler_channel:
+                for handler in handlers:
+                    handler(payload)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                with psycopg.connect(self.conninfo, autocommit=True) as conn:
+                    for channel in self._handlers:
+                        conn.execute(f"LISTEN {channel}")
+                    # Notifications sent while (re)connecting are lost
+                    self._dispatch(None, None)
+                    for notification in conn.notifies():
+                        self._dispatch(notification.channel, notification.payload)
+            except psycopg.Error as exc:
+                logger.error(f"error while listening for notifications: {exc!s}")
+            time.sleep(self.retry_seconds)
+
+
+class NewTestsWaiters:
+    """Requests waiting for new tests to be created for a worker.
+
+    Requests wait on asyncio events of their event loop so that they don't hold
+    a thread while waiting. Events are set from the thread of the notifications
+    listener.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: dict[
+            str, set[tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+        ] = {}
+
+    @contextmanager
+    def subscribe(self, worker_id: str) -> Generator[asyncio.Event, None, None]:
+        """Event which is set once new tests are created for the worker.
+
+        Must be called from a running event loop.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._events.setdefault(worker_id, set()).add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                events = self._events[worker_id]
+                events.discard(waiter)
+                if not events:
+                    del self._events[worker_id]
+
+    def wake_up(self, worker_id: str | None) -> None:
+        """Set the events of a worker or of all the workers if worker_id is None"""
+        with self._lock:
+            if worker_id is None:
+                waiters = [
+                    waiter for waiters in self._events.values() for waiter in waiters
+                ]
+            else:
+                waiters = list(self._events.get(worker_id, []))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the loop was closed since, nobody waits for the event anymore
+                pass
+
+
+notifications_listener = NotificationsListener(Settings.DATABASE_URL)
+new_tests_waiters = NewTestsWaiters()
+notifications_listener.add_handler(NEW_TESTS_CHANNEL, new_tests_waiters.wake_up)
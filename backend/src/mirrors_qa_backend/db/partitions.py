@@ -0,0 +1,143 @@
+import datetime
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.models import TEST_DEFAULT_PARTITION, Test
+
+TEST_TABLE = Test.__tablename__
+# bounds of a range partition as output by pg_get_expr
+_PARTITION_BOUNDS_RE = re.compile(
+    r"FROM \('(?P<lower>[^']+)'\) TO \('(?P<upper>[^']+)'\)"
+)
+
+
+@dataclass
+class Partition:
+    """Range partition of the test table."""
+
+    name: str
+    # the partition holds tests requested from lower_bound (inclusive) up to
+    # upper_bound (exclusive)
+    lower_bound: datetime.datetime
+    upper_bound: datetime.datetime
+
+
+def get_month_start(date: datetime.datetime, months: int = 0) -> datetime.datetime:
+    """Start of the month of date, shifted by a number of months."""
+    month_index = date.year * 12 + date.month - 1 + months
+    return datetime.datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_test_partition_name(month_start: datetime.datetime) -> str:
+    return f"{TEST_TABLE}_y{month_start.year:04}m{month_start.month:02}"
+
+
+def get_test_partitions(session: OrmSession) -> list[Partition]:
+    """Range partitions of the test table ordered by their bounds.
+
+    The default partition is not a range partition and is thus excluded.
+    """
+    partitions: list[Partition] = []
+    for name, bounds in session.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": TEST_TABLE},
+    ).all():
+        if match := _PARTITION_BOUNDS_RE.search(bounds):
+            partitions.append(
+                Partition(
+                    name=name,
+                    lower_bound=datetime.datetime.fromisoformat(match["lower"]),
+                    upper_bound=datetime.datetime.fromisoformat(match["upper"]),
+                )
+            )
+    return sorted(partitions, key=lambda partition: partition.lower_bound)
+
+
+def _create_test_partition(session: OrmSession, month_start: datetime.datetime) -> str:
+    """Create the partition of the tests requested in the month of month_start.
+
+    Tests of the month which went to the default partition are moved to the
+    new partition before it is attached, as attaching a partition fails if the
+    default partition holds rows which belong to it.
+    """
+    name = get_test_partition_name(month_start)
+    lower_bound = month_start
+    upper_bound = get_month_start(month_start, 1)
+    session.execute(
+        text(
+            f"CREATE TABLE {name} "
+            f"(LIKE {TEST_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    # table names are not user input
+    session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {TEST_DEFAULT_PARTITION} "  # noqa: S608
+            "WHERE requested_on >= :lower_bound AND requested_on < :upper_bound "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"lower_bound": lower_bound, "upper_bound": upper_bound},
+    )
+    session.execute(
+        text(
+            f"ALTER TABLE {TEST_TABLE} ATTACH PARTITION {name} FOR VALUES "
+            f"FROM ('{lower_bound.isoformat()}') TO ('{upper_bound.isoformat()}')"
+        )
+    )
+    return name
+
+
+def create_test_partitions(
+    session: OrmSession, *, now: datetime.datetime, months_ahead: int
+) -> list[str]:
+    """Create the missing partitions from the month of now to months_ahead later.
+
+    Returns the names of the created partitions.
+    """
+    partitions = get_test_partitions(session)
+    created: list[str] = []
+    for months in range(months_ahead + 1):
+        month_start = get_month_start(now, months)
+        month_end = get_month_start(now, months + 1)
+        if not any(
+            partition.lower_bound < month_end and month_start < partition.upper_bound
+            for partition in partitions
+        ):
+            created.append(_create_test_partition(session, month_start))
+    return created
+
+
+def remove_test_partitions(
+    session: OrmSession,
+    *,
+    now: datetime.datetime,
+    retention: datetime.timedelta,
+    detach: bool = False,
+) -> list[str]:
+    """Remove the partitions whose tests were all requested before the retention.
+
+    Partitions are dropped unless detach is set in which case they are only
+    detached from the test table and kept as standalone tables (e.g to be
+    archived).
+
+    Returns the names of the removed partitions.
+    """
+    removed: list[str] = []
+    for partition in get_test_partitions(session):
+        if partition.upper_bound > now - retention:
+            continue
+        if detach:
+            session.execute(
+                text(f"ALTER TABLE {TEST_TABLE} DETACH PARTITION {partition.name}")
+            )
+        else:
+            session.execute(text(f"DROP TABLE {partition.name}"))
+        removed.append(partition.name)
+    return removed
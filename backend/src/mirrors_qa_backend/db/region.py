@@ -2,6 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session as OrmSession
 
+from mirrors_qa_backend.db.country_cache import invalidate_country_cache
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
 from mirrors_qa_backend.db.models import Country, Region
 
@@ -28,9 +29,11 @@ def get_region(session: OrmSession, region_code: str) -> Region:
 
 def create_region(session: OrmSession, *, region_code: str, region_name: str) -> Region:
     """Creates a new continental region in the database."""
-    session.execute(
+    if session.scalars(
         insert(Region)
         .values(code=region_code, name=region_name)
         .on_conflict_do_nothing(index_elements=["code"])
-    )
+        .returning(Region.code)
+    ).first():
+        invalidate_country_cache(session)
     return get_region(session, region_code)
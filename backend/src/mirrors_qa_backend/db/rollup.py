@@ -0,0 +1,135 @@
+import datetime
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.models import TestRollup
+from mirrors_qa_backend.enums import StatusEnum
+
+# column counting the tests of each status with a result
+STATUS_COLUMNS = {
+    StatusEnum.SUCCEEDED: "nb_succeeded",
+    StatusEnum.ERRORED: "nb_errored",
+    StatusEnum.MISSED: "nb_missed",
+}
+METRICS = ("speed", "latency", "duration")
+COUNT_COLUMNS = ("nb_tests", *STATUS_COLUMNS.values())
+SUM_COLUMNS = tuple(f"{metric}_sum" for metric in METRICS)
+
+
+@dataclass(frozen=True)
+class Result:
+    """Status and metrics of a test at some point in time."""
+
+    status: StatusEnum
+    speed: float | None = None
+    latency: float | None = None
+    duration: float | None = None
+
+
+@dataclass(frozen=True)
+class ResultChange:
+    """Change of the result of a test by an update."""
+
+    requested_on: datetime.datetime
+    mirror_id: str | None
+    country_code: str | None
+    previous: Result
+    current: Result
+
+
+def get_rollup_hour(requested_on: datetime.datetime) -> datetime.datetime:
+    return requested_on.replace(minute=0, second=0, microsecond=0)
+
+
+def _add_result(delta: dict[str, Any], result: Result, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) a result from the delta of a rollup row.
+
+    Bounds can only be extended so removed results are kept in bounds.
+    """
+    if result.status not in STATUS_COLUMNS:
+        return
+    delta["nb_tests"] += sign
+    delta[STATUS_COLUMNS[result.status]] += sign
+    for metric in METRICS:
+        if (value := getattr(result, metric)) is None:
+            continue
+        delta[f"{metric}_sum"] += sign * value
+        if sign < 0:
+            continue
+        for bound, pick in (("min", min), ("max", max)):
+            name = f"{metric}_{bound}"
+            delta[name] = value if delta[name] is None else pick(value, delta[name])
+
+
+def update_test_rollup(session: OrmSession, changes: Iterable[ResultChange]) -> int:
+    """Apply the changes of results of tests to the rollup of tests.
+
+    Changes are aggregated by rollup row and applied with a single upsert so
+    that each row is written once whatever the number of changes.
+
+    Returns the number of rollup rows written.
+    """
+    deltas: dict[tuple[datetime.datetime, str, str], dict[str, Any]] = {}
+    for change in changes:
+        if change.mirror_id is None or change.country_code is None:
+            continue
+        if change.previous == change.current:
+            continue
+        key = (
+            get_rollup_hour(change.requested_on),
+            change.mirror_id,
+            change.country_code,
+        )
+        if key not in deltas:
+            deltas[key] = dict.fromkeys((*COUNT_COLUMNS, *SUM_COLUMNS), 0) | {
+                f"{metric}_{bound}": None
+                for metric in METRICS
+                for bound in ("min", "max")
+            }
+        _add_result(deltas[key], change.previous, -1)
+        _add_result(deltas[key], change.current, 1)
+
+    if not deltas:
+        return 0
+
+    # Rows are written, and so locked, in the same order by all the
+    # transactions so that concurrent updates of the same rows don't deadlock
+    stmt = insert(TestRollup).values(
+        [
+            {"hour": hour, "mirror_id": mirror_id, "country_code": country_code} | delta
+            for (hour, mirror_id, country_code), delta in sorted(deltas.items())
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            TestRollup.hour,
+            TestRollup.mirror_id,
+            TestRollup.country_code,
+        ],
+        set_={
+            **{
+                name: getattr(TestRollup, name) + stmt.excluded[name]
+                for name in (*COUNT_COLUMNS, *SUM_COLUMNS)
+            },
+            # NULLs are ignored by LEAST and GREATEST
+            **{
+                f"{metric}_min": func.least(
+                    getattr(TestRollup, f"{metric}_min"), stmt.excluded[f"{metric}_min"]
+                )
+                for metric in METRICS
+            },
+            **{
+                f"{metric}_max": func.greatest(
+                    getattr(TestRollup, f"{metric}_max"), stmt.excluded[f"{metric}_max"]
+                )
+                for metric in METRICS
+            },
+        },
+    )
+    session.execute(stmt)
+    return len(deltas)
@@ -0,0 +1,116 @@
+import datetime
+from collections.abc import Iterable
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.models import TestSketch
+from mirrors_qa_backend.db.rollup import STATUS_COLUMNS, Result, ResultChange
+from mirrors_qa_backend.sketch import LogHistogram
+
+# metrics of tests whose distribution is sketched
+SKETCHED_METRICS = ("speed", "latency")
+
+
+def _get_value(result: Result, metric: str) -> float | None:
+    """Value of the metric of a result if it is part of the distributions"""
+    if result.status not in STATUS_COLUMNS:
+        return None
+    return getattr(result, metric)
+
+
+def update_test_sketches(session: OrmSession, changes: Iterable[ResultChange]) -> int:
+    """Apply the changes of results of tests to the sketches of their day.
+
+    Changes are aggregated by sketch. As sketches are merged outside of the
+    database, the sketches to update are created if missing then locked so
+    that concurrent updates are applied one after the other.
+
+    Returns the number of sketches updated.
+    """
+    deltas: dict[tuple[datetime.date, str, str], dict[str, LogHistogram]] = {}
+    for change in changes:
+        if change.mirror_id is None or change.country_code is None:
+            continue
+        key = (change.requested_on.date(), change.mirror_id, change.country_code)
+        for metric in SKETCHED_METRICS:
+            previous = _get_value(change.previous, metric)
+            current = _get_value(change.current, metric)
+            if previous == current:
+                continue
+            if key not in deltas:
+                deltas[key] = {metric: LogHistogram() for metric in SKETCHED_METRICS}
+            if previous is not None:
+                deltas[key][metric].add(previous, -1)
+            if current is not None:
+                deltas[key][metric].add(current)
+
+    if not deltas:
+        return 0
+
+    # Sketches are created, and then locked, in the same order by all the
+    # transactions so that concurrent updates of the same sketches don't deadlock
+    keys = sorted(deltas)
+    empty_sketch = LogHistogram().to_bytes()
+    session.execute(
+        insert(TestSketch)
+        .values(
+            [
+                {
+                    "day": day,
+                    "mirror_id": mirror_id,
+                    "country_code": country_code,
+                    **dict.fromkeys(SKETCHED_METRICS, empty_sketch),
+                }
+                for day, mirror_id, country_code in keys
+            ]
+        )
+        .on_conflict_do_nothing()
+    )
+    for sketch in session.scalars(
+        select(TestSketch)
+        .where(
+            tuple_(TestSketch.day, TestSketch.mirror_id, TestSketch.country_code).in_(
+                keys
+            )
+        )
+        .order_by(TestSketch.day, TestSketch.mirror_id, TestSketch.country_code)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ):
+        delta = deltas[(sketch.day, sketch.mirror_id, sketch.country_code)]
+        for metric in SKETCHED_METRICS:
+            histogram = LogHistogram.from_bytes(getattr(sketch, metric))
+            histogram.merge(delta[metric])
+            setattr(sketch, metric, histogram.to_bytes())
+    session.flush()
+    return len(deltas)
+
+
+def merge_test_sketches(
+    session: OrmSession,
+    *,
+    since: datetime.date,
+    until: datetime.date,
+    mirror_id: str | None = None,
+    country_code: str | None = None,
+) -> dict[str, LogHistogram]:
+    """Distribution of each sketched metric of the tests requested from since to
+    until (both included), optionally of a mirror and/or country.
+
+    Only the sketches of the days are read, tests are not scanned.
+    """
+    stmt = select(*(getattr(TestSketch, metric) for metric in SKETCHED_METRICS)).where(
+        TestSketch.day >= since, TestSketch.day <= until
+    )
+    if mirror_id is not None:
+        stmt = stmt.where(TestSketch.mirror_id == mirror_id)
+    if country_code is not None:
+        stmt = stmt.where(TestSketch.country_code == country_code)
+
+    histograms = {metric: LogHistogram() for metric in SKETCHED_METRICS}
+    for row in session.execute(stmt):
+        for metric, data in zip(SKETCHED_METRICS, row, strict=True):
+            histograms[metric].merge(LogHistogram.from_bytes(data))
+    return histograms
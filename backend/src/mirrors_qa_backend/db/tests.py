@@ -1,23 +1,75 @@
 import datetime
+from collections import Counter
 from dataclasses import dataclass
-from ipaddress import IPv4Address
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import UnaryExpression, asc, desc, func, select, update
+from sqlalchemy import (
+    CTE,
+    ColumnElement,
+    Row,
+    Select,
+    UnaryExpression,
+    and_,
+    asc,
+    cast,
+    column,
+    desc,
+    false,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.orm import InstrumentedAttribute
 from sqlalchemy.orm import Session as OrmSession
 
+from mirrors_qa_backend import logger, schemas
+from mirrors_qa_backend.db import count_from_stmt, estimate_count_from_stmt
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
-from mirrors_qa_backend.db.models import Mirror, Test, Worker
-from mirrors_qa_backend.enums import SortDirectionEnum, StatusEnum, TestSortColumnEnum
+from mirrors_qa_backend.db.models import Mirror, Test, Worker, WorkerCountry
+from mirrors_qa_backend.db.notifications import NEW_TESTS_CHANNEL, notify
+from mirrors_qa_backend.db.rollup import Result, ResultChange, update_test_rollup
+from mirrors_qa_backend.db.sketches import update_test_sketches
+from mirrors_qa_backend.enums import (
+    CountModeEnum,
+    SortDirectionEnum,
+    StatusEnum,
+    TestSortColumnEnum,
+    UpdateStatusEnum,
+)
 from mirrors_qa_backend.settings import Settings
 
 
+@dataclass
+class TestCursor:
+    """Position of the last test of a page in a keyset-paginated listing.
+
+    Holds the values of the columns the listing is sorted on so that the next
+    page can seek directly past them instead of skipping rows with an OFFSET.
+    """
+
+    sort_value: Any
+    requested_on: datetime.datetime
+    id: UUID
+
+
 @dataclass
 class TestListResult:
     """Result of query to list tests from the database."""
 
-    nb_tests: int
-    tests: list[Test]
+    # Total number of tests matching the filters, None if it was not computed
+    nb_tests: int | None
+    # rows of LISTED_TEST_COLUMNS
+    tests: list[Row[Any]]
+    # How nb_tests was computed
+    count_mode: CountModeEnum = CountModeEnum.exact
+    # Cursor to fetch the page after this one, None if this is the last page
+    next_cursor: TestCursor | None = None
 
 
 def filter_test(
@@ -48,6 +100,66 @@ def get_test(session: OrmSession, test_id: UUID) -> Test:
     return test
 
 
+def _sorted_after(
+    column: InstrumentedAttribute[Any], direction: SortDirectionEnum, value: Any
+) -> ColumnElement[bool]:
+    """Condition for rows sorted strictly after value on column.
+
+    Follows PostgreSQL NULL ordering: NULLs come last in ascending order and
+    first in descending order.
+    """
+    if direction == SortDirectionEnum.asc:
+        if value is None:
+            return false()
+        if Test.__mapper__.columns[column.key].nullable:
+            return or_(column > value, column.is_(None))
+        return column > value
+    if value is None:
+        return column.is_not(None)
+    return column < value
+
+
+def _sorted_equal(
+    column: InstrumentedAttribute[Any], value: Any
+) -> ColumnElement[bool]:
+    if value is None:
+        return column.is_(None)
+    return column == value
+
+
+def _count_tests(
+    session: OrmSession, stmt: Select[Any], count_mode: CountModeEnum
+) -> tuple[int, CountModeEnum]:
+    """Count the records of stmt using count_mode.
+
+    Returns the count and the mode that was actually used to compute it:
+    estimated counts are exact if there are less records than
+    Settings.ESTIMATED_COUNT_THRESHOLD.
+    """
+    if count_mode == CountModeEnum.exact:
+        return count_from_stmt(session, stmt), CountModeEnum.exact
+
+    threshold = Settings.ESTIMATED_COUNT_THRESHOLD
+    nb_records = count_from_stmt(session, stmt, limit=threshold + 1)
+    if nb_records <= threshold:
+        return nb_records, CountModeEnum.exact
+    # Past the threshold, fall back on the planner's estimate which may lag
+    # behind the table statistics but is at least the number we counted.
+    return (
+        max(nb_records, estimate_count_from_stmt(session, stmt)),
+        CountModeEnum.estimated,
+    )
+
+
+# Columns of the listed tests: the fields of their representation, in the same
+# order, followed by the columns they can only be sorted on. Tests are listed as
+# rows of plain values rather than as ORM objects which are costly to build.
+LISTED_TEST_COLUMNS = (
+    *(getattr(Test, name) for name in schemas.Test.model_fields),
+    Test.worker_id,
+)
+
+
 def list_tests(
     session: OrmSession,
     *,
@@ -58,89 +170,314 @@ def list_tests(
     page_size: int = Settings.MAX_PAGE_SIZE,
     sort_column: TestSortColumnEnum = TestSortColumnEnum.requested_on,
     sort_direction: SortDirectionEnum = SortDirectionEnum.asc,
+    after: TestCursor | None = None,
+    count_mode: CountModeEnum | None = None,
 ) -> TestListResult:
+    """List tests matching the filters.
+
+    Pages are selected using page_num unless a cursor is provided in which
+    case the tests sorted after the cursor are returned and page_num is ignored.
+
+    The total number of tests is computed according to count_mode. It defaults
+    to an exact count when paging with page_num and no count with a cursor.
+    """
 
     # If no status is provided, populate status with all the allowed values
     if statuses is None:
         statuses = list(StatusEnum)
 
-    if sort_direction == SortDirectionEnum.asc:
-        direction = asc
-    else:
-        direction = desc
-
     # By default, we want to sort tests on requested_on. However, if a client
-    # provides a sort_column, we give their sort_column a higher priority
-    order_by: tuple[UnaryExpression[str], ...]
+    # provides a sort_column, we give their sort_column a higher priority.
+    # The id is always used as the last sort key to guarantee a stable order
+    # across pages.
+    sort_keys: list[tuple[InstrumentedAttribute[Any], SortDirectionEnum]]
     if sort_column != TestSortColumnEnum.requested_on:
-        order_by = (
-            direction(sort_column.name),
-            asc(TestSortColumnEnum.requested_on.name),
-        )
+        sort_keys = [
+            (getattr(Test, sort_column.name), sort_direction),
+            (Test.requested_on, SortDirectionEnum.asc),
+            (Test.id, SortDirectionEnum.asc),
+        ]
     else:
-        order_by = (direction(sort_column.name),)
+        sort_keys = [
+            (Test.requested_on, sort_direction),
+            (Test.id, sort_direction),
+        ]
+
+    order_by: list[UnaryExpression[Any]] = [
+        asc(column) if direction == SortDirectionEnum.asc else desc(column)
+        for column, direction in sort_keys
+    ]
 
     # If a client provides an argument i.e it is not None, we compare the corresponding
     # model field against the argument, otherwise, we compare the argument to
     # its default in the database which translates to a SQL true i.e we don't
     # filter based on this argument.
+    filters: list[ColumnElement[bool]] = [
+        (Test.worker_id == worker_id) | (worker_id is None),
+        (Test.country_code == country_code) | (country_code is None),
+        (Test.status.in_(statuses)),
+    ]
+
+    if count_mode is None:
+        count_mode = CountModeEnum.exact if after is None else CountModeEnum.none
+
+    # One more test than the page size is fetched to find out if there is
+    # a next page.
     query = (
-        select(func.count().over().label("total_records"), Test)
-        .where(
-            (Test.worker_id == worker_id) | (worker_id is None),
-            (Test.country_code == country_code) | (country_code is None),
-            (Test.status.in_(statuses)),
-        )
+        select(*LISTED_TEST_COLUMNS)
+        .where(*filters)
         .order_by(*order_by)
-        .offset((page_num - 1) * page_size)
-        .limit(page_size)
+        .limit(page_size + 1)
     )
+    if after is None:
+        query = query.offset((page_num - 1) * page_size)
+    else:
+        if sort_column != TestSortColumnEnum.requested_on:
+            cursor_values = [after.sort_value, after.requested_on, after.id]
+        else:
+            cursor_values = [after.requested_on, after.id]
+        # Seek past the cursor: a row comes after the cursor if it is sorted
+        # after it on the first key, or equal on the first key and sorted
+        # after it on the second key, and so on.
+        seek_conditions: list[ColumnElement[bool]] = []
+        for index, ((column, direction), value) in enumerate(
+            zip(sort_keys, cursor_values, strict=True)
+        ):
+            seek_conditions.append(
+                and_(
+                    *(
+                        _sorted_equal(prev_column, prev_value)
+                        for (prev_column, _), prev_value in zip(
+                            sort_keys[:index], cursor_values[:index], strict=True
+                        )
+                    ),
+                    _sorted_after(column, direction, value),
+                )
+            )
+        query = query.where(or_(*seek_conditions))
 
-    result = TestListResult(nb_tests=0, tests=[])
+    result = TestListResult(nb_tests=None, tests=[], count_mode=count_mode)
+
+    if count_mode == CountModeEnum.exact and after is None:
+        # Count the records in the same query as fetching them. Because the
+        # SQL window function returns the total_records for every row,
+        # assign that value to the nb_tests
+        result.nb_tests = 0
+        for row in session.execute(
+            query.add_columns(func.count().over().label("total_records"))
+        ).all():
+            result.nb_tests = row.total_records
+            result.tests.append(row)
+    else:
+        result.tests = list(session.execute(query).all())
+        if count_mode != CountModeEnum.none:
+            result.nb_tests, result.count_mode = _count_tests(
+                session, select(Test.id).where(*filters), count_mode
+            )
 
-    for total_records, test in session.execute(query).all():
-        # Because the SQL window function returns the total_records
-        # for every row, assign that value to the nb_tests
-        result.nb_tests = total_records
-        result.tests.append(test)
+    if len(result.tests) > page_size:
+        result.tests = result.tests[:page_size]
+        last_test = result.tests[-1]
+        result.next_cursor = TestCursor(
+            sort_value=getattr(last_test, sort_column.name),
+            requested_on=last_test.requested_on,
+            id=last_test.id,
+        )
 
     return result
 
 
-def update_test(
+# columns of the result of a test which are rolled up
+_RESULT_COLUMNS = ("status", "speed", "latency", "duration")
+
+
+def _get_result(test: Test | Row[Any], prefix: str = "") -> Result:
+    return Result(
+        **{name: getattr(test, f"{prefix}{name}") for name in _RESULT_COLUMNS}
+    )
+
+
+def _select_previous_results(stmt: Select[Any], *, skip_locked: bool = False) -> CTE:
+    """Lock the tests selected by stmt and select their result before update.
+
+    An UPDATE can only return the updated values so the results of the tests
+    are selected before they are updated in order to update the rollup of
+    tests. As rows are locked, concurrent updates of a test see the result of
+    the previous update. Tests locked by others are skipped if skip_locked.
+    """
+    return (
+        stmt.add_columns(
+            Test.requested_on,
+            Mirror.id.label("mirror_id"),
+            *(
+                getattr(Test, name).label(f"previous_{name}")
+                for name in _RESULT_COLUMNS
+            ),
+        )
+        .outerjoin(Mirror, Mirror.base_url == Test.mirror_url)
+        .with_for_update(of=Test, skip_locked=skip_locked)
+        .cte("previous")
+    )
+
+
+def _get_result_change_columns(previous: CTE) -> tuple[ColumnElement[Any], ...]:
+    """Columns of the results of tests to return from an update of tests joined
+    with the CTE of _select_previous_results"""
+    return (
+        Test.requested_on,
+        previous.c.mirror_id,
+        Test.country_code,
+        *(getattr(Test, name) for name in _RESULT_COLUMNS),
+        *(previous.c[f"previous_{name}"] for name in _RESULT_COLUMNS),
+    )
+
+
+def _record_result_changes(session: OrmSession, changes: list[ResultChange]) -> None:
+    """Update the rollup and sketches of tests with changes of their results"""
+    update_test_rollup(session, changes)
+    update_test_sketches(session, changes)
+
+
+def _get_result_change(row: Row[Any]) -> ResultChange:
+    return ResultChange(
+        requested_on=row.requested_on,
+        mirror_id=row.mirror_id,
+        country_code=row.country_code,
+        previous=_get_result(row, "previous_"),
+        current=_get_result(row),
+    )
+
+
+# columns which are only updated when a (truthy) value is provided, other
+# columns are left untouched
+_OPTIONAL_UPDATE_COLUMNS = (
+    "error",
+    "ip_address",
+    "asn",
+    "city",
+    "latency",
+    "download_size",
+    "duration",
+    "speed",
+    "started_on",
+    "isp",
+)
+
+
+def update_worker_test(
     session: OrmSession,
+    *,
+    worker_id: str,
     test_id: UUID,
+    test_update: schemas.UpdateTestModel,
+) -> Test | None:
+    """Update a test of a worker with a single UPDATE ... RETURNING.
+
+    The status is always updated while the _OPTIONAL_UPDATE_COLUMNS are only
+    updated if a value is provided. The rollup and sketches of tests are updated
+    accordingly.
+    Returns None if the test does not exist or belongs to another worker.
+    """
+    previous = _select_previous_results(
+        select(Test.id).where(Test.id == test_id, Test.worker_id == worker_id)
+    )
+    row = session.execute(
+        update(Test)
+        .where(Test.id == previous.c.id, Test.requested_on == previous.c.requested_on)
+        .values(
+            status=StatusEnum(test_update.status),
+            **{
+                name: value
+                for name in _OPTIONAL_UPDATE_COLUMNS
+                if (value := getattr(test_update, name))
+            },
+        )
+        .returning(Test, *_get_result_change_columns(previous))
+        .execution_options(populate_existing=True)
+    ).one_or_none()
+    if row is None:
+        return None
+    _record_result_changes(session, [_get_result_change(row)])
+    return row.Test
+
+
+def update_tests(
+    session: OrmSession,
     *,
-    status: StatusEnum = StatusEnum.PENDING,
-    error: str | None = None,
-    ip_address: IPv4Address | None = None,
-    asn: str | None = None,
-    city: str | None = None,
-    latency: float | None = None,
-    download_size: int | None = None,
-    duration: float | None = None,
-    speed: float | None = None,
-    started_on: datetime.datetime | None = None,
-    isp: str | None = None,
-) -> Test:
-    test = get_test(session, test_id)
-    # If a value is provided, it takes precedence over the default value of the model
-    test.status = status
-    test.error = error if error else test.error
-    test.ip_address = ip_address if ip_address else test.ip_address
-    test.asn = asn if asn else test.asn
-    test.city = city if city else test.city
-    test.latency = latency if latency else test.latency
-    test.download_size = download_size if download_size else test.download_size
-    test.duration = duration if duration else test.duration
-    test.speed = speed if speed else test.speed
-    test.started_on = started_on if started_on else test.started_on
-    test.isp = isp if isp else test.isp
+    worker_id: str,
+    updates: list[schemas.BulkUpdateTestModel],
+) -> dict[UUID, UpdateStatusEnum]:
+    """Update the tests of a worker with a single UPDATE ... FROM (VALUES ...).
 
-    session.add(test)
-    session.flush()
+    The status is always updated while the _OPTIONAL_UPDATE_COLUMNS are only
+    updated if a value is provided. The rollup and sketches of tests are updated
+    accordingly. Tests which do not exist or which belong
+    to another worker are left untouched. If a test is updated several times, the last
+    update wins.
+    Returns the outcome of the update of each test.
+    """
+    updates_by_id = {test_update.id: test_update for test_update in updates}
+    owners: dict[UUID, str | None] = dict(
+        session.execute(
+            select(Test.id, Test.worker_id).where(Test.id.in_(updates_by_id))
+        ).all()
+    )
+    results: dict[UUID, UpdateStatusEnum] = {}
+    rows: list[tuple[Any, ...]] = []
+    for test_id, test_update in updates_by_id.items():
+        if test_id not in owners:
+            results[test_id] = UpdateStatusEnum.not_found
+        elif owners[test_id] != worker_id:
+            results[test_id] = UpdateStatusEnum.forbidden
+        else:
+            results[test_id] = UpdateStatusEnum.updated
+            rows.append(
+                (
+                    test_id,
+                    StatusEnum(test_update.status),
+                    *(
+                        getattr(test_update, name) or None
+                        for name in _OPTIONAL_UPDATE_COLUMNS
+                    ),
+                )
+            )
 
-    return test
+    if rows:
+        data = values(
+            *(
+                column(name, Test.__table__.c[name].type)
+                for name in ("id", "status", *_OPTIONAL_UPDATE_COLUMNS)
+            ),
+            name="data",
+        ).data(rows)
+        previous = _select_previous_results(
+            select(Test.id).where(
+                Test.id.in_([row[0] for row in rows]), Test.worker_id == worker_id
+            )
+        )
+        changes = session.execute(
+            update(Test)
+            .where(
+                Test.id == data.c.id,
+                Test.id == previous.c.id,
+                Test.requested_on == previous.c.requested_on,
+            )
+            .values(
+                status=data.c.status,
+                **{
+                    name: func.coalesce(
+                        # NULLs are rendered untyped in VALUES and default to text
+                        cast(data.c[name], Test.__table__.c[name].type),
+                        Test.__table__.c[name],
+                    )
+                    for name in _OPTIONAL_UPDATE_COLUMNS
+                },
+            )
+            .returning(*_get_result_change_columns(previous))
+            .execution_options(synchronize_session="fetch")
+        ).all()
+        _record_result_changes(session, [_get_result_change(row) for row in changes])
+    return results
 
 
 def create_test(
@@ -159,18 +496,159 @@ def create_test(
     return test
 
 
-def expire_tests(session: OrmSession, interval: datetime.timedelta) -> list[Test]:
-    """Change the status of PENDING tests created before the interval to MISSED"""
-    end = datetime.datetime.now() - interval
-    begin = datetime.datetime.fromtimestamp(0)
-    return list(
+def create_tests(session: OrmSession, *, worker: Worker) -> int:
+    """Create a PENDING test for every enabled mirror in every country of worker.
+
+    The whole test matrix of the worker is built in a single INSERT ... SELECT.
+    Workers waiting for tests are notified once the transaction commits.
+    Returns the number of tests created.
+    """
+    requested_on = datetime.datetime.now()
+    nb_tests = len(
+        session.scalars(
+            insert(Test)
+            .from_select(
+                ["requested_on", "status", "country_code", "worker_id", "mirror_url"],
+                select(
+                    literal(requested_on, Test.requested_on.type),
+                    literal(StatusEnum.PENDING, Test.status.type),
+                    WorkerCountry.country_code,
+                    WorkerCountry.worker_id,
+                    Mirror.base_url,
+                )
+                .join(Mirror, true())
+                .where(
+                    WorkerCountry.worker_id == worker.id,
+                    Mirror.enabled == True,  # noqa: E712
+                ),
+            )
+            .returning(Test.id)
+        ).all()
+    )
+    if nb_tests:
+        notify(session, NEW_TESTS_CHANNEL, worker.id)
+    return nb_tests
+
+
+def count_pending_tests_by_worker(session: OrmSession) -> dict[str, int]:
+    """Number of tests waiting for their results (PENDING or LEASED) by worker"""
+    return dict(
+        session.execute(
+            select(Test.worker_id, func.count(Test.id))
+            .where(
+                Test.status.in_([StatusEnum.PENDING, StatusEnum.LEASED]),
+                Test.worker_id.is_not(None),
+            )
+            .group_by(Test.worker_id)
+        ).all()
+    )
+
+
+def lease_tests(
+    session: OrmSession,
+    *,
+    worker_id: str,
+    nb_tests: int,
+    lease_expires_on: datetime.datetime,
+) -> list[Test]:
+    """Claim up to nb_tests PENDING tests of a worker until lease_expires_on.
+
+    Claimed tests are LEASED so they are not handed out again. Tests locked by
+    a concurrent lease are skipped rather than waited for, so two callers never
+    claim the same test.
+    """
+    leasable_tests = (
+        select(Test.id)
+        .where(Test.worker_id == worker_id, Test.status == StatusEnum.PENDING)
+        .order_by(Test.requested_on, Test.id)
+        .limit(nb_tests)
+        .with_for_update(skip_locked=True)
+    )
+    tests = session.scalars(
+        update(Test)
+        .where(Test.id.in_(leasable_tests.scalar_subquery()))
+        .values(
+            status=StatusEnum.LEASED,
+            lease_expires_on=lease_expires_on,
+        )
+        .returning(Test)
+    ).all()
+    return sorted(tests, key=lambda test: (test.requested_on, test.id))
+
+
+def release_expired_leases(session: OrmSession) -> int:
+    """Give LEASED tests whose lease has expired back to the PENDING tests.
+
+    Returns the number of tests released.
+    """
+    return len(
         session.scalars(
             update(Test)
             .where(
-                Test.requested_on.between(begin, end),
-                Test.status == StatusEnum.PENDING,
+                Test.status == StatusEnum.LEASED,
+                Test.lease_expires_on <= datetime.datetime.now(),
             )
-            .values(status=StatusEnum.MISSED)
-            .returning(Test)
+            .values(status=StatusEnum.PENDING, lease_expires_on=None)
+            .returning(Test.id)
         ).all()
     )
+
+
+@dataclass
+class ExpiredTestsCount:
+    """Number of tests of a worker and country which have expired"""
+
+    worker_id: str | None
+    country_code: str | None
+    nb_tests: int
+
+
+def expire_tests(
+    session: OrmSession, interval: datetime.timedelta, *, batch_size: int
+) -> list[ExpiredTestsCount]:
+    """Change the status of up to batch_size PENDING tests created before the
+    interval to MISSED
+
+    Tests whose lease has expired are first given back to the PENDING tests.
+    Expiring all the tests takes as many calls (and transactions) as needed
+    until fewer than batch_size tests are expired. The rollup and sketches of
+    tests are updated with the expired tests.
+    """
+    if nb_released := release_expired_leases(session):
+        logger.info(f"Released {nb_released} test(s) with an expired lease")
+
+    expired_tests = _select_previous_results(
+        select(Test.id)
+        .where(
+            Test.status == StatusEnum.PENDING,
+            Test.requested_on <= datetime.datetime.now() - interval,
+        )
+        .order_by(Test.requested_on)
+        .limit(batch_size),
+        skip_locked=True,
+    )
+    rows = session.execute(
+        update(Test)
+        .where(
+            Test.id == expired_tests.c.id,
+            Test.requested_on == expired_tests.c.requested_on,
+        )
+        .values(status=StatusEnum.MISSED)
+        .returning(
+            Test.worker_id,
+            *_get_result_change_columns(expired_tests),
+        )
+        .execution_options(synchronize_session="fetch")
+    ).all()
+    _record_result_changes(session, [_get_result_change(row) for row in rows])
+    counts: Counter[tuple[str | None, str | None]] = Counter(
+        (row.worker_id, row.country_code) for row in rows
+    )
+    return [
+        ExpiredTestsCount(
+            worker_id=worker_id, country_code=country_code, nb_tests=nb_tests
+        )
+        for (worker_id, country_code), nb_tests in sorted(
+            counts.items(), key=lambda item: (item[0][0] or "", item[0][1] or "")
+        )
+    ]
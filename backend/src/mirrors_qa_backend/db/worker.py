@@ -1,8 +1,10 @@
 import datetime
+from dataclasses import dataclass
 
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.orm import selectinload
 
 from mirrors_qa_backend.cryptography import (
     get_public_key_fingerprint,
@@ -13,7 +15,17 @@ from mirrors_qa_backend.db.exceptions import (
     DuplicatePrimaryKeyError,
     RecordDoesNotExistError,
 )
-from mirrors_qa_backend.db.models import Worker
+from mirrors_qa_backend.db.models import Test, Worker
+from mirrors_qa_backend.db.notifications import WORKER_UPDATED_CHANNEL, notify
+from mirrors_qa_backend.enums import StatusEnum
+
+
+@dataclass
+class IdleWorker:
+    """An idle worker along with the number of its tests still pending."""
+
+    worker: Worker
+    nb_pending_tests: int
 
 
 def get_worker_or_none(session: OrmSession, worker_id: str) -> Worker | None:
@@ -26,6 +38,18 @@ def get_worker(session: OrmSession, worker_id: str) -> Worker:
     raise RecordDoesNotExistError(f"Worker with id: {worker_id} does not exist.")
 
 
+def get_worker_with_countries(session: OrmSession, worker_id: str) -> Worker:
+    """Get a worker along with its countries, loaded with one additional query."""
+    worker = session.scalars(
+        select(Worker)
+        .where(Worker.id == worker_id)
+        .options(selectinload(Worker.countries))
+    ).one_or_none()
+    if worker is None:
+        raise RecordDoesNotExistError(f"Worker with id: {worker_id} does not exist.")
+    return worker
+
+
 def create_worker(
     session: OrmSession,
     worker_id: str,
@@ -44,6 +68,9 @@ def create_worker(
     )
 
     update_worker_countries(session, worker, country_codes)
+    # Let the API processes know that any worker they cached with this id (and
+    # thus another public key) is stale
+    notify(session, WORKER_UPDATED_CHANNEL, worker_id)
 
     return worker
 
@@ -60,6 +87,8 @@ def update_worker(
     session: OrmSession, worker_id: str, country_codes: list[str]
 ) -> Worker:
     worker = get_worker(session, worker_id)
+    # Countries are not part of the workers cached by the API processes which
+    # thus need not be notified
     return update_worker_countries(session, worker, country_codes)
 
 
@@ -82,6 +111,33 @@ def get_idle_workers(session: OrmSession, interval: datetime.timedelta) -> list[
     return get_workers_last_seen_in_range(session, begin, end)
 
 
+def get_idle_workers_with_pending_tests(
+    session: OrmSession, interval: datetime.timedelta
+) -> list[IdleWorker]:
+    """Get idle workers with their countries and number of pending tests.
+
+    Pending tests (including the LEASED ones which have not been reported yet)
+    are counted in the same query as the workers and the
+    countries of all the workers are loaded with a single additional query.
+    """
+    end = datetime.datetime.now() - interval
+    begin = datetime.datetime.fromtimestamp(0)
+    return [
+        IdleWorker(worker=worker, nb_pending_tests=nb_pending_tests)
+        for worker, nb_pending_tests in session.execute(
+            select(Worker, func.count(Test.id))
+            .outerjoin(
+                Test,
+                (Test.worker_id == Worker.id)
+                & (Test.status.in_([StatusEnum.PENDING, StatusEnum.LEASED])),
+            )
+            .where(Worker.last_seen_on.between(begin, end))
+            .group_by(Worker.id)
+            .options(selectinload(Worker.countries))
+        ).all()
+    ]
+
+
 def get_active_workers(
     session: OrmSession, interval: datetime.timedelta
 ) -> list[Worker]:
@@ -90,7 +146,9 @@ def get_active_workers(
     return get_workers_last_seen_in_range(session, begin, end)
 
 
-def update_worker_last_seen(session: OrmSession, worker: Worker) -> Worker:
-    worker.last_seen_on = datetime.datetime.now()
-    session.add(worker)
-    return worker
+def update_worker_last_seen(session: OrmSession, worker_id: str) -> None:
+    session.execute(
+        update(Worker)
+        .where(Worker.id == worker_id)
+        .values(last_seen_on=datetime.datetime.now())
+    )
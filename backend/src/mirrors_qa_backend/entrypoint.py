@@ -16,8 +16,10 @@ from mirrors_qa_backend.cli.mirrors import (
     update_mirror_region,
     update_mirrors,
 )
+from mirrors_qa_backend.cli.partitions import maintain_partitions
 from mirrors_qa_backend.cli.scheduler import main as start_scheduler
 from mirrors_qa_backend.cli.worker import create_worker, update_worker
+from mirrors_qa_backend.settings import Settings
 from mirrors_qa_backend.settings.scheduler import SchedulerSettings
 
 UPDATE_MIRRORS_CLI = "update-mirrors"
@@ -26,6 +28,7 @@ CREATE_WORKER_CLI = "create-worker"
 UPDATE_WORKER_CLI = "update-worker"
 SCHEDULER_CLI = "scheduler"
 CREATE_COUNTRY_REGIONS_CLI = "create-countries"
+MAINTAIN_PARTITIONS_CLI = "maintain-partitions"
 
 
 def main():
@@ -76,6 +79,43 @@ def main():
         default=SchedulerSettings.EXPIRE_TEST_SECONDS,
         metavar="duration",
     )
+    scheduler_cli.add_argument(
+        "--expire-tests-batch-size",
+        help="Maximum number of tests expired in a single transaction",
+        type=int,
+        dest="expire_tests_batch_size",
+        default=SchedulerSettings.EXPIRE_TESTS_BATCH_SIZE,
+        metavar="size",
+    )
+
+    maintain_partitions_cli = subparsers.add_parser(
+        MAINTAIN_PARTITIONS_CLI,
+        help="Create upcoming monthly partitions of tests and remove expired ones.",
+    )
+    maintain_partitions_cli.add_argument(
+        "--months-ahead",
+        help="Number of partitions to create ahead of the current month.",
+        type=int,
+        dest="months_ahead",
+        default=Settings.TEST_PARTITIONS_AHEAD,
+        metavar="months",
+    )
+    maintain_partitions_cli.add_argument(
+        "--retention",
+        help=(
+            "Remove partitions whose tests are all older than duration "
+            "(default: keep all partitions)."
+        ),
+        type=parse_timespan,
+        dest="retention_seconds",
+        default=Settings.TESTS_RETENTION_SECONDS,
+        metavar="duration",
+    )
+    maintain_partitions_cli.add_argument(
+        "--detach",
+        help="Detach expired partitions from the tests instead of dropping them.",
+        action="store_true",
+    )
 
     # Parser for holding shared arguments for worker sub-commands
     worker_parser = argparse.ArgumentParser(add_help=False)
@@ -169,7 +209,20 @@ def main():
             args.scheduler_sleep_seconds,
             args.expire_tests_since,
             args.workers_since,
+            args.expire_tests_batch_size,
         )
+    elif args.cli_name == MAINTAIN_PARTITIONS_CLI:
+        try:
+            logger.debug("Maintaining partitions of tests...")
+            maintain_partitions(
+                months_ahead=args.months_ahead,
+                retention_seconds=args.retention_seconds,
+                detach=args.detach,
+            )
+        except Exception as exc:
+            logger.error(f"error while maintaining partitions: {exc!s}")
+            sys.exit(1)
+        logger.info("Maintained partitions of tests.")
     elif args.cli_name == CREATE_WORKER_CLI:
         try:
             logger.debug(f"Creating worker {args.worker_id!r}...")
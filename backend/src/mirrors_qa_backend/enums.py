@@ -5,6 +5,8 @@ class StatusEnum(Enum):
     """Status of a test in the database."""
 
     PENDING = "PENDING"
+    # claimed by a worker until the lease expires
+    LEASED = "LEASED"
     MISSED = "MISSED"
     SUCCEEDED = "SUCCEEDED"
     ERRORED = "ERRORED"
@@ -26,3 +28,21 @@ class SortDirectionEnum(Enum):
 
     asc = "asc"
     desc = "desc"
+
+
+class CountModeEnum(Enum):
+    """How the total number of records of a listing is computed"""
+
+    exact = "exact"
+    # exact count up to a threshold, query planner's estimate beyond it
+    estimated = "estimated"
+    none = "none"
+
+
+class UpdateStatusEnum(Enum):
+    """Outcome of the update of a record in a bulk update"""
+
+    updated = "updated"
+    not_found = "not_found"
+    # the record belongs to someone else
+    forbidden = "forbidden"
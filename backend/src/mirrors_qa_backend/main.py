@@ -2,14 +2,21 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from mirrors_qa_backend.db import initialize_mirrors, upgrade_db_schema
-from mirrors_qa_backend.routes import auth, health, tests, worker
+from mirrors_qa_backend.db import (
+    initialize_mirrors,
+    read_primary_after_write,
+    upgrade_db_schema,
+)
+from mirrors_qa_backend.db.notifications import notifications_listener
+from mirrors_qa_backend.metrics import record_request_metrics
+from mirrors_qa_backend.routes import auth, health, metrics, tests, worker
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     upgrade_db_schema()
     initialize_mirrors()
+    notifications_listener.start()
     yield
 
 
@@ -20,6 +27,10 @@ def create_app(*, debug: bool = True):
     app.include_router(router=auth.router)
     app.include_router(router=worker.router)
     app.include_router(router=health.router)
+    app.include_router(router=metrics.router)
+
+    app.middleware("http")(record_request_metrics)
+    app.middleware("http")(read_primary_after_write)
 
     return app
 
@@ -0,0 +1,106 @@
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+from prometheus_client import Counter, Gauge, Histogram
+
+from mirrors_qa_backend import logger
+from mirrors_qa_backend.settings import Settings
+
+# label of the requests which did not match any route
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter(
+    "mirrors_qa_http_requests",
+    "HTTP requests handled, by route and status code",
+    ["method", "route", "status_code"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "mirrors_qa_http_request_duration_seconds",
+    "Duration of the HTTP requests, by route",
+    ["method", "route"],
+)
+HTTP_REQUEST_DB_STATEMENTS = Histogram(
+    "mirrors_qa_http_request_db_statements",
+    "Number of database statements executed by the HTTP requests, by route",
+    ["method", "route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, float("inf")),
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "mirrors_qa_db_pool_checkout_duration_seconds",
+    "Time spent waiting for a database connection, by pool",
+    ["pool"],
+)
+DB_POOL_CONNECTIONS_IN_USE = Gauge(
+    "mirrors_qa_db_pool_connections_in_use",
+    "Database connections checked out, by pool",
+    ["pool"],
+)
+DB_STATEMENT_DURATION = Histogram(
+    "mirrors_qa_db_statement_duration_seconds",
+    "Duration of the database statements, by operation",
+    ["operation"],
+)
+PENDING_TESTS = Gauge(
+    "mirrors_qa_pending_tests",
+    "Tests waiting for their results (PENDING or LEASED), by worker",
+    ["worker_id"],
+)
+TEST_RESULTS = Counter(
+    "mirrors_qa_test_results",
+    "Test results received from the workers, by status",
+    ["status"],
+)
+
+
+@dataclass
+class RequestStatements:
+    """Database statements executed while handling a request."""
+
+    count: int = 0
+
+
+# statements of the request being handled, None outside of requests
+current_request_statements: ContextVar[RequestStatements | None] = ContextVar(
+    "current_request_statements", default=None
+)
+
+
+async def record_request_metrics(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Middleware recording the number and duration of requests of each route.
+
+    Requests executing more than Settings.MAX_REQUEST_STATEMENTS database
+    statements are logged.
+    """
+    status_code = 500
+    started_on = time.perf_counter()
+    # the context, and so the statements, are shared with the route handler
+    request_statements = RequestStatements()
+    token = current_request_statements.set(request_statements)
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - started_on
+        current_request_statements.reset(token)
+        # use the path template of the route to keep the number of labels bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", UNMATCHED_ROUTE)
+        HTTP_REQUESTS.labels(request.method, route_path, status_code).inc()
+        HTTP_REQUEST_DURATION.labels(request.method, route_path).observe(duration)
+        HTTP_REQUEST_DB_STATEMENTS.labels(request.method, route_path).observe(
+            request_statements.count
+        )
+        if (
+            Settings.MAX_REQUEST_STATEMENTS is not None
+            and request_statements.count > Settings.MAX_REQUEST_STATEMENTS
+        ):
+            logger.warning(
+                f"{request.method} {route_path} executed "
+                f"{request_statements.count} database statements"
+            )
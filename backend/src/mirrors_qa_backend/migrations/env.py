@@ -1,4 +1,5 @@
 import os
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -21,6 +22,17 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# Partitions of the test table are managed by maintain-partitions
+TEST_PARTITION_RE = re.compile(r"test_(default|y\d{4}m\d{2})")
+
+
+def include_name(name, type_, _parent_names):
+    """Exclude the partitions of tests from autogenerate."""
+    if type_ == "table":
+        return not TEST_PARTITION_RE.fullmatch(name)
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -43,6 +55,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -61,7 +74,11 @@ def run_migrations_online() -> None:
     connectable = create_engine(os.getenv("POSTGRES_URI", ""), echo=False)
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
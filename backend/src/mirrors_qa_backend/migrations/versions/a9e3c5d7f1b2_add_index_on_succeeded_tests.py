@@ -0,0 +1,34 @@
+"""add index on succeeded tests
+
+Revision ID: a9e3c5d7f1b2
+Revises: d4a8f6b2c1e9
+Create Date: 2026-10-17 15:02:48.106392
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a9e3c5d7f1b2"
+down_revision = "d4a8f6b2c1e9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_test_succeeded_started_on",
+        "test",
+        ["started_on"],
+        unique=False,
+        postgresql_where=sa.text("status = 'SUCCEEDED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_test_succeeded_started_on",
+        table_name="test",
+        postgresql_where=sa.text("status = 'SUCCEEDED'"),
+    )
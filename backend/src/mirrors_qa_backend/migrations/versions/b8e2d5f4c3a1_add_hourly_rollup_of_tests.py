@@ -0,0 +1,78 @@
+"""add hourly rollup of tests
+
+Revision ID: b8e2d5f4c3a1
+Revises: f3b7c1d9a2e4
+Create Date: 2026-10-17 18:12:36.730918
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b8e2d5f4c3a1"
+down_revision = "f3b7c1d9a2e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "test_rollup",
+        sa.Column("hour", sa.DateTime(), nullable=False),
+        sa.Column("mirror_id", sa.String(), nullable=False),
+        sa.Column("country_code", sa.String(), nullable=False),
+        sa.Column("nb_tests", sa.Integer(), nullable=False),
+        sa.Column("nb_succeeded", sa.Integer(), nullable=False),
+        sa.Column("nb_errored", sa.Integer(), nullable=False),
+        sa.Column("nb_missed", sa.Integer(), nullable=False),
+        sa.Column("speed_sum", sa.Float(), nullable=False),
+        sa.Column("speed_min", sa.Float(), nullable=True),
+        sa.Column("speed_max", sa.Float(), nullable=True),
+        sa.Column("latency_sum", sa.Float(), nullable=False),
+        sa.Column("latency_min", sa.Float(), nullable=True),
+        sa.Column("latency_max", sa.Float(), nullable=True),
+        sa.Column("duration_sum", sa.Float(), nullable=False),
+        sa.Column("duration_min", sa.Float(), nullable=True),
+        sa.Column("duration_max", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["mirror_id"],
+            ["mirror.id"],
+            name=op.f("fk_test_rollup_mirror_id_mirror"),
+        ),
+        sa.PrimaryKeyConstraint(
+            "hour", "mirror_id", "country_code", name=op.f("pk_test_rollup")
+        ),
+    )
+    # Roll up the results reported so far
+    op.execute(
+        """
+        INSERT INTO test_rollup
+        SELECT
+            date_trunc('hour', test.requested_on),
+            mirror.id,
+            test.country_code,
+            count(*),
+            count(*) FILTER (WHERE test.status = 'SUCCEEDED'),
+            count(*) FILTER (WHERE test.status = 'ERRORED'),
+            count(*) FILTER (WHERE test.status = 'MISSED'),
+            coalesce(sum(test.speed), 0),
+            min(test.speed),
+            max(test.speed),
+            coalesce(sum(test.latency), 0),
+            min(test.latency),
+            max(test.latency),
+            coalesce(sum(test.duration), 0),
+            min(test.duration),
+            max(test.duration)
+        FROM test JOIN mirror ON mirror.base_url = test.mirror_url
+        WHERE
+            test.status IN ('SUCCEEDED', 'ERRORED', 'MISSED')
+            AND test.country_code IS NOT NULL
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("test_rollup")
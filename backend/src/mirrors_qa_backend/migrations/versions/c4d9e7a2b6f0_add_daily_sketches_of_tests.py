@@ -0,0 +1,120 @@
+"""add daily sketches of tests
+
+Revision ID: c4d9e7a2b6f0
+Revises: b8e2d5f4c3a1
+Create Date: 2026-10-17 19:27:51.204617
+
+"""
+
+import itertools
+import math
+import struct
+from collections import Counter
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4d9e7a2b6f0"
+down_revision = "b8e2d5f4c3a1"
+branch_labels = None
+depends_on = None
+
+# Histograms as serialized by LogHistogram (version 1), frozen here so that
+# the migration does not depend on later changes of the application
+HISTOGRAM_FORMAT_VERSION = 1
+HISTOGRAM_HEADER = struct.Struct("<Bi")
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+METRICS = ("speed", "latency")
+BATCH_SIZE = 1000
+
+
+def serialize_histogram(values: list[float]) -> bytes:
+    counts = Counter(math.ceil(math.log(value, GAMMA)) for value in values if value > 0)
+    buckets = sorted(counts.items())
+    return HISTOGRAM_HEADER.pack(
+        HISTOGRAM_FORMAT_VERSION, sum(value <= 0 for value in values)
+    ) + struct.pack(
+        f"<{2 * len(buckets)}i", *(value for bucket in buckets for value in bucket)
+    )
+
+
+def backfill_sketches() -> None:
+    """Sketch the results reported so far.
+
+    Corrected results are removed from the sketches they were added to so
+    sketches must hold the results reported before the upgrade as well.
+    """
+    bind = op.get_bind()
+    test_sketch = sa.table(
+        "test_sketch",
+        sa.column("day"),
+        sa.column("mirror_id"),
+        sa.column("country_code"),
+        *(sa.column(metric) for metric in METRICS),
+    )
+    rows = bind.execute(
+        sa.text(
+            """
+            SELECT
+                CAST(test.requested_on AS date) AS day,
+                mirror.id AS mirror_id,
+                test.country_code,
+                test.speed,
+                test.latency
+            FROM test JOIN mirror ON mirror.base_url = test.mirror_url
+            WHERE
+                test.status IN ('SUCCEEDED', 'ERRORED', 'MISSED')
+                AND test.country_code IS NOT NULL
+            ORDER BY 1, 2, 3
+            """
+        ).execution_options(yield_per=BATCH_SIZE)
+    )
+    sketches: list[dict[str, object]] = []
+    for (day, mirror_id, country_code), group in itertools.groupby(
+        rows, key=lambda row: (row.day, row.mirror_id, row.country_code)
+    ):
+        results = list(group)
+        sketches.append(
+            {"day": day, "mirror_id": mirror_id, "country_code": country_code}
+            | {
+                metric: serialize_histogram(
+                    [
+                        value
+                        for result in results
+                        if (value := getattr(result, metric)) is not None
+                    ]
+                )
+                for metric in METRICS
+            }
+        )
+        if len(sketches) >= BATCH_SIZE:
+            bind.execute(test_sketch.insert(), sketches)
+            sketches = []
+    if sketches:
+        bind.execute(test_sketch.insert(), sketches)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "test_sketch",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("mirror_id", sa.String(), nullable=False),
+        sa.Column("country_code", sa.String(), nullable=False),
+        sa.Column("speed", sa.LargeBinary(), nullable=False),
+        sa.Column("latency", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["mirror_id"],
+            ["mirror.id"],
+            name=op.f("fk_test_sketch_mirror_id_mirror"),
+        ),
+        sa.PrimaryKeyConstraint(
+            "day", "mirror_id", "country_code", name=op.f("pk_test_sketch")
+        ),
+    )
+    backfill_sketches()
+
+
+def downgrade() -> None:
+    op.drop_table("test_sketch")
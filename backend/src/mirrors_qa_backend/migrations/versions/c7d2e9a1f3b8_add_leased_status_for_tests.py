@@ -0,0 +1,38 @@
+"""add leased status for tests
+
+Revision ID: c7d2e9a1f3b8
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-17 10:04:19.882731
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7d2e9a1f3b8"
+down_revision = "b3f1c2d4e5a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("test", sa.Column("lease_expires_on", sa.DateTime(), nullable=True))
+    op.drop_constraint(op.f("ck_test_status"), "test", type_="check")
+    op.create_check_constraint(
+        "status",
+        "test",
+        "status IN ('PENDING', 'LEASED', 'MISSED', 'SUCCEEDED', 'ERRORED')",
+    )
+
+
+def downgrade() -> None:
+    # Give leased tests back to the pending tests before the status is removed
+    op.execute("UPDATE test SET status = 'PENDING' WHERE status = 'LEASED'")
+    op.drop_constraint(op.f("ck_test_status"), "test", type_="check")
+    op.create_check_constraint(
+        "status",
+        "test",
+        "status IN ('PENDING', 'MISSED', 'SUCCEEDED', 'ERRORED')",
+    )
+    op.drop_column("test", "lease_expires_on")
@@ -0,0 +1,34 @@
+"""add index on pending tests
+
+Revision ID: d4a8f6b2c1e9
+Revises: c7d2e9a1f3b8
+Create Date: 2026-10-17 14:21:07.415206
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d4a8f6b2c1e9"
+down_revision = "c7d2e9a1f3b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_test_pending_requested_on",
+        "test",
+        ["requested_on"],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_test_pending_requested_on",
+        table_name="test",
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
@@ -0,0 +1,170 @@
+"""partition tests by month
+
+Revision ID: f3b7c1d9a2e4
+Revises: a9e3c5d7f1b2
+Create Date: 2026-10-17 16:41:09.518204
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "f3b7c1d9a2e4"
+down_revision = "a9e3c5d7f1b2"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, requested_on, started_on, status, error, isp, ip_address, asn, city, "
+    "latency, download_size, duration, speed, worker_id, country_code, mirror_url, "
+    "lease_expires_on"
+)
+
+
+def create_test_table(*primary_key: str, **kwargs) -> None:
+    op.create_table(
+        "test",
+        sa.Column(
+            "id",
+            sa.Uuid(),
+            server_default=sa.text("uuid_generate_v4()"),
+            nullable=False,
+        ),
+        sa.Column("requested_on", sa.DateTime(), nullable=False),
+        sa.Column("started_on", sa.DateTime(), nullable=True),
+        sa.Column("status", sa.String(length=9), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("isp", sa.String(), nullable=True),
+        sa.Column("ip_address", postgresql.INET(), nullable=True),
+        sa.Column("asn", sa.String(), nullable=True),
+        sa.Column("city", sa.String(), nullable=True),
+        sa.Column("latency", sa.Float(), nullable=True),
+        sa.Column("download_size", sa.Integer(), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("speed", sa.Float(), nullable=True),
+        sa.Column("worker_id", sa.String(), nullable=True),
+        sa.Column("country_code", sa.String(), nullable=True),
+        sa.Column("mirror_url", sa.String(), nullable=True),
+        sa.Column("lease_expires_on", sa.DateTime(), nullable=True),
+        sa.CheckConstraint(
+            "status IN ('PENDING', 'LEASED', 'MISSED', 'SUCCEEDED', 'ERRORED')",
+            name=op.f("ck_test_status"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["mirror_url"],
+            ["mirror.base_url"],
+            name=op.f("fk_test_mirror_url_mirror"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["worker_id"], ["worker.id"], name=op.f("fk_test_worker_id_worker")
+        ),
+        sa.PrimaryKeyConstraint(*primary_key, name=op.f("pk_test")),
+        **kwargs,
+    )
+
+
+def create_test_indexes() -> None:
+    op.create_index(
+        "ix_test_worker_id_status_requested_on",
+        "test",
+        ["worker_id", "status", "requested_on"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_test_country_code_status_requested_on",
+        "test",
+        ["country_code", "status", "requested_on"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_test_status_requested_on",
+        "test",
+        ["status", "requested_on"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_test_pending_requested_on",
+        "test",
+        ["requested_on"],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.create_index(
+        "ix_test_succeeded_started_on",
+        "test",
+        ["started_on"],
+        unique=False,
+        postgresql_where=sa.text("status = 'SUCCEEDED'"),
+    )
+
+
+def move_tests_to_new_table() -> None:
+    """Copy the tests of test_old to the test table and drop test_old."""
+    op.execute(
+        f"INSERT INTO test ({COLUMNS}) SELECT {COLUMNS} FROM test_old"  # noqa: S608
+    )
+    op.drop_table("test_old")
+
+
+def rename_test_table() -> None:
+    """Rename the test table to test_old along with the names it owns."""
+    for index_name in (
+        "ix_test_worker_id_status_requested_on",
+        "ix_test_country_code_status_requested_on",
+        "ix_test_status_requested_on",
+        "ix_test_pending_requested_on",
+        "ix_test_succeeded_started_on",
+    ):
+        op.drop_index(index_name, table_name="test")
+    op.rename_table("test", "test_old")
+    op.execute("ALTER TABLE test_old RENAME CONSTRAINT pk_test TO pk_test_old")
+
+
+def upgrade() -> None:
+    # Partitioned tables can't be created from existing ones so tests are
+    # copied to a new table. Indexes are created once tests are copied.
+    rename_test_table()
+    # The partition key must be part of the primary key
+    create_test_table(
+        "id", "requested_on", postgresql_partition_by="RANGE (requested_on)"
+    )
+    op.execute("CREATE TABLE test_default PARTITION OF test DEFAULT")
+    # A partition for each month since the first test and for the 3 months
+    # to come, following ones are created by maintain-partitions
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN SELECT generate_series(
+                date_trunc(
+                    'month',
+                    coalesce((SELECT min(requested_on) FROM test_old), localtimestamp)
+                ),
+                date_trunc('month', localtimestamp)
+                    + interval '3 months',
+                interval '1 month'
+            ) LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF test FOR VALUES FROM (%L) TO (%L)',
+                    to_char(month, '"test_y"YYYY"m"MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    move_tests_to_new_table()
+    create_test_indexes()
+
+
+def downgrade() -> None:
+    # Detached partitions are left as is
+    rename_test_table()
+    create_test_table("id")
+    move_tests_to_new_table()
+    create_test_indexes()
@@ -3,12 +3,14 @@ import binascii
 import datetime
 from typing import Annotated
 
+from cryptography.hazmat.primitives.asymmetric.types import PublicKeyTypes
 from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 
 from mirrors_qa_backend import logger
-from mirrors_qa_backend.cryptography import verify_signed_message
-from mirrors_qa_backend.db import gen_dbsession
+from mirrors_qa_backend.cache import TTLCache
+from mirrors_qa_backend.cryptography import load_public_key, verify_message_signature
+from mirrors_qa_backend.db import gen_dbsession, models
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
 from mirrors_qa_backend.db.worker import get_worker
 from mirrors_qa_backend.exceptions import PEMPublicKeyLoadError
@@ -23,6 +25,25 @@ from mirrors_qa_backend.tokens import generate_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# parsed public keys of workers along with their PEM, by fingerprint. As the
+# PEM is checked on each hit, entries never need to be invalidated.
+public_key_cache: TTLCache[str, tuple[str, PublicKeyTypes]] = TTLCache(
+    maxsize=APISettings.PUBLIC_KEY_CACHE_SIZE,
+    ttl=APISettings.PUBLIC_KEY_CACHE_SECONDS,
+)
+
+
+def get_public_key(worker: models.Worker) -> PublicKeyTypes:
+    """Public key of a worker, parsed once and then served from cache."""
+    if (entry := public_key_cache.get(worker.pubkey_fingerprint)) is not None:
+        pubkey_pkcs8, public_key = entry
+        # a key changed without its fingerprint must not be served from cache
+        if pubkey_pkcs8 == worker.pubkey_pkcs8:
+            return public_key
+    public_key = load_public_key(bytes(worker.pubkey_pkcs8, encoding="ascii"))
+    public_key_cache.set(worker.pubkey_fingerprint, (worker.pubkey_pkcs8, public_key))
+    return public_key
+
 
 @router.post("/authenticate")
 def authenticate_worker(
@@ -65,8 +86,8 @@ def authenticate_worker(
 
     # verify signature of message with worker's public keys
     try:
-        if not verify_signed_message(
-            bytes(db_worker.pubkey_pkcs8, encoding="ascii"),
+        if not verify_message_signature(
+            get_public_key(db_worker),
             signature,
             bytes(x_sshauth_message, encoding="ascii"),
         ):
@@ -0,0 +1,72 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi import status as status_codes
+from sqlalchemy import inspect
+
+from mirrors_qa_backend.db import models
+
+# Responses may be stored by clients and shared caches but must be
+# revalidated (with their ETag) before being reused
+CACHE_CONTROL = "public, no-cache"
+
+
+def get_etag(*values: Any) -> str:
+    """Weak ETag of the values a representation is built from.
+
+    Computing it does not require to serialize the representation. It is weak
+    as only representations built from the same values are guaranteed to be
+    semantically equivalent.
+    """
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def get_test_values(test: models.Test) -> tuple[Any, ...]:
+    """Values of the columns of a test"""
+    return tuple(getattr(test, attr.key) for attr in inspect(models.Test).column_attrs)
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the If-None-Match header of the request matches etag.
+
+    Tags are compared with the weak comparison function as required for GET.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+
+def get_validators(etag: str) -> dict[str, str]:
+    """Headers of a representation with etag used to revalidate it"""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status_codes.HTTP_304_NOT_MODIFIED, headers=get_validators(etag)
+    )
+
+
+def conditional_response(
+    request: Request, response: Response, etag: str
+) -> Response | None:
+    """Response for a conditional GET of a representation with etag.
+
+    Returns a 304 (Not Modified) response if the client has the current
+    representation. Otherwise, sets the validators of the representation on
+    response and returns None so that the representation is sent.
+    """
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(get_validators(etag))
+    return None
@@ -1,3 +1,6 @@
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
 from typing import Annotated
 
 import jwt
@@ -9,8 +12,13 @@ from pydantic import ValidationError as PydanticValidationError
 from sqlalchemy.orm import Session
 
 from mirrors_qa_backend import schemas
-from mirrors_qa_backend.db import gen_dbsession, models
+from mirrors_qa_backend.cache import TTLCache
+from mirrors_qa_backend.db import gen_readonly_dbsession, get_dbsession_maker, models
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
+from mirrors_qa_backend.db.notifications import (
+    WORKER_UPDATED_CHANNEL,
+    notifications_listener,
+)
 from mirrors_qa_backend.db.tests import get_test as db_get_test
 from mirrors_qa_backend.db.worker import get_worker
 from mirrors_qa_backend.routes.http_errors import NotFoundError, UnauthorizedError
@@ -19,10 +27,41 @@ from mirrors_qa_backend.settings.api import APISettings
 security = HTTPBearer(description="Access Token")
 
 
+@dataclass(frozen=True)
+class AuthenticatedWorker:
+    """Worker making the request.
+
+    Only holds the fields of the worker which do not change once it is created
+    so that it can be cached across requests.
+    """
+
+    id: str
+    pubkey_fingerprint: str
+
+
+# authenticated workers, by token subject
+worker_cache: TTLCache[str, AuthenticatedWorker] = TTLCache(
+    maxsize=APISettings.WORKER_CACHE_SIZE, ttl=APISettings.WORKER_CACHE_SECONDS
+)
+
+
+def invalidate_cached_worker(worker_id: str | None) -> None:
+    """Remove a worker from the cache, or all of them if worker_id is None."""
+    if worker_id is None:
+        worker_cache.clear()
+    else:
+        worker_cache.pop(worker_id)
+
+
+notifications_listener.add_handler(WORKER_UPDATED_CHANNEL, invalidate_cached_worker)
+
+
 def get_current_worker(
-    session: Annotated[Session, Depends(gen_dbsession)],
+    begin_session: Annotated[
+        Callable[[], AbstractContextManager[Session]], Depends(get_dbsession_maker)
+    ],
     authorization: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-) -> models.Worker:
+) -> AuthenticatedWorker:
     token = authorization.credentials
     try:
         jwt_claims = jwt.decode(token, APISettings.JWT_SECRET, algorithms=["HS256"])
@@ -38,18 +77,27 @@ def get_current_worker(
 
     # At this point, we know that the JWT is all OK and we can
     # trust the data in it. We extract the worker_id from the claims
-    try:
-        db_worker = get_worker(session, claims.subject)
-    except RecordDoesNotExistError as exc:
-        raise UnauthorizedError() from exc
-    return db_worker
+    if worker := worker_cache.get(claims.subject):
+        return worker
+    # The worker is read in its own session so that requests which wait, like
+    # long-polling leases, don't hold a connection meanwhile.
+    with begin_session() as session:
+        try:
+            db_worker = get_worker(session, claims.subject)
+        except RecordDoesNotExistError as exc:
+            raise UnauthorizedError() from exc
+        worker = AuthenticatedWorker(
+            id=db_worker.id, pubkey_fingerprint=db_worker.pubkey_fingerprint
+        )
+    worker_cache.set(claims.subject, worker)
+    return worker
 
 
-CurrentWorker = Annotated[models.Worker, Depends(get_current_worker)]
+CurrentWorker = Annotated[AuthenticatedWorker, Depends(get_current_worker)]
 
 
 def get_test(
-    session: Annotated[Session, Depends(gen_dbsession)],
+    session: Annotated[Session, Depends(gen_readonly_dbsession)],
     test_id: Annotated[UUID4, Path()],
 ) -> models.Test:
     """Fetches the test specified in the request."""
@@ -61,8 +109,3 @@ def get_test(
 
 
 RetrievedTest = Annotated[models.Test, Depends(get_test)]
-
-
-def verify_worker_owns_test(worker: CurrentWorker, test: RetrievedTest):
-    if test.worker_id != worker.id:
-        raise UnauthorizedError("Insufficient privileges to update test.")
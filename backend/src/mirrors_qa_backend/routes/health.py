@@ -1,19 +1,27 @@
 import datetime
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 from typing import Annotated
 
 from fastapi import APIRouter, Depends
 from fastapi import status as status_codes
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from mirrors_qa_backend.db import count_from_stmt, gen_dbsession
-from mirrors_qa_backend.db.models import Test
-from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.cache import TTLCache
+from mirrors_qa_backend.db import get_readonly_dbsession_maker
+from mirrors_qa_backend.db.health import get_health_summary
 from mirrors_qa_backend.schemas import HealthStatus
 from mirrors_qa_backend.settings.api import APISettings
 
 router = APIRouter(prefix="/health-check", tags=["health-check"])
 
+# key of the health status in the cache
+HEALTH_STATUS_CACHE_KEY = "health_status"
+# health status shared by all the requests until it is refreshed
+health_status_cache: TTLCache[str, HealthStatus] = TTLCache(
+    maxsize=1, ttl=APISettings.HEALTH_CHECK_CACHE_SECONDS
+)
+
 
 @router.get(
     "",
@@ -24,17 +32,31 @@ router = APIRouter(prefix="/health-check", tags=["health-check"])
         }
     },
 )
-def heatlh_status(session: Annotated[Session, Depends(gen_dbsession)]) -> HealthStatus:
+def heatlh_status(
+    begin_session: Annotated[
+        Callable[[], AbstractContextManager[Session]],
+        Depends(get_readonly_dbsession_maker),
+    ]
+) -> HealthStatus:
+    # the database is only queried once the cached status expired
+    if health_status := health_status_cache.get(HEALTH_STATUS_CACHE_KEY):
+        return health_status
+
+    with begin_session() as session:
+        summary = get_health_summary(
+            session,
+            workers_interval=datetime.timedelta(
+                seconds=APISettings.ACTIVE_WORKER_SECONDS
+            ),
+        )
     test_received_after = datetime.datetime.now() - datetime.timedelta(
         seconds=APISettings.UNHEALTHY_NO_TESTS_DURATION_SECONDS
     )
-
-    nb_recent_tests_received = count_from_stmt(
-        session,
-        select(Test).where(
-            Test.status == StatusEnum.SUCCEEDED,
-            (Test.started_on >= test_received_after),
-        ),
+    health_status = HealthStatus(
+        receiving_tests=summary.last_test_succeeded_on is not None
+        and summary.last_test_succeeded_on >= test_received_after,
+        last_test_succeeded_on=summary.last_test_succeeded_on,
+        nb_active_workers=summary.nb_active_workers,
     )
-
-    return HealthStatus(receiving_tests=nb_recent_tests_received > 0)
+    health_status_cache.set(HEALTH_STATUS_CACHE_KEY, health_status)
+    return health_status
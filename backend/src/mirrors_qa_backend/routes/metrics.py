@@ -0,0 +1,31 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Response
+from fastapi import status as status_codes
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.orm import Session
+
+from mirrors_qa_backend.db import gen_readonly_dbsession
+from mirrors_qa_backend.db.tests import count_pending_tests_by_worker
+from mirrors_qa_backend.metrics import PENDING_TESTS
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get(
+    "",
+    status_code=status_codes.HTTP_200_OK,
+    responses={
+        status_codes.HTTP_200_OK: {
+            "description": "Metrics of the Backend API in Prometheus text format",
+            "content": {CONTENT_TYPE_LATEST: {}},
+        }
+    },
+    response_class=Response,
+)
+def metrics(session: Annotated[Session, Depends(gen_readonly_dbsession)]) -> Response:
+    # business gauges are computed from the database when scraped
+    PENDING_TESTS.clear()
+    for worker_id, nb_tests in count_pending_tests_by_worker(session).items():
+        PENDING_TESTS.labels(worker_id).set(nb_tests)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,22 +1,56 @@
+import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Path, Query, Request, Response
 from fastapi import status as status_codes
+from pydantic import UUID4
 from sqlalchemy.orm import Session
 
 from mirrors_qa_backend import schemas
-from mirrors_qa_backend.db import gen_dbsession
+from mirrors_qa_backend.db import gen_dbsession, gen_readonly_dbsession
+from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
+from mirrors_qa_backend.db.sketches import merge_test_sketches
+from mirrors_qa_backend.db.tests import get_test as db_get_test
 from mirrors_qa_backend.db.tests import list_tests as db_list_tests
-from mirrors_qa_backend.db.tests import update_test as update_test_model
+from mirrors_qa_backend.db.tests import update_tests as update_db_tests
+from mirrors_qa_backend.db.tests import update_worker_test
 from mirrors_qa_backend.db.worker import update_worker_last_seen
-from mirrors_qa_backend.enums import SortDirectionEnum, StatusEnum, TestSortColumnEnum
-from mirrors_qa_backend.routes.dependencies import (
-    CurrentWorker,
-    RetrievedTest,
-    verify_worker_owns_test,
+from mirrors_qa_backend.enums import (
+    CountModeEnum,
+    SortDirectionEnum,
+    StatusEnum,
+    TestSortColumnEnum,
+    UpdateStatusEnum,
+)
+from mirrors_qa_backend.metrics import TEST_RESULTS
+from mirrors_qa_backend.routes.conditional import (
+    conditional_response,
+    get_etag,
+    get_test_values,
+    get_validators,
+    is_not_modified,
+    not_modified_response,
+)
+from mirrors_qa_backend.routes.dependencies import CurrentWorker, RetrievedTest
+from mirrors_qa_backend.routes.http_errors import (
+    BadRequestError,
+    NotFoundError,
+    UnauthorizedError,
+)
+from mirrors_qa_backend.schemas import (
+    Percentiles,
+    Test,
+    TestsList,
+    TestsPercentiles,
+    calculate_pagination_metadata,
+    calculate_uncounted_pagination_metadata,
+)
+from mirrors_qa_backend.serializer import (
+    deserialize_test_cursor,
+    serialize_test,
+    serialize_test_cursor,
+    serialize_tests_list,
 )
-from mirrors_qa_backend.schemas import Test, TestsList, calculate_pagination_metadata
-from mirrors_qa_backend.serializer import serialize_test
 from mirrors_qa_backend.settings import Settings
 
 router = APIRouter(prefix="/tests", tags=["tests"])
@@ -27,10 +61,16 @@ router = APIRouter(prefix="/tests", tags=["tests"])
     status_code=status_codes.HTTP_200_OK,
     responses={
         status_codes.HTTP_200_OK: {"description": "Returns the list of tests."},
+        status_codes.HTTP_304_NOT_MODIFIED: {
+            "description": "List of tests matches If-None-Match."
+        },
+        status_codes.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor."},
     },
+    response_model=TestsList,
 )
 def list_tests(
-    session: Annotated[Session, Depends(gen_dbsession)],
+    request: Request,
+    session: Annotated[Session, Depends(gen_readonly_dbsession)],
     worker_id: Annotated[str | None, Query()] = None,
     country_code: Annotated[str | None, Query(min_length=2, max_length=2)] = None,
     status: Annotated[list[StatusEnum] | None, Query()] = None,
@@ -40,7 +80,32 @@ def list_tests(
     page_num: Annotated[int, Query(ge=1)] = 1,
     sort_by: Annotated[TestSortColumnEnum, Query()] = TestSortColumnEnum.requested_on,
     order: Annotated[SortDirectionEnum, Query()] = SortDirectionEnum.asc,
-) -> TestsList:
+    cursor: Annotated[
+        str | None,
+        Query(
+            description=(
+                "next_cursor from the metadata of the previous page. "
+                "Takes precedence over page_num."
+            )
+        ),
+    ] = None,
+    include_total: Annotated[
+        CountModeEnum | None,
+        Query(
+            description=(
+                "How to compute total_records. Defaults to exact when paging "
+                "with page_num and none when paging with a cursor."
+            )
+        ),
+    ] = None,
+) -> Response:
+    after = None
+    if cursor is not None:
+        try:
+            after = deserialize_test_cursor(cursor, sort_by, order)
+        except ValueError as exc:
+            raise BadRequestError("Invalid cursor.") from exc
+
     result = db_list_tests(
         session,
         worker_id=worker_id,
@@ -50,12 +115,89 @@ def list_tests(
         page_num=page_num,
         sort_column=sort_by,
         sort_direction=order,
+        after=after,
+        count_mode=include_total,
     )
-    return schemas.TestsList(
-        tests=[serialize_test(test) for test in result.tests],
-        metadata=calculate_pagination_metadata(
-            result.nb_tests, page_size=page_size, current_page=page_num
-        ),
+
+    next_cursor = None
+    if result.next_cursor is not None:
+        next_cursor = serialize_test_cursor(result.next_cursor, sort_by, order)
+
+    current_page = page_num if after is None else None
+    if result.nb_tests is None:
+        metadata = calculate_uncounted_pagination_metadata(
+            len(result.tests), current_page=current_page, next_cursor=next_cursor
+        )
+    else:
+        metadata = calculate_pagination_metadata(
+            result.nb_tests,
+            page_size=page_size,
+            current_page=current_page,
+            next_cursor=next_cursor,
+            total_records_mode=result.count_mode,
+        )
+
+    etag = get_etag(metadata, *result.tests)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return Response(
+        content=serialize_tests_list(result.tests, metadata),
+        media_type="application/json",
+        headers=get_validators(etag),
+    )
+
+
+@router.get(
+    "/percentiles",
+    status_code=status_codes.HTTP_200_OK,
+    responses={
+        status_codes.HTTP_200_OK: {
+            "description": "Returns the percentiles of the speed and latency."
+        },
+        status_codes.HTTP_400_BAD_REQUEST: {"description": "Invalid time window."},
+    },
+)
+def get_tests_percentiles(
+    session: Annotated[Session, Depends(gen_readonly_dbsession)],
+    since: Annotated[
+        datetime.date | None,
+        Query(description="First day of the window. Defaults to 6 days before until."),
+    ] = None,
+    until: Annotated[
+        datetime.date | None,
+        Query(description="Last day of the window. Defaults to today."),
+    ] = None,
+    mirror_id: Annotated[str | None, Query()] = None,
+    country_code: Annotated[str | None, Query(min_length=2, max_length=2)] = None,
+) -> TestsPercentiles:
+    """Percentiles of the speed and latency of the tests requested in a window of
+    days, estimated from the daily sketches of tests."""
+    until = until or datetime.datetime.now().date()
+    since = since or until - datetime.timedelta(days=6)
+    if since > until:
+        raise BadRequestError("since must not be after until.")
+
+    histograms = merge_test_sketches(
+        session,
+        since=since,
+        until=until,
+        mirror_id=mirror_id,
+        country_code=country_code,
+    )
+    return TestsPercentiles(
+        since=since,
+        until=until,
+        mirror_id=mirror_id,
+        country_code=country_code,
+        **{
+            metric: Percentiles(
+                nb_values=histogram.count,
+                p50=histogram.quantile(0.5),
+                p90=histogram.quantile(0.9),
+                p99=histogram.quantile(0.99),
+            )
+            for metric, histogram in histograms.items()
+        },
     )
 
 
@@ -64,45 +206,79 @@ def list_tests(
     status_code=status_codes.HTTP_200_OK,
     responses={
         status_codes.HTTP_200_OK: {"description": "Returns the details of a test."},
+        status_codes.HTTP_304_NOT_MODIFIED: {
+            "description": "Test matches If-None-Match."
+        },
         status_codes.HTTP_404_NOT_FOUND: {
             "description": "Test with id does not exist."
         },
     },
+    response_model=Test,
 )
-def get_test(test: RetrievedTest) -> Test:
+def get_test(
+    request: Request, response: Response, test: RetrievedTest
+) -> Test | Response:
+    etag = get_etag(get_test_values(test))
+    if not_modified := conditional_response(request, response, etag):
+        return not_modified
     return serialize_test(test)
 
 
+@router.patch(
+    "",
+    status_code=status_codes.HTTP_200_OK,
+    responses={
+        status_codes.HTTP_200_OK: {
+            "description": "Update the details of several tests at once."
+        },
+    },
+)
+def update_tests(
+    session: Annotated[Session, Depends(gen_dbsession)],
+    current_worker: CurrentWorker,
+    data: schemas.BulkUpdateTests,
+) -> schemas.BulkUpdateTestsResult:
+    results = update_db_tests(session, worker_id=current_worker.id, updates=data.tests)
+    update_worker_last_seen(session, current_worker.id)
+    for test in data.tests:
+        if results[test.id] == UpdateStatusEnum.updated:
+            TEST_RESULTS.labels(StatusEnum(test.status).value).inc()
+    return schemas.BulkUpdateTestsResult(
+        tests=[
+            schemas.BulkUpdateTestResult(id=test.id, result=results[test.id])
+            for test in data.tests
+        ]
+    )
+
+
 @router.patch(
     "/{test_id}",
     status_code=status_codes.HTTP_200_OK,
     responses={
         status_codes.HTTP_200_OK: {"description": "Update the details of a test."},
+        status_codes.HTTP_401_UNAUTHORIZED: {
+            "description": "Test belongs to another worker."
+        },
+        status_codes.HTTP_404_NOT_FOUND: {
+            "description": "Test with id does not exist."
+        },
     },
-    dependencies=[Depends(verify_worker_owns_test)],
 )
 def update_test(
     session: Annotated[Session, Depends(gen_dbsession)],
     current_worker: CurrentWorker,
-    test: RetrievedTest,
+    test_id: Annotated[UUID4, Path()],
     update: schemas.UpdateTestModel,
 ) -> Test:
-    data = update.model_dump(exclude_unset=True)
-    body = schemas.UpdateTestModel().model_copy(update=data)
-    updated_test = update_test_model(
-        session,
-        test_id=test.id,
-        status=body.status,
-        error=body.error,
-        ip_address=body.ip_address,
-        asn=body.asn,
-        city=body.city,
-        latency=body.latency,
-        download_size=body.download_size,
-        duration=body.duration,
-        isp=body.isp,
-        started_on=body.started_on,
-        speed=body.speed,
+    updated_test = update_worker_test(
+        session, worker_id=current_worker.id, test_id=test_id, test_update=update
     )
-    update_worker_last_seen(session, current_worker)
+    if updated_test is None:
+        try:
+            db_get_test(session, test_id)
+        except RecordDoesNotExistError as exc:
+            raise NotFoundError(f"{exc!s}") from exc
+        raise UnauthorizedError("Insufficient privileges to update test.")
+    update_worker_last_seen(session, current_worker.id)
+    TEST_RESULTS.labels(StatusEnum(updated_test.status).value).inc()
     return serialize_test(updated_test)
@@ -1,23 +1,41 @@
+import asyncio
+import datetime
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 from typing import Annotated
 
 import pycountry
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi import status as status_codes
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from mirrors_qa_backend.db import gen_dbsession
+from mirrors_qa_backend.db import (
+    gen_dbsession,
+    gen_readonly_dbsession,
+    get_dbsession_maker,
+)
 from mirrors_qa_backend.db.country import update_countries as update_db_countries
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
-from mirrors_qa_backend.db.worker import get_worker as get_db_worker
+from mirrors_qa_backend.db.notifications import new_tests_waiters
+from mirrors_qa_backend.db.tests import lease_tests as lease_db_tests
+from mirrors_qa_backend.db.worker import get_worker_with_countries
 from mirrors_qa_backend.db.worker import update_worker as update_db_worker
+from mirrors_qa_backend.routes.conditional import conditional_response, get_etag
 from mirrors_qa_backend.routes.dependencies import CurrentWorker
 from mirrors_qa_backend.routes.http_errors import (
     BadRequestError,
     NotFoundError,
     UnauthorizedError,
 )
-from mirrors_qa_backend.schemas import UpdateWorkerCountries, WorkerCountries
-from mirrors_qa_backend.serializer import serialize_country
+from mirrors_qa_backend.schemas import (
+    LeasedTest,
+    LeasedTests,
+    UpdateWorkerCountries,
+    WorkerCountries,
+)
+from mirrors_qa_backend.serializer import serialize_country, serialize_leased_test
+from mirrors_qa_backend.settings.api import APISettings
 
 router = APIRouter(prefix="/workers", tags=["workers"])
 
@@ -28,17 +46,27 @@ router = APIRouter(prefix="/workers", tags=["workers"])
     responses={
         status_codes.HTTP_200_OK: {
             "description": "Return the list of countries the worker is assigned to."
-        }
+        },
+        status_codes.HTTP_304_NOT_MODIFIED: {
+            "description": "List of countries matches If-None-Match."
+        },
     },
+    response_model=WorkerCountries,
 )
 def list_countries(
-    session: Annotated[Session, Depends(gen_dbsession)], worker_id: str
-) -> WorkerCountries:
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(gen_readonly_dbsession)],
+    worker_id: str,
+) -> WorkerCountries | Response:
     try:
-        worker = get_db_worker(session, worker_id)
+        worker = get_worker_with_countries(session, worker_id)
     except RecordDoesNotExistError as exc:
         raise NotFoundError(str(exc)) from exc
 
+    etag = get_etag(*((country.code, country.name) for country in worker.countries))
+    if not_modified := conditional_response(request, response, etag):
+        return not_modified
     return WorkerCountries(
         countries=[serialize_country(country) for country in worker.countries]
     )
@@ -76,3 +104,61 @@ def update_countries(
     return WorkerCountries(
         countries=[serialize_country(country) for country in updated_worker.countries]
     )
+
+
+@router.post(
+    "/{worker_id}/lease",
+    status_code=status_codes.HTTP_200_OK,
+    responses={
+        status_codes.HTTP_200_OK: {
+            "description": "Return the tests leased to the worker (possibly none)."
+        }
+    },
+)
+async def lease_tests(
+    begin_session: Annotated[
+        Callable[[], AbstractContextManager[Session]], Depends(get_dbsession_maker)
+    ],
+    worker_id: str,
+    current_worker: CurrentWorker,
+    n: Annotated[int, Query(ge=1, le=APISettings.MAX_PAGE_SIZE)] = 1,
+    wait: Annotated[
+        float,
+        Query(
+            ge=0,
+            le=APISettings.TEST_LEASE_MAX_WAIT_SECONDS,
+            description="Number of seconds to wait for new tests if none is pending.",
+        ),
+    ] = 0,
+) -> LeasedTests:
+    if current_worker.id != worker_id:
+        raise UnauthorizedError(
+            "You do not have the required permissions to access this endpoint."
+        )
+    lease_duration = datetime.timedelta(seconds=APISettings.TEST_LEASE_SECONDS)
+
+    def lease() -> tuple[list[LeasedTest], datetime.datetime]:
+        lease_expires_on = datetime.datetime.now() + lease_duration
+        with begin_session() as session:
+            tests = lease_db_tests(
+                session,
+                worker_id=worker_id,
+                nb_tests=n,
+                lease_expires_on=lease_expires_on,
+            )
+            return [serialize_leased_test(test) for test in tests], lease_expires_on
+
+    # Subscribe before leasing so that tests created in-between are not missed.
+    # Each lease is made in its own transaction so that no connection is held
+    # while waiting. Only leases run in the threadpool so that waiting requests
+    # don't hold a thread either.
+    with new_tests_waiters.subscribe(worker_id) as new_tests_created:
+        tests, lease_expires_on = await run_in_threadpool(lease)
+        if not tests and wait:
+            try:
+                await asyncio.wait_for(new_tests_created.wait(), timeout=wait)
+            except TimeoutError:
+                pass
+            else:
+                tests, lease_expires_on = await run_in_threadpool(lease)
+    return LeasedTests(tests=tests, lease_expires_on=lease_expires_on)
@@ -6,7 +6,8 @@ from typing import Annotated
 import pydantic
 from pydantic import UUID4, ConfigDict, Field
 
-from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.enums import CountModeEnum, StatusEnum, UpdateStatusEnum
+from mirrors_qa_backend.settings import Settings
 
 
 class BaseModel(pydantic.BaseModel):
@@ -53,12 +54,47 @@ class Test(UpdateTestModel):
     mirror_url: str | None  # base url of the mirror to run the test
 
 
+class BulkUpdateTestModel(UpdateTestModel):
+    id: UUID4
+
+
+class BulkUpdateTests(BaseModel):
+    tests: list[BulkUpdateTestModel] = Field(
+        min_length=1, max_length=Settings.MAX_BULK_UPDATE_SIZE
+    )
+
+
+class BulkUpdateTestResult(BaseModel):
+    id: UUID4
+    result: UpdateStatusEnum
+
+
+class BulkUpdateTestsResult(BaseModel):
+    tests: list[BulkUpdateTestResult]
+
+
+class LeasedTest(BaseModel):
+    id: UUID4
+    country_code: str | None = None  # country to run the test from
+    mirror_url: str | None  # base url of the mirror to run the test
+
+
+class LeasedTests(BaseModel):
+    tests: list[LeasedTest]
+    lease_expires_on: datetime.datetime
+
+
 class Paginator(BaseModel):
-    total_records: int
+    # None if the total was not requested
+    total_records: int | None = None
+    # how total_records was computed
+    total_records_mode: CountModeEnum = CountModeEnum.exact
     page_size: int
     current_page: int | None = None
     first_page: int | None = None
     last_page: int | None = None
+    # opaque cursor to fetch the next page, None on the last page
+    next_cursor: str | None = None
 
 
 class Region(BaseModel):
@@ -85,17 +121,55 @@ class TestsList(BaseModel):
     metadata: Paginator
 
 
+class Percentiles(BaseModel):
+    nb_values: int
+    # estimates of the percentiles, None if there are no values
+    p50: float | None
+    p90: float | None
+    p99: float | None
+
+
+class TestsPercentiles(BaseModel):
+    # days the tests were requested in (both included)
+    since: datetime.date
+    until: datetime.date
+    mirror_id: str | None
+    country_code: str | None
+    speed: Percentiles  # bytes per second
+    latency: Percentiles  # milliseconds
+
+
 def calculate_pagination_metadata(
-    total_records: int, page_size: int, current_page: int
+    total_records: int,
+    page_size: int,
+    current_page: int | None,
+    next_cursor: str | None = None,
+    total_records_mode: CountModeEnum = CountModeEnum.exact,
 ) -> Paginator:
     if total_records == 0:
-        return Paginator(total_records=0, page_size=0)
+        return Paginator(
+            total_records=0, page_size=0, total_records_mode=total_records_mode
+        )
     return Paginator(
         total_records=total_records,
+        total_records_mode=total_records_mode,
         first_page=1,
         page_size=min(page_size, total_records),
         current_page=current_page,
         last_page=math.ceil(total_records / page_size),
+        next_cursor=next_cursor,
+    )
+
+
+def calculate_uncounted_pagination_metadata(
+    nb_records: int, current_page: int | None, next_cursor: str | None
+) -> Paginator:
+    """Pagination metadata of a listing whose total number of records is unknown."""
+    return Paginator(
+        total_records_mode=CountModeEnum.none,
+        page_size=nb_records,
+        current_page=current_page,
+        next_cursor=next_cursor,
     )
 
 
@@ -114,3 +188,7 @@ class JWTClaims(BaseModel):
 
 class HealthStatus(BaseModel):
     receiving_tests: bool
+    # start of the most recent successful test
+    last_test_succeeded_on: datetime.datetime | None = None
+    # number of workers seen recently
+    nb_active_workers: int = 0
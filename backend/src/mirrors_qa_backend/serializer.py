@@ -1,5 +1,17 @@
+import base64
+import datetime
+import json
+from collections.abc import Sequence
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+import orjson
+
 from mirrors_qa_backend import schemas
 from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.tests import TestCursor
+from mirrors_qa_backend.enums import SortDirectionEnum, StatusEnum, TestSortColumnEnum
 
 
 def serialize_test(test: models.Test) -> schemas.Test:
@@ -22,6 +34,34 @@ def serialize_test(test: models.Test) -> schemas.Test:
     )
 
 
+def serialize_tests_list(
+    tests: Sequence[Sequence[Any]], metadata: schemas.Paginator
+) -> bytes:
+    """JSON of a schemas.TestsList of tests listed as rows of LISTED_TEST_COLUMNS
+
+    Produces the same JSON as the model but values are encoded straight from
+    the rows instead of building and validating a model for each test.
+    """
+    fields = list(schemas.Test.model_fields)
+    return orjson.dumps(
+        {
+            # rows hold more columns than the representation, after its fields
+            "tests": [dict(zip(fields, test, strict=False)) for test in tests],
+            "metadata": metadata.model_dump(mode="json"),
+        },
+        # orjson natively encodes UUIDs, datetimes and enums but not addresses
+        default=str,
+    )
+
+
+def serialize_leased_test(test: models.Test) -> schemas.LeasedTest:
+    return schemas.LeasedTest(
+        id=test.id,
+        country_code=test.country_code,
+        mirror_url=test.mirror_url,
+    )
+
+
 def serialize_mirror(mirror: models.Mirror) -> schemas.Mirror:
     return schemas.Mirror(
         id=mirror.id,
@@ -41,3 +81,65 @@ def serialize_mirror(mirror: models.Mirror) -> schemas.Mirror:
 
 def serialize_country(country: models.Country) -> schemas.Country:
     return schemas.Country(code=country.code, name=country.name)
+
+
+def serialize_test_cursor(
+    cursor: TestCursor,
+    sort_column: TestSortColumnEnum,
+    sort_direction: SortDirectionEnum,
+) -> str:
+    """Encode a cursor into an opaque string to be handed out to clients.
+
+    The sort column and direction are embedded so that a cursor can only be
+    used to continue the listing it was issued for.
+    """
+    sort_value = cursor.sort_value
+    if isinstance(sort_value, datetime.datetime):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, Enum):
+        sort_value = sort_value.value
+    data = [
+        sort_column.value,
+        sort_direction.value,
+        sort_value,
+        cursor.requested_on.isoformat(),
+        str(cursor.id),
+    ]
+    return base64.urlsafe_b64encode(
+        json.dumps(data, separators=(",", ":")).encode("utf-8")
+    ).decode("ascii")
+
+
+def deserialize_test_cursor(
+    cursor: str,
+    sort_column: TestSortColumnEnum,
+    sort_direction: SortDirectionEnum,
+) -> TestCursor:
+    """Decode a cursor created by serialize_test_cursor.
+
+    Raises:
+        ValueError: cursor is malformed or was issued for another sort.
+    """
+    try:
+        column, direction, sort_value, requested_on, test_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        if column != sort_column.value or direction != sort_direction.value:
+            raise ValueError("cursor was issued for a different sort order")
+        if sort_value is not None:
+            if sort_column in (
+                TestSortColumnEnum.requested_on,
+                TestSortColumnEnum.started_on,
+            ):
+                sort_value = datetime.datetime.fromisoformat(sort_value)
+            elif sort_column == TestSortColumnEnum.status:
+                sort_value = StatusEnum(sort_value)
+            elif not isinstance(sort_value, str):
+                raise ValueError(f"invalid value for {sort_column.value}")
+        return TestCursor(
+            sort_value=sort_value,
+            requested_on=datetime.datetime.fromisoformat(requested_on),
+            id=UUID(test_id),
+        )
+    except (TypeError, AttributeError) as exc:
+        raise ValueError("malformed cursor") from exc
@@ -17,6 +17,13 @@ class Settings:
     """Shared backend configuration"""
 
     DATABASE_URL: str = getenv("POSTGRES_URI", mandatory=True)
+    # read-only requests are served from this replica of the database if set
+    REPLICA_DATABASE_URL: str | None = getenv("POSTGRES_REPLICA_URI")
+    # number of seconds during which the reads of a client which wrote are
+    # served from the primary rather than the replica, so that it reads its writes
+    READ_PRIMARY_AFTER_WRITE_SECONDS = parse_timespan(
+        getenv("READ_PRIMARY_AFTER_WRITE_DURATION", default="10s")
+    )
     DEBUG = bool(getenv("DEBUG", default=False))
     # number of seconds before requests time out
     REQUESTS_TIMEOUT_SECONDS = parse_timespan(
@@ -24,6 +31,40 @@ class Settings:
     )
     # maximum number of items to return from a request/query
     MAX_PAGE_SIZE = int(getenv("PAGE_SIZE", default=20))
+    # maximum number of records to update in a single bulk request
+    MAX_BULK_UPDATE_SIZE = int(getenv("MAX_BULK_UPDATE_SIZE", default=100))
+    # number of records above which estimated counts use the query planner
+    # statistics instead of counting records
+    ESTIMATED_COUNT_THRESHOLD = int(getenv("ESTIMATED_COUNT_THRESHOLD", default=1000))
+    # number of seconds before statements of read-only requests time out
+    READ_ONLY_STATEMENT_TIMEOUT_SECONDS = parse_timespan(
+        getenv("READ_ONLY_STATEMENT_TIMEOUT_DURATION", default="5s")
+    )
+    # database statements running longer than this number of seconds are
+    # logged, no statement is logged if unset
+    SLOW_QUERY_SECONDS: float | None = (
+        parse_timespan(getenv("SLOW_QUERY_DURATION"))
+        if getenv("SLOW_QUERY_DURATION")
+        else None
+    )
+    # fraction of the slow SELECT statements whose plan is logged too
+    SLOW_QUERY_EXPLAIN_RATIO = float(getenv("SLOW_QUERY_EXPLAIN_RATIO", default=0))
+    # requests executing more database statements than this number are logged
+    # (e.g N+1 queries), no request is logged if unset
+    MAX_REQUEST_STATEMENTS: int | None = (
+        int(getenv("MAX_REQUEST_STATEMENTS"))
+        if getenv("MAX_REQUEST_STATEMENTS")
+        else None
+    )
+    # number of monthly partitions of tests created ahead of the current month
+    TEST_PARTITIONS_AHEAD = int(getenv("TEST_PARTITIONS_AHEAD", default=3))
+    # partitions whose tests are all older than this number of seconds are
+    # removed by maintain-partitions, no partition is removed if unset
+    TESTS_RETENTION_SECONDS: float | None = (
+        parse_timespan(getenv("TESTS_RETENTION_DURATION"))
+        if getenv("TESTS_RETENTION_DURATION")
+        else None
+    )
     # url to fetch the list of mirrors
     MIRRORS_URL: str = getenv(
         "MIRRORS_LIST_URL", default="https://download.kiwix.org/mirrors.html"
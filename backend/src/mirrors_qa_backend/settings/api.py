@@ -16,8 +16,37 @@ class APISettings(Settings):
         getenv("TOKEN_EXPIRY_DURATION", default="6h")
     )
 
+    # number of authenticated workers to keep in cache and for how long
+    WORKER_CACHE_SIZE = int(getenv("WORKER_CACHE_SIZE", default=256))
+    WORKER_CACHE_SECONDS: float = parse_timespan(
+        getenv("WORKER_CACHE_DURATION", default="5m")
+    )
+    # number of parsed public keys of workers to keep in cache and for how long
+    PUBLIC_KEY_CACHE_SIZE = int(getenv("PUBLIC_KEY_CACHE_SIZE", default=256))
+    PUBLIC_KEY_CACHE_SECONDS: float = parse_timespan(
+        getenv("PUBLIC_KEY_CACHE_DURATION", default="1h")
+    )
+
+    # number of seconds a worker has to report the results of leased tests
+    # before they are given back to the pending tests
+    TEST_LEASE_SECONDS: float = parse_timespan(
+        getenv("TEST_LEASE_DURATION", default="1h")
+    )
+    # maximum number of seconds a worker can wait for new tests to lease
+    TEST_LEASE_MAX_WAIT_SECONDS: float = parse_timespan(
+        getenv("TEST_LEASE_MAX_WAIT_DURATION", default="5m")
+    )
+
     # number of seconds after which to consider that not having received
     # successful Test is an issue
     UNHEALTHY_NO_TESTS_DURATION_SECONDS: float = parse_timespan(
         getenv("UNHEALTHY_NO_TESTS_DURATION_SECONDS", default="6h")
     )
+    # number of seconds since a worker was last seen to be considered active
+    ACTIVE_WORKER_SECONDS: float = parse_timespan(
+        getenv("ACTIVE_WORKER_DURATION", default="1h")
+    )
+    # number of seconds the health status is reused before being refreshed
+    HEALTH_CHECK_CACHE_SECONDS: float = parse_timespan(
+        getenv("HEALTH_CHECK_CACHE_DURATION", default="10s")
+    )
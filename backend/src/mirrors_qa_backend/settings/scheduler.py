@@ -12,3 +12,5 @@ class SchedulerSettings(Settings):
     IDLE_WORKER_SECONDS = parse_timespan(getenv("IDLE_WORKER_DURATION", default="1h"))
     # number of seconds to wait before expiring a test whose data never arrived
     EXPIRE_TEST_SECONDS = parse_timespan(getenv("EXPIRE_TEST_DURATION", default="1d"))
+    # maximum number of tests expired in a single transaction
+    EXPIRE_TESTS_BATCH_SIZE = int(getenv("EXPIRE_TESTS_BATCH_SIZE", default=1000))
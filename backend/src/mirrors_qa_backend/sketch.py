@@ -0,0 +1,91 @@
+import math
+import struct
+from typing import Self
+
+# version of the serialization format of histograms
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<Bi")
+
+
+class LogHistogram:
+    """Mergeable histogram of values in logarithmically sized buckets.
+
+    A positive value is counted in the bucket i such that
+    gamma**(i - 1) < value <= gamma**i, so quantiles are estimated with a
+    relative error of at most relative_accuracy whatever the range of values
+    (as DDSketch does). Other values are counted in a bucket of zeros.
+
+    Counts can be negative in order to remove values from histograms they
+    are merged with.
+    """
+
+    relative_accuracy = 0.01
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+
+    def __init__(self, counts: dict[int, int] | None = None, zero_count: int = 0):
+        # number of values of each bucket by index
+        self.counts: dict[int, int] = counts if counts is not None else {}
+        self.zero_count = zero_count
+
+    @property
+    def count(self) -> int:
+        """Number of values of the histogram."""
+        return self.zero_count + sum(self.counts.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Count value count times (remove it if count is negative)."""
+        if value <= 0:
+            self.zero_count += count
+            return
+        self._add_to_bucket(math.ceil(math.log(value, self.gamma)), count)
+
+    def _add_to_bucket(self, index: int, count: int) -> None:
+        if new_count := self.counts.get(index, 0) + count:
+            self.counts[index] = new_count
+        else:
+            # empty buckets are not kept
+            self.counts.pop(index, None)
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Add the values of other to the histogram."""
+        self.zero_count += other.zero_count
+        for index, count in other.counts.items():
+            self._add_to_bucket(index, count)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate of the q-quantile (0 <= q <= 1) of the values.
+
+        Returns None if the histogram has no values.
+        """
+        if (count := self.count) <= 0:
+            return None
+        rank = q * (count - 1)
+        cumulated_count = self.zero_count
+        if cumulated_count > rank:
+            return 0
+        for index in sorted(self.counts):
+            cumulated_count += self.counts[index]
+            if cumulated_count > rank:
+                # value whose relative error is the same with both bounds
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.counts) / (self.gamma + 1)
+
+    def to_bytes(self) -> bytes:
+        """Compact binary representation of the histogram."""
+        buckets = sorted(self.counts.items())
+        return _HEADER.pack(_FORMAT_VERSION, self.zero_count) + struct.pack(
+            f"<{2 * len(buckets)}i", *(value for bucket in buckets for value in bucket)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        version, zero_count = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported version of histogram: {version}")
+        values = struct.unpack_from(
+            f"<{(len(data) - _HEADER.size) // 4}i", data, _HEADER.size
+        )
+        return cls(
+            counts=dict(zip(values[::2], values[1::2], strict=True)),
+            zero_count=zero_count,
+        )
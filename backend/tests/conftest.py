@@ -10,12 +10,14 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
 from faker import Faker
 from faker.providers import DynamicProvider
+from sqlalchemy import Engine
 from sqlalchemy.orm import Session as OrmSession
 
 from mirrors_qa_backend import schemas
 from mirrors_qa_backend.cryptography import sign_message
-from mirrors_qa_backend.db import Session
+from mirrors_qa_backend.db import Session, engine, read_engine
 from mirrors_qa_backend.db.country import create_country
+from mirrors_qa_backend.db.country_cache import country_cache
 from mirrors_qa_backend.db.models import Base, Country, Mirror, Region, Test, Worker
 from mirrors_qa_backend.db.worker import update_worker_countries
 from mirrors_qa_backend.enums import StatusEnum
@@ -29,10 +31,27 @@ def dbsession() -> Generator[OrmSession, None, None]:
         engine = session.get_bind()
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
+        country_cache.invalidate()
         yield session
         session.rollback()
 
 
+@pytest.fixture
+def replica() -> Generator[Engine, None, None]:
+    """Engine of the replica (POSTGRES_REPLICA_URI) with the schema of the primary.
+
+    Tests using it are skipped if no replica is configured. The replica is
+    expected to be another database rather than an actual replica so that it
+    can be told apart from the primary.
+    """
+    if read_engine is engine:
+        pytest.skip("POSTGRES_REPLICA_URI is not set")
+    Base.metadata.drop_all(bind=read_engine)
+    Base.metadata.create_all(bind=read_engine)
+    yield read_engine
+    Base.metadata.drop_all(bind=read_engine)
+
+
 @pytest.fixture
 def data_gen(faker: Faker) -> Faker:
     """Adds additional providers to faker.
@@ -167,6 +186,43 @@ def db_mirror(dbsession: OrmSession) -> Mirror:
     return mirror
 
 
+@pytest.fixture
+def mirror_tests(
+    dbsession: OrmSession,
+    worker: Worker,
+    db_mirror: Mirror,
+    request: Any,
+) -> list[Test]:
+    """Pending tests of the mirror requested from France using the mirror_tests mark.
+
+    Tests are requested every interval from 2024-06-01 at noon.
+    """
+    mark = request.node.get_closest_marker("mirror_tests")
+    if mark and len(mark.args) > 0:
+        num_tests = int(mark.args[0])
+    else:
+        num_tests = 10
+    interval = (
+        mark.kwargs.get("interval", datetime.timedelta(days=1))
+        if mark
+        else datetime.timedelta(days=1)
+    )
+
+    tests: list[Test] = []
+    for index in range(num_tests):
+        test = Test(
+            requested_on=datetime.datetime(2024, 6, 1, 12) + index * interval,
+            status=StatusEnum.PENDING,
+            country_code="fr",
+        )
+        test.worker = worker
+        test.mirror = db_mirror
+        dbsession.add(test)
+        tests.append(test)
+    dbsession.flush()
+    return tests
+
+
 @pytest.fixture
 def schema_mirror(db_mirror: Mirror) -> schemas.Mirror:
     return serialize_mirror(db_mirror)
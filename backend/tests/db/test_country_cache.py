@@ -0,0 +1,40 @@
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.country import create_country, update_countries
+from mirrors_qa_backend.db.country_cache import country_cache
+from mirrors_qa_backend.db.models import Region, Worker
+
+
+def test_country_cache(
+    dbsession: OrmSession, africa_region: Region, europe_region: Region
+):
+    country_regions = country_cache.get(dbsession)
+    assert country_cache.get(dbsession) is country_regions
+
+    for region in (africa_region, europe_region):
+        assert set(country_regions.get_country_codes(region.code)) == {
+            country.code for country in region.countries
+        }
+        for country in region.countries:
+            assert country_regions.get_region_code(country.code) == region.code
+    assert country_regions.get_country_codes("as") == []
+    assert country_regions.get_region_code("jp") is None
+
+
+def test_country_cache_is_invalidated(dbsession: OrmSession):
+    assert "jp" not in country_cache.get(dbsession).country_regions
+    create_country(dbsession, country_code="jp", country_name="Japan")
+    assert "jp" in country_cache.get(dbsession).country_regions
+
+
+def test_country_cache_is_kept_if_no_country_is_created(
+    dbsession: OrmSession, worker: Worker
+):
+    country_regions = country_cache.get(dbsession)
+    update_countries(
+        dbsession, {country.code: country.name for country in worker.countries}
+    )
+    assert country_cache.get(dbsession) is country_regions
+
+    update_countries(dbsession, {"fr": "France", "jp": "Japan"})
+    assert "jp" in country_cache.get(dbsession).country_regions
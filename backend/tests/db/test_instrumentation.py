@@ -0,0 +1,54 @@
+import logging
+
+import pytest
+from sqlalchemy import literal, select
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.instrumentation import SlowQueryLogger
+
+
+def test_fast_queries_are_not_logged(
+    dbsession: OrmSession, caplog: pytest.LogCaptureFixture
+):
+    SlowQueryLogger(1).log(
+        dbsession.connection(), "SELECT %(value)s", {"value": 1}, 0.5
+    )
+    assert caplog.records == []
+
+
+@pytest.mark.parametrize("explain_ratio", [0, 1])
+def test_slow_queries_are_logged(
+    dbsession: OrmSession, caplog: pytest.LogCaptureFixture, explain_ratio: float
+):
+    caplog.set_level(logging.WARNING)
+    SlowQueryLogger(1, explain_ratio=explain_ratio).log(
+        dbsession.connection(), "SELECT %(value)s", {"value": 1}, 1.5
+    )
+    assert "Slow query (1.500s): SELECT %(value)s" in caplog.text
+    assert "{'value': 1}" in caplog.text
+    assert ("Plan of slow query" in caplog.text) == bool(explain_ratio)
+    if explain_ratio:
+        assert "Execution Time" in caplog.text
+
+
+def test_failed_explain_does_not_abort_transaction(
+    dbsession: OrmSession, caplog: pytest.LogCaptureFixture
+):
+    SlowQueryLogger(0, explain_ratio=1).log(
+        dbsession.connection(), "SELECT * FROM missing_table", None, 1
+    )
+    assert "error while explaining slow query" in caplog.text
+    assert dbsession.scalar(select(literal(1))) == 1
+
+
+def test_other_statements_are_not_explained(
+    dbsession: OrmSession, caplog: pytest.LogCaptureFixture
+):
+    dbsession.add(models.Region(code="eu", name="Europe"))
+    dbsession.flush()
+    SlowQueryLogger(0, explain_ratio=1).log(
+        dbsession.connection(), "DELETE FROM region", None, 1
+    )
+    assert "Plan of slow query" not in caplog.text
+    assert dbsession.get(models.Region, "eu") is not None
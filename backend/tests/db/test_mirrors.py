@@ -142,3 +142,27 @@ def test_update_mirror_countries_from_regions(
 
     for country_code in expected_country_codes:
         assert country_code in db_mirror.other_countries
+
+
+def test_update_mirror_status_sets_country_and_region(
+    dbsession: OrmSession,
+    africa_region: Region,
+    schema_mirror: schemas.Mirror,
+    new_schema_mirror: schemas.Mirror,
+):
+    schema_mirror.country_code = "ng"
+    new_schema_mirror.country_code = "ng"
+
+    result = create_or_update_mirror_status(
+        dbsession, [schema_mirror, new_schema_mirror]
+    )
+    assert result.nb_mirrors_added == 1
+    assert result.nb_mirrors_disabled == 0
+
+    dbsession.expire_all()
+    for mirror_id in (schema_mirror.id, new_schema_mirror.id):
+        db_mirror = dbsession.get(Mirror, mirror_id)
+        assert db_mirror is not None
+        assert db_mirror.enabled
+        assert db_mirror.country_code == "ng"
+        assert db_mirror.region_code == africa_region.code
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from mirrors_qa_backend.db import Session
+from mirrors_qa_backend.db.notifications import (
+    NEW_TESTS_CHANNEL,
+    NewTestsWaiters,
+    NotificationsListener,
+    notify,
+)
+from mirrors_qa_backend.settings import Settings
+
+
+def test_notifications_listener():
+    payloads: list[str | None] = []
+    received = threading.Event()
+
+    def handler(payload: str | None):
+        payloads.append(payload)
+        received.set()
+
+    listener = NotificationsListener(Settings.DATABASE_URL)
+    listener.add_handler("channel", handler)
+    listener.start()
+    # handlers are called once the listener starts listening
+    assert received.wait(timeout=5)
+    assert payloads == [None]
+    received.clear()
+
+    with Session.begin() as session:
+        notify(session, "another_channel", "ignored")
+        notify(session, "channel", "payload")
+    assert received.wait(timeout=5)
+    assert payloads == [None, "payload"]
+
+
+def test_new_tests_waiters():
+    asyncio.run(wait_for_new_tests())
+
+
+async def wait_for_new_tests():
+    waiters = NewTestsWaiters()
+    with waiters.subscribe("test") as new_tests_created:
+        waiters.wake_up("another-worker")
+        # events are set from the event loop, let it run
+        await asyncio.sleep(0)
+        assert not new_tests_created.is_set()
+        waiters.wake_up("test")
+        await asyncio.wait_for(new_tests_created.wait(), timeout=5)
+
+    with waiters.subscribe("test") as new_tests_created:
+        # workers are all woken up when notifications might have been missed
+        waiters.wake_up(None)
+        await asyncio.wait_for(new_tests_created.wait(), timeout=5)
+
+
+def test_new_tests_channel():
+    asyncio.run(wait_for_new_tests_channel())
+
+
+async def wait_for_new_tests_channel():
+    listener = NotificationsListener(Settings.DATABASE_URL)
+    waiters = NewTestsWaiters()
+    listener.add_handler(NEW_TESTS_CHANNEL, waiters.wake_up)
+    with waiters.subscribe("test") as new_tests_created:
+        listener.start()
+        await asyncio.wait_for(new_tests_created.wait(), timeout=5)
+        new_tests_created.clear()
+
+        with Session.begin() as session:
+            notify(session, NEW_TESTS_CHANNEL, "test")
+        await asyncio.wait_for(new_tests_created.wait(), timeout=5)
@@ -0,0 +1,92 @@
+import datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.partitions import (
+    create_test_partitions,
+    get_month_start,
+    get_test_partitions,
+    remove_test_partitions,
+)
+from mirrors_qa_backend.enums import StatusEnum
+
+
+def test_get_month_start():
+    date = datetime.datetime(2024, 11, 17, 10, 30)
+    assert get_month_start(date) == datetime.datetime(2024, 11, 1)
+    assert get_month_start(date, 2) == datetime.datetime(2025, 1, 1)
+    assert get_month_start(date, -11) == datetime.datetime(2023, 12, 1)
+
+
+def test_create_test_partitions(dbsession: OrmSession):
+    now = datetime.datetime(2024, 11, 17)
+    assert create_test_partitions(dbsession, now=now, months_ahead=2) == [
+        "test_y2024m11",
+        "test_y2024m12",
+        "test_y2025m01",
+    ]
+    assert [
+        (partition.lower_bound, partition.upper_bound)
+        for partition in get_test_partitions(dbsession)
+    ] == [
+        (datetime.datetime(2024, 11, 1), datetime.datetime(2024, 12, 1)),
+        (datetime.datetime(2024, 12, 1), datetime.datetime(2025, 1, 1)),
+        (datetime.datetime(2025, 1, 1), datetime.datetime(2025, 2, 1)),
+    ]
+    # existing partitions are kept
+    assert create_test_partitions(
+        dbsession, now=now + datetime.timedelta(days=30), months_ahead=2
+    ) == ["test_y2025m02"]
+
+
+def test_create_test_partitions_moves_tests_from_default_partition(
+    dbsession: OrmSession,
+):
+    requested_on = [
+        datetime.datetime(2024, 10, 31, 23, 59),
+        datetime.datetime(2024, 11, 1),
+        datetime.datetime(2024, 11, 30, 12),
+    ]
+    for date in requested_on:
+        dbsession.add(models.Test(requested_on=date, status=StatusEnum.PENDING))
+    dbsession.flush()
+
+    create_test_partitions(
+        dbsession, now=datetime.datetime(2024, 11, 17), months_ahead=0
+    )
+
+    assert dbsession.scalars(
+        select(text("requested_on")).select_from(text("test_y2024m11"))
+    ).all() == sorted(requested_on[1:])
+    assert (
+        dbsession.scalars(
+            select(text("requested_on")).select_from(text("test_default"))
+        ).all()
+        == requested_on[:1]
+    )
+    assert dbsession.scalar(select(func.count()).select_from(models.Test)) == len(
+        requested_on
+    )
+
+
+def test_remove_test_partitions(dbsession: OrmSession):
+    create_test_partitions(
+        dbsession, now=datetime.datetime(2024, 10, 1), months_ahead=2
+    )
+    now = datetime.datetime(2024, 12, 15)
+
+    assert remove_test_partitions(
+        dbsession, now=now, retention=datetime.timedelta(days=20), detach=True
+    ) == ["test_y2024m10"]
+    assert remove_test_partitions(
+        dbsession, now=now, retention=datetime.timedelta(days=14)
+    ) == ["test_y2024m11"]
+
+    assert [partition.name for partition in get_test_partitions(dbsession)] == [
+        "test_y2024m12"
+    ]
+    # detached partitions are kept as standalone tables
+    assert dbsession.scalar(text("SELECT to_regclass('test_y2024m10')")) is not None
+    assert dbsession.scalar(text("SELECT to_regclass('test_y2024m11')")) is None
@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend import schemas
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.rollup import Result, ResultChange, update_test_rollup
+from mirrors_qa_backend.db.tests import expire_tests, update_tests, update_worker_test
+from mirrors_qa_backend.enums import StatusEnum
+
+REQUESTED_ON = datetime.datetime(2024, 6, 1, 12, 30)
+
+# tests of the mirror_tests fixture are all requested in the same hour
+pytestmark = pytest.mark.mirror_tests(3, interval=datetime.timedelta(minutes=1))
+
+
+def get_rollup(dbsession: OrmSession) -> models.TestRollup:
+    dbsession.expire_all()
+    return dbsession.scalars(select(models.TestRollup)).one()
+
+
+def test_update_test_rollup_merges_changes(
+    dbsession: OrmSession, db_mirror: models.Mirror
+):
+    dbsession.flush()
+    changes = [
+        ResultChange(
+            requested_on=REQUESTED_ON,
+            mirror_id=db_mirror.id,
+            country_code="fr",
+            previous=Result(StatusEnum.PENDING),
+            current=Result(StatusEnum.SUCCEEDED, speed=speed, latency=10),
+        )
+        for speed in (100, 300)
+    ]
+    assert update_test_rollup(dbsession, changes) == 1
+    assert update_test_rollup(dbsession, changes[:1]) == 1
+
+    rollup = get_rollup(dbsession)
+    assert rollup.hour == datetime.datetime(2024, 6, 1, 12)
+    assert (rollup.nb_tests, rollup.nb_succeeded) == (3, 3)
+    assert (rollup.speed_sum, rollup.speed_min, rollup.speed_max) == (500, 100, 300)
+    assert (rollup.latency_sum, rollup.duration_sum) == (30, 0)
+    assert rollup.duration_min is None
+
+
+def test_update_worker_test_updates_rollup(
+    dbsession: OrmSession, worker: models.Worker, mirror_tests: list[models.Test]
+):
+    for test, speed in zip(mirror_tests[:2], (1_000, 3_000), strict=True):
+        update_worker_test(
+            dbsession,
+            worker_id=worker.id,
+            test_id=test.id,
+            test_update=schemas.UpdateTestModel(
+                status=StatusEnum.SUCCEEDED, speed=speed, latency=50, duration=2
+            ),
+        )
+    rollup = get_rollup(dbsession)
+    assert (rollup.mirror_id, rollup.country_code) == (mirror_tests[0].mirror.id, "fr")
+    assert (rollup.nb_tests, rollup.nb_succeeded, rollup.nb_errored) == (2, 2, 0)
+    assert (rollup.speed_sum, rollup.speed_min, rollup.speed_max) == (
+        4_000,
+        1_000,
+        3_000,
+    )
+    assert (rollup.latency_sum, rollup.duration_sum) == (100, 4)
+
+    # a corrected result replaces the previous one
+    update_worker_test(
+        dbsession,
+        worker_id=worker.id,
+        test_id=mirror_tests[0].id,
+        test_update=schemas.UpdateTestModel(status=StatusEnum.ERRORED),
+    )
+    rollup = get_rollup(dbsession)
+    assert (rollup.nb_tests, rollup.nb_succeeded, rollup.nb_errored) == (2, 1, 1)
+    # the metrics of the test are kept as they are not reset by updates
+    assert rollup.speed_sum == 4_000
+
+
+def test_update_tests_updates_rollup(
+    dbsession: OrmSession, worker: models.Worker, mirror_tests: list[models.Test]
+):
+    update_tests(
+        dbsession,
+        worker_id=worker.id,
+        updates=[
+            schemas.BulkUpdateTestModel(
+                id=mirror_tests[0].id, status=StatusEnum.SUCCEEDED, speed=1_000
+            ),
+            schemas.BulkUpdateTestModel(
+                id=mirror_tests[1].id, status=StatusEnum.ERRORED, latency=20
+            ),
+            schemas.BulkUpdateTestModel(
+                id=mirror_tests[2].id, status=StatusEnum.PENDING
+            ),
+        ],
+    )
+    rollup = get_rollup(dbsession)
+    assert (rollup.nb_tests, rollup.nb_succeeded, rollup.nb_errored) == (2, 1, 1)
+    assert (rollup.speed_sum, rollup.latency_sum) == (1_000, 20)
+
+
+def test_expire_tests_updates_rollup(
+    dbsession: OrmSession, mirror_tests: list[models.Test]
+):
+    expire_tests(dbsession, datetime.timedelta(0), batch_size=len(mirror_tests))
+
+    rollup = get_rollup(dbsession)
+    assert (rollup.nb_tests, rollup.nb_missed, rollup.nb_succeeded) == (3, 3, 0)
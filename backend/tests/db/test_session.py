@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import InternalError
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db import engine, gen_readonly_dbsession, read_engine
+from mirrors_qa_backend.settings import Settings
+
+
+def statement_timeout_seconds(session: OrmSession) -> float:
+    """statement_timeout of the session in seconds, Postgres reports milliseconds."""
+    return (
+        session.scalar(
+            text(
+                "SELECT CAST(setting AS integer) FROM pg_settings "
+                "WHERE name = 'statement_timeout'"
+            )
+        )
+        / 1000
+    )
+
+
+def test_readonly_dbsession():
+    for session in gen_readonly_dbsession():
+        assert session.scalar(text("SHOW transaction_read_only")) == "on"
+        assert (
+            statement_timeout_seconds(session)
+            == Settings.READ_ONLY_STATEMENT_TIMEOUT_SECONDS
+        )
+        with pytest.raises(InternalError, match="read-only transaction"):
+            session.execute(text("CREATE TEMPORARY SEQUENCE readonly_test"))
+
+
+def test_readonly_dbsession_uses_primary_without_replica():
+    if read_engine is not engine:
+        pytest.skip("POSTGRES_REPLICA_URI is set")
+    # without POSTGRES_REPLICA_URI, read-only sessions share the primary engine
+    for session in gen_readonly_dbsession():
+        assert session.get_bind().pool is engine.pool
+
+
+def test_readonly_dbsession_uses_replica(replica: Engine):
+    for session in gen_readonly_dbsession():
+        assert session.get_bind().pool is replica.pool
+    for session in gen_readonly_dbsession(read_primary_until=time.time() - 1):
+        assert session.get_bind().pool is replica.pool
+
+
+def test_readonly_dbsession_uses_primary_after_write(replica: Engine):
+    for session in gen_readonly_dbsession(read_primary_until=time.time() + 60):
+        assert session.get_bind().pool is engine.pool
+        assert session.scalar(text("SHOW transaction_read_only")) == "on"
+        assert (
+            statement_timeout_seconds(session)
+            == Settings.READ_ONLY_STATEMENT_TIMEOUT_SECONDS
+        )
+    assert replica.pool.checkedout() == 0
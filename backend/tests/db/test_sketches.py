@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend import schemas
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.sketches import merge_test_sketches
+from mirrors_qa_backend.db.tests import update_tests, update_worker_test
+from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.sketch import LogHistogram
+
+# day the first test of the mirror_tests fixture is requested on
+DAY = datetime.date(2024, 6, 1)
+
+
+def test_merge_test_sketches(
+    dbsession: OrmSession,
+    worker: models.Worker,
+    db_mirror: models.Mirror,
+    mirror_tests: list[models.Test],
+):
+    update_tests(
+        dbsession,
+        worker_id=worker.id,
+        updates=[
+            schemas.BulkUpdateTestModel(
+                id=test.id,
+                status=StatusEnum.SUCCEEDED,
+                speed=(index + 1) * 1_000,
+                latency=(index + 1) * 10,
+            )
+            for index, test in enumerate(mirror_tests)
+        ],
+    )
+
+    histograms = merge_test_sketches(
+        dbsession, since=DAY, until=DAY + datetime.timedelta(days=4)
+    )
+    assert histograms["speed"].count == histograms["latency"].count == 5
+    assert histograms["speed"].quantile(0.5) == pytest.approx(
+        3_000, rel=LogHistogram.relative_accuracy
+    )
+    assert histograms["latency"].quantile(1) == pytest.approx(
+        50, rel=LogHistogram.relative_accuracy
+    )
+
+    assert (
+        merge_test_sketches(
+            dbsession,
+            since=DAY,
+            until=DAY + datetime.timedelta(days=30),
+            mirror_id=db_mirror.id,
+            country_code="fr",
+        )["speed"].count
+        == 10
+    )
+    assert (
+        merge_test_sketches(dbsession, since=DAY, until=DAY, country_code="ca")[
+            "speed"
+        ].count
+        == 0
+    )
+
+
+def test_corrected_result_replaces_previous_value(
+    dbsession: OrmSession, worker: models.Worker, mirror_tests: list[models.Test]
+):
+    for speed in (1_000, 5_000):
+        update_worker_test(
+            dbsession,
+            worker_id=worker.id,
+            test_id=mirror_tests[0].id,
+            test_update=schemas.UpdateTestModel(
+                status=StatusEnum.SUCCEEDED, speed=speed
+            ),
+        )
+
+    histograms = merge_test_sketches(dbsession, since=DAY, until=DAY)
+    assert histograms["speed"].count == 1
+    assert histograms["speed"].quantile(0.5) == pytest.approx(
+        5_000, rel=LogHistogram.relative_accuracy
+    )
+    assert histograms["latency"].count == 0
@@ -1,22 +1,34 @@
 import datetime
 import uuid
+from collections import Counter
 from ipaddress import IPv4Address
 
 import pytest
 from faker import Faker
 from sqlalchemy.orm import Session as OrmSession
 
+from mirrors_qa_backend import schemas
 from mirrors_qa_backend.db import models
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
 from mirrors_qa_backend.db.tests import (
     create_test,
+    create_tests,
     expire_tests,
     filter_test,
     get_test,
+    lease_tests,
     list_tests,
-    update_test,
+    update_tests,
+    update_worker_test,
 )
-from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.enums import (
+    CountModeEnum,
+    SortDirectionEnum,
+    StatusEnum,
+    UpdateStatusEnum,
+)
+from mirrors_qa_backend.enums import TestSortColumnEnum as SortColumnEnum
+from mirrors_qa_backend.settings import Settings
 
 
 def test_test_does_not_exist(dbsession: OrmSession):
@@ -41,6 +53,29 @@ def test_create_test(
     assert test.country_code == test_location
 
 
+def test_create_tests(
+    dbsession: OrmSession, db_mirror: models.Mirror, worker: models.Worker
+):
+    disabled_mirror = models.Mirror(
+        id="mirrors.dotsrc.org",
+        base_url="https://mirrors.dotsrc.org/kiwix/",
+        enabled=False,
+    )
+    dbsession.add(disabled_mirror)
+
+    nb_tests = create_tests(dbsession, worker=worker)
+    assert nb_tests == len(worker.countries)
+
+    result = list_tests(dbsession, worker_id=worker.id)
+    assert result.nb_tests == nb_tests
+    assert {test.country_code for test in result.tests} == {
+        country.code for country in worker.countries
+    }
+    for test in result.tests:
+        assert test.status == StatusEnum.PENDING
+        assert test.mirror_url == db_mirror.base_url
+
+
 @pytest.mark.num_tests(1)
 def test_get_test(dbsession: OrmSession, tests: list[models.Test]):
     test = tests[0]
@@ -106,26 +141,241 @@ def test_list_tests(
     assert len(filtered_tests) == result.nb_tests
 
 
+@pytest.mark.num_tests(25)
+@pytest.mark.parametrize("sort_column", list(SortColumnEnum))
+@pytest.mark.parametrize("sort_direction", list(SortDirectionEnum))
+def test_list_tests_with_cursor(
+    dbsession: OrmSession,
+    tests: list[models.Test],
+    sort_column: SortColumnEnum,
+    sort_direction: SortDirectionEnum,
+):
+    for test in tests[::3]:
+        test.city = "Paris"
+    dbsession.flush()
+
+    expected = list_tests(
+        dbsession,
+        page_size=len(tests),
+        sort_column=sort_column,
+        sort_direction=sort_direction,
+    )
+    assert expected.next_cursor is None
+
+    # Walk through all the pages using the cursor of the previous page
+    result = list_tests(
+        dbsession,
+        page_size=10,
+        sort_column=sort_column,
+        sort_direction=sort_direction,
+    )
+    seen = list(result.tests)
+    while result.next_cursor is not None:
+        result = list_tests(
+            dbsession,
+            page_size=10,
+            sort_column=sort_column,
+            sort_direction=sort_direction,
+            after=result.next_cursor,
+        )
+        assert result.nb_tests is None
+        seen.extend(result.tests)
+
+    assert [test.id for test in seen] == [test.id for test in expected.tests]
+
+
+@pytest.mark.num_tests(10)
+@pytest.mark.parametrize(
+    ["count_mode", "threshold", "expected_mode"],
+    [
+        (CountModeEnum.exact, 5, CountModeEnum.exact),
+        (CountModeEnum.estimated, 100, CountModeEnum.exact),
+        (CountModeEnum.estimated, 5, CountModeEnum.estimated),
+        (CountModeEnum.none, 5, CountModeEnum.none),
+    ],
+)
+def test_list_tests_count_mode(
+    dbsession: OrmSession,
+    tests: list[models.Test],
+    monkeypatch: pytest.MonkeyPatch,
+    count_mode: CountModeEnum,
+    threshold: int,
+    expected_mode: CountModeEnum,
+):
+    monkeypatch.setattr(Settings, "ESTIMATED_COUNT_THRESHOLD", threshold)
+    result = list_tests(dbsession, page_size=2, count_mode=count_mode)
+    assert len(result.tests) == 2
+    assert result.count_mode == expected_mode
+    if expected_mode == CountModeEnum.exact:
+        assert result.nb_tests == len(tests)
+    elif expected_mode == CountModeEnum.estimated:
+        assert result.nb_tests is not None
+        assert result.nb_tests > threshold
+    else:
+        assert result.nb_tests is None
+
+
+@pytest.mark.num_tests(10)
+def test_list_tests_estimated_count_with_filters(
+    dbsession: OrmSession,
+    tests: list[models.Test],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(Settings, "ESTIMATED_COUNT_THRESHOLD", 0)
+    result = list_tests(
+        dbsession,
+        statuses=[tests[0].status, StatusEnum.MISSED],
+        country_code=tests[0].country_code,
+        count_mode=CountModeEnum.estimated,
+    )
+    assert result.count_mode == CountModeEnum.estimated
+    assert result.nb_tests is not None
+    assert result.nb_tests > 0
+
+
 @pytest.mark.num_tests(1)
-def test_update_test(dbsession: OrmSession, tests: list[models.Test], data_gen: Faker):
-    test_id = tests[0].id
+def test_update_worker_test_values(
+    dbsession: OrmSession,
+    worker: models.Worker,
+    tests: list[models.Test],
+    data_gen: Faker,
+):
     download_size = 1_000_000
     duration = 1_000
     latency = 100
     speed = download_size / duration
-    update_values = {
-        "status": data_gen.test_status(),
-        "download_size": download_size,
-        "duration": duration,
-        "speed": speed,
-        "ip_address": IPv4Address(data_gen.ipv4()),
-        "started_on": data_gen.date_time(datetime.UTC),
-        "latency": latency,
+    test_update = schemas.UpdateTestModel(
+        status=data_gen.test_status(),
+        download_size=download_size,
+        duration=duration,
+        speed=speed,
+        ip_address=IPv4Address(data_gen.ipv4()),
+        started_on=data_gen.date_time(),
+        latency=latency,
+    )
+    updated_test = update_worker_test(
+        dbsession, worker_id=worker.id, test_id=tests[0].id, test_update=test_update
+    )
+    assert updated_test is not None
+    values = schemas.UpdateTestModel.model_validate(
+        updated_test, from_attributes=True
+    ).model_dump()
+    for key, value in test_update.model_dump(exclude_none=True).items():
+        assert values[key] == value
+
+
+@pytest.mark.num_tests(1, status=StatusEnum.PENDING)
+def test_update_worker_test(
+    dbsession: OrmSession, worker: models.Worker, tests: list[models.Test]
+):
+    tests[0].city = "Paris"
+    dbsession.flush()
+
+    updated_test = update_worker_test(
+        dbsession,
+        worker_id=worker.id,
+        test_id=tests[0].id,
+        test_update=schemas.UpdateTestModel(status=StatusEnum.SUCCEEDED, speed=1_000),
+    )
+    assert updated_test is not None
+    assert updated_test.status == StatusEnum.SUCCEEDED
+    assert updated_test.speed == 1_000
+    # values which are not provided are left untouched
+    assert updated_test.city == "Paris"
+
+
+@pytest.mark.num_tests(1, status=StatusEnum.PENDING)
+def test_update_worker_test_of_other_worker(
+    dbsession: OrmSession, tests: list[models.Test]
+):
+    test_update = schemas.UpdateTestModel(status=StatusEnum.SUCCEEDED)
+    assert (
+        update_worker_test(
+            dbsession, worker_id="other", test_id=tests[0].id, test_update=test_update
+        )
+        is None
+    )
+    assert (
+        update_worker_test(
+            dbsession,
+            worker_id=tests[0].worker_id or "",
+            test_id=uuid.uuid4(),
+            test_update=test_update,
+        )
+        is None
+    )
+    assert get_test(dbsession, tests[0].id).status == StatusEnum.PENDING
+
+
+@pytest.mark.num_tests(3, status=StatusEnum.PENDING)
+def test_update_tests(
+    dbsession: OrmSession,
+    worker: models.Worker,
+    tests: list[models.Test],
+    data_gen: Faker,
+):
+    other_worker = models.Worker(id="other", pubkey_pkcs8="", pubkey_fingerprint="")
+    other_test = models.Test(status=StatusEnum.PENDING)
+    other_test.worker = other_worker
+    dbsession.add(other_test)
+    tests[1].city = "Paris"
+    dbsession.flush()
+
+    succeeded = schemas.BulkUpdateTestModel(
+        id=tests[0].id,
+        status=StatusEnum.SUCCEEDED,
+        download_size=1_000_000,
+        duration=1_000,
+        speed=1_000,
+        latency=100,
+        ip_address=IPv4Address(data_gen.ipv4()),
+        started_on=datetime.datetime(2024, 6, 1, 12, 30),
+        isp="isp",
+        city="Lyon",
+    )
+    errored = schemas.BulkUpdateTestModel(
+        id=tests[1].id, status=StatusEnum.ERRORED, error="timeout"
+    )
+    missing_id = uuid.uuid4()
+    results = update_tests(
+        dbsession,
+        worker_id=worker.id,
+        updates=[
+            succeeded,
+            errored,
+            schemas.BulkUpdateTestModel(id=missing_id, status=StatusEnum.ERRORED),
+            schemas.BulkUpdateTestModel(id=other_test.id, status=StatusEnum.ERRORED),
+        ],
+    )
+    assert results == {
+        tests[0].id: UpdateStatusEnum.updated,
+        tests[1].id: UpdateStatusEnum.updated,
+        missing_id: UpdateStatusEnum.not_found,
+        other_test.id: UpdateStatusEnum.forbidden,
     }
-    updated_test = update_test(dbsession, test_id, **update_values)  # type: ignore
-    for key, value in update_values.items():
-        if hasattr(updated_test, key):
-            assert getattr(updated_test, key) == value
+
+    updated_test = get_test(dbsession, tests[0].id)
+    assert updated_test.status == StatusEnum.SUCCEEDED
+    for key in (
+        "download_size",
+        "duration",
+        "speed",
+        "latency",
+        "ip_address",
+        "started_on",
+        "isp",
+        "city",
+    ):
+        assert getattr(updated_test, key) == getattr(succeeded, key)
+
+    errored_test = get_test(dbsession, tests[1].id)
+    assert errored_test.status == StatusEnum.ERRORED
+    assert errored_test.error == "timeout"
+    # values which are not provided are left untouched
+    assert errored_test.city == "Paris"
+
+    assert get_test(dbsession, tests[2].id).status == StatusEnum.PENDING
+    assert get_test(dbsession, other_test.id).status == StatusEnum.PENDING
 
 
 @pytest.mark.num_tests(10, status=StatusEnum.PENDING)
@@ -145,6 +395,70 @@ def test_expire_tests(
     for test in tests:
         assert test.status == StatusEnum.PENDING
 
-    expire_tests(dbsession, interval)
+    expire_tests(dbsession, interval, batch_size=len(tests))
     for test in tests:
         assert test.status == expected_status
+
+
+@pytest.mark.num_tests(10, status=StatusEnum.PENDING)
+def test_expire_tests_in_batches(dbsession: OrmSession, tests: list[models.Test]):
+    nb_expired: list[int] = []
+    counts: Counter[tuple[str | None, str | None]] = Counter()
+    while expired := expire_tests(dbsession, datetime.timedelta(0), batch_size=4):
+        nb_expired.append(sum(count.nb_tests for count in expired))
+        for count in expired:
+            counts[(count.worker_id, count.country_code)] += count.nb_tests
+
+    assert nb_expired == [4, 4, 2]
+    assert counts == Counter((test.worker_id, test.country_code) for test in tests)
+    for test in tests:
+        assert test.status == StatusEnum.MISSED
+
+
+@pytest.mark.num_tests(5, status=StatusEnum.PENDING)
+def test_lease_tests(
+    dbsession: OrmSession, worker: models.Worker, tests: list[models.Test]
+):
+    lease_expires_on = datetime.datetime.now() + datetime.timedelta(hours=1)
+    leased_tests = lease_tests(
+        dbsession, worker_id=worker.id, nb_tests=3, lease_expires_on=lease_expires_on
+    )
+    assert len(leased_tests) == 3
+    for test in leased_tests:
+        assert test.status == StatusEnum.LEASED
+        assert test.lease_expires_on == lease_expires_on
+
+    # already leased tests are not leased again
+    remaining_tests = lease_tests(
+        dbsession, worker_id=worker.id, nb_tests=3, lease_expires_on=lease_expires_on
+    )
+    assert len(remaining_tests) == 2
+    assert {test.id for test in leased_tests + remaining_tests} == {
+        test.id for test in tests
+    }
+    assert (
+        lease_tests(
+            dbsession,
+            worker_id=worker.id,
+            nb_tests=3,
+            lease_expires_on=lease_expires_on,
+        )
+        == []
+    )
+
+
+@pytest.mark.num_tests(5, status=StatusEnum.PENDING)
+def test_expire_tests_releases_expired_leases(
+    dbsession: OrmSession, worker: models.Worker, tests: list[models.Test]
+):
+    lease_tests(
+        dbsession,
+        worker_id=worker.id,
+        nb_tests=len(tests),
+        lease_expires_on=datetime.datetime.now() - datetime.timedelta(seconds=1),
+    )
+
+    expire_tests(dbsession, datetime.timedelta(days=7), batch_size=len(tests))
+    for test in tests:
+        assert test.status == StatusEnum.PENDING
+        assert test.lease_expires_on is None
@@ -1,10 +1,22 @@
+import datetime
+
 import pytest
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session as OrmSession
 
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db import worker as db_worker
 from mirrors_qa_backend.db.exceptions import RecordDoesNotExistError
 from mirrors_qa_backend.db.models import Country, Worker
-from mirrors_qa_backend.db.worker import create_worker, get_worker
+from mirrors_qa_backend.db.worker import (
+    create_worker,
+    get_idle_workers_with_pending_tests,
+    get_worker,
+    get_worker_with_countries,
+    update_worker,
+)
+from mirrors_qa_backend.enums import StatusEnum
 
 
 def test_create_worker(dbsession: OrmSession, public_key: RSAPublicKey):
@@ -28,6 +40,21 @@ def test_create_worker(dbsession: OrmSession, public_key: RSAPublicKey):
     assert "END PUBLIC KEY" in new_worker.pubkey_pkcs8
 
 
+def test_update_worker_countries_does_not_notify(
+    dbsession: OrmSession, worker: Worker, monkeypatch: pytest.MonkeyPatch
+):
+    notifications: list[tuple[str, str]] = []
+    monkeypatch.setattr(
+        db_worker,
+        "notify",
+        lambda _session, channel, payload: notifications.append((channel, payload)),
+    )
+
+    updated_worker = update_worker(dbsession, worker.id, ["fr"])
+    assert [country.code for country in updated_worker.countries] == ["fr"]
+    assert notifications == []
+
+
 def test_worker_does_not_exist(dbsession: OrmSession):
     with pytest.raises(RecordDoesNotExistError):
         get_worker(dbsession, "does not exist")
@@ -35,3 +62,55 @@ def test_worker_does_not_exist(dbsession: OrmSession):
 
 def test_get_worker(dbsession: OrmSession, worker: Worker):
     assert get_worker(dbsession, worker.id).id == worker.id
+
+
+@pytest.mark.num_tests(5, status=StatusEnum.PENDING)
+def test_get_idle_workers_with_pending_tests(
+    dbsession: OrmSession, tests: list[models.Test], worker: Worker
+):
+    nb_pending_tests = len(tests)
+    other_worker = Worker(
+        id="other",
+        pubkey_pkcs8=worker.pubkey_pkcs8,
+        pubkey_fingerprint=worker.pubkey_fingerprint,
+    )
+    dbsession.add(other_worker)
+    succeeded_test = models.Test(status=StatusEnum.SUCCEEDED, country_code="fr")
+    succeeded_test.worker = worker
+    dbsession.add(succeeded_test)
+    dbsession.flush()
+
+    idle_workers = {
+        idle_worker.worker.id: idle_worker
+        for idle_worker in get_idle_workers_with_pending_tests(
+            dbsession, interval=datetime.timedelta(seconds=0)
+        )
+    }
+    assert idle_workers[worker.id].nb_pending_tests == nb_pending_tests
+    assert len(idle_workers[worker.id].worker.countries) == len(worker.countries)
+    assert idle_workers[other_worker.id].nb_pending_tests == 0
+
+
+def test_get_idle_workers_with_pending_tests_excludes_active(
+    dbsession: OrmSession,
+    worker: Worker,  # noqa: ARG001 [pytest fixture that saves a worker]
+):
+    assert (
+        get_idle_workers_with_pending_tests(
+            dbsession, interval=datetime.timedelta(hours=1)
+        )
+        == []
+    )
+
+
+def test_get_worker_with_countries(dbsession: OrmSession, worker: Worker):
+    country_codes = {country.code for country in worker.countries}
+    dbsession.flush()
+    dbsession.expire_all()
+
+    db_worker = get_worker_with_countries(dbsession, worker.id)
+    assert "countries" not in inspect(db_worker).unloaded
+    assert {country.code for country in db_worker.countries} == country_codes
+
+    with pytest.raises(RecordDoesNotExistError):
+        get_worker_with_countries(dbsession, "missing")
@@ -1,11 +1,19 @@
 from collections.abc import Generator
+from contextlib import contextmanager
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session as OrmSession
 
-from mirrors_qa_backend.db import gen_dbsession
+from mirrors_qa_backend.db import (
+    gen_dbsession,
+    gen_readonly_dbsession,
+    get_dbsession_maker,
+    get_readonly_dbsession_maker,
+)
 from mirrors_qa_backend.main import app
+from mirrors_qa_backend.routes.dependencies import worker_cache
+from mirrors_qa_backend.routes.health import health_status_cache
 
 
 @pytest.fixture
@@ -15,6 +23,16 @@ def client(dbsession: OrmSession) -> TestClient:
 
     # Replace the  database session with the test dbsession
     app.dependency_overrides[gen_dbsession] = test_dbsession
+    app.dependency_overrides[gen_readonly_dbsession] = test_dbsession
+    app.dependency_overrides[get_dbsession_maker] = lambda: contextmanager(
+        test_dbsession
+    )
+    app.dependency_overrides[get_readonly_dbsession_maker] = lambda: contextmanager(
+        test_dbsession
+    )
+    # Workers are re-created for each test
+    worker_cache.clear()
+    health_status_cache.clear()
 
     return TestClient(app=app)
 
@@ -32,3 +50,11 @@ def access_token(
         },
     )
     return response.json()["access_token"]
+
+
+@pytest.fixture
+def auth_headers(access_token: str) -> dict[str, str]:
+    return {
+        "Content-type": "application/json",
+        "Authorization": f"Bearer {access_token}",
+    }
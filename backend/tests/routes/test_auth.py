@@ -2,12 +2,15 @@ import base64
 import datetime
 
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from mirrors_qa_backend.cryptography import sign_message
 from mirrors_qa_backend.db.models import Worker
+from mirrors_qa_backend.routes.auth import get_public_key, public_key_cache
 
 
 @pytest.mark.parametrize(
@@ -53,3 +56,21 @@ def test_authenticate_worker(
     data = response.text
     for content in expected_response_contents:
         assert content in data
+
+
+def test_get_public_key_is_cached(worker: Worker):
+    public_key_cache.clear()
+    public_key = get_public_key(worker)
+    assert get_public_key(worker) is public_key
+
+    # a different key with the same fingerprint is not served from cache
+    worker.pubkey_pkcs8 = (
+        rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        .public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode(encoding="ascii")
+    )
+    assert get_public_key(worker) is not public_key
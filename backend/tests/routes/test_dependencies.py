@@ -0,0 +1,35 @@
+from fastapi import status as status_codes
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db.models import Worker
+from mirrors_qa_backend.routes.dependencies import (
+    invalidate_cached_worker,
+    worker_cache,
+)
+
+
+def test_current_worker_is_cached(
+    dbsession: OrmSession,
+    worker: Worker,
+    auth_headers: dict[str, str],
+    client: TestClient,
+):
+    url = f"/workers/{worker.id}/lease"
+    assert (
+        client.post(url, headers=auth_headers).status_code == status_codes.HTTP_200_OK
+    )
+    cached_worker = worker_cache.get(worker.id)
+    assert cached_worker is not None
+    assert cached_worker.pubkey_fingerprint == worker.pubkey_fingerprint
+
+    # the cached worker is used even though the worker no longer exists
+    dbsession.delete(worker)
+    dbsession.flush()
+    assert (
+        client.post(url, headers=auth_headers).status_code == status_codes.HTTP_200_OK
+    )
+
+    invalidate_cached_worker(worker.id)
+    response = client.post(url, headers=auth_headers)
+    assert response.status_code == status_codes.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,85 @@
+import datetime
+from typing import Any
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db import ReadOnlySession, engine, models
+from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.main import app
+from mirrors_qa_backend.routes.health import (
+    HEALTH_STATUS_CACHE_KEY,
+    health_status_cache,
+)
+from mirrors_qa_backend.schemas import HealthStatus
+
+
+def test_health_check_without_tests(client: TestClient):
+    response = client.get("/health-check")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "receiving_tests": False,
+        "last_test_succeeded_on": None,
+        "nb_active_workers": 0,
+    }
+
+
+def test_health_check(dbsession: OrmSession, worker: models.Worker, client: TestClient):
+    started_on = datetime.datetime.now() - datetime.timedelta(minutes=5)
+    test = models.Test(status=StatusEnum.SUCCEEDED, started_on=started_on)
+    test.worker = worker
+    dbsession.add(test)
+    dbsession.flush()
+
+    response = client.get("/health-check")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "receiving_tests": True,
+        "last_test_succeeded_on": started_on.isoformat(),
+        "nb_active_workers": 1,
+    }
+
+
+def test_health_check_is_cached(dbsession: OrmSession, client: TestClient):
+    assert client.get("/health-check").json()["receiving_tests"] is False
+
+    dbsession.add(
+        models.Test(status=StatusEnum.SUCCEEDED, started_on=datetime.datetime.now())
+    )
+    dbsession.flush()
+    assert client.get("/health-check").json()["receiving_tests"] is False
+
+
+def test_health_check_cache_hit_runs_no_statement(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+):
+    # use actual read-only sessions rather than the test session
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    health_status_cache.set(
+        HEALTH_STATUS_CACHE_KEY,
+        HealthStatus(
+            receiving_tests=False, last_test_succeeded_on=None, nb_active_workers=0
+        ),
+    )
+
+    statements: list[str] = []
+    transactions: list[Any] = []
+
+    def record_statement(_conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+        statements.append(statement)
+
+    def record_transaction(_session: Any, transaction: Any) -> None:
+        transactions.append(transaction)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    event.listen(ReadOnlySession, "after_transaction_create", record_transaction)
+    try:
+        assert client.get("/health-check").status_code == status.HTTP_200_OK
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+        event.remove(ReadOnlySession, "after_transaction_create", record_transaction)
+    assert statements == []
+    assert transactions == []
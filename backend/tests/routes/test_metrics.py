@@ -0,0 +1,78 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.settings import Settings
+
+
+@pytest.mark.num_tests(3, status=StatusEnum.PENDING)
+def test_metrics(
+    client: TestClient,
+    worker: models.Worker,
+    tests: list[models.Test],
+    auth_headers: dict[str, str],
+):
+    client.patch(
+        f"/tests/{tests[0].id}", headers=auth_headers, json={"status": "SUCCEEDED"}
+    )
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    metrics = response.text
+    assert f'mirrors_qa_pending_tests{{worker_id="{worker.id}"}} 2.0' in metrics
+    assert 'mirrors_qa_test_results_total{status="SUCCEEDED"}' in metrics
+    assert (
+        'mirrors_qa_http_requests_total{method="PATCH",route="/tests/{test_id}",'
+        'status_code="200"}'
+    ) in metrics
+    assert "mirrors_qa_http_request_duration_seconds_bucket" in metrics
+    assert (
+        'mirrors_qa_http_request_db_statements_count{method="PATCH",'
+        'route="/tests/{test_id}"}'
+    ) in metrics
+    assert 'mirrors_qa_db_statement_duration_seconds_count{operation="UPDATE"}' in (
+        metrics
+    )
+    assert (
+        'mirrors_qa_db_pool_checkout_duration_seconds_count{pool="primary"}' in metrics
+    )
+    assert 'mirrors_qa_db_pool_connections_in_use{pool="primary"}' in metrics
+
+
+def get_request_statements(method: str, route: str) -> float:
+    """Total number of statements executed by the requests of a route so far."""
+    return (
+        REGISTRY.get_sample_value(
+            "mirrors_qa_http_request_db_statements_sum",
+            {"method": method, "route": route},
+        )
+        or 0
+    )
+
+
+def test_request_statements(
+    client: TestClient,
+    dbsession: OrmSession,
+    worker: models.Worker,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+):
+    dbsession.flush()
+    route = "/workers/{worker_id}/countries"
+    nb_statements = get_request_statements("GET", route)
+
+    # the worker and its countries are loaded with one query each
+    client.get(f"/workers/{worker.id}/countries")
+    assert get_request_statements("GET", route) - nb_statements == 2
+    assert caplog.records == []
+
+    monkeypatch.setattr(Settings, "MAX_REQUEST_STATEMENTS", 1)
+    client.get(f"/workers/{worker.id}/countries")
+    assert [record.getMessage() for record in caplog.records] == [
+        f"GET {route} executed 2 database statements"
+    ]
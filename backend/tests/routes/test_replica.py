@@ -0,0 +1,103 @@
+import uuid
+from collections import Counter
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, delete, event
+
+from mirrors_qa_backend.db import READ_PRIMARY_COOKIE, Session, engine, models
+from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.main import app
+from mirrors_qa_backend.routes.dependencies import (
+    AuthenticatedWorker,
+    get_current_worker,
+)
+
+
+@pytest.fixture
+def statements(replica: Engine) -> Generator[Counter[str], None, None]:
+    """Number of statements executed on the primary and the replica."""
+    counter: Counter[str] = Counter()
+
+    def count_primary(*_: Any) -> None:
+        counter["primary"] += 1
+
+    def count_replica(*_: Any) -> None:
+        counter["replica"] += 1
+
+    event.listen(engine, "after_cursor_execute", count_primary)
+    event.listen(replica, "after_cursor_execute", count_replica)
+    yield counter
+    event.remove(engine, "after_cursor_execute", count_primary)
+    event.remove(replica, "after_cursor_execute", count_replica)
+
+
+@pytest.fixture
+def committed_test() -> Generator[models.Test, None, None]:
+    """Test of a worker committed to the primary, as requests read it from other
+    sessions than the test session."""
+    with Session.begin() as session:
+        worker = models.Worker(id="test", pubkey_pkcs8="", pubkey_fingerprint="")
+        test = models.Test(status=StatusEnum.SUCCEEDED)
+        test.worker = worker
+        session.add(test)
+    yield test
+    with Session.begin() as session:
+        session.execute(delete(models.Test))
+        session.execute(delete(models.Worker))
+
+
+def test_routes_read_from_replica_until_client_writes(
+    statements: Counter[str],
+    committed_test: models.Test,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(
+        app,
+        "dependency_overrides",
+        {
+            get_current_worker: lambda: AuthenticatedWorker(
+                id="test", pubkey_fingerprint=""
+            )
+        },
+    )
+    client = TestClient(app=app)
+
+    statements.clear()
+    response = client.get("/tests")
+    assert response.status_code == status.HTTP_200_OK
+    assert statements["replica"] > 0
+    assert statements["primary"] == 0
+
+    # requests which write nothing don't change where the client reads from
+    response = client.patch(f"/tests/{uuid.uuid4()}", json={"status": "ERRORED"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.post("/workers/test/lease", params={"n": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["tests"] == []
+    assert READ_PRIMARY_COOKIE not in client.cookies
+
+    statements.clear()
+    response = client.patch(f"/tests/{committed_test.id}", json={"status": "ERRORED"})
+    assert response.status_code == status.HTTP_200_OK
+    assert statements["primary"] > 0
+    assert statements["replica"] == 0
+    assert READ_PRIMARY_COOKIE in response.cookies
+
+    # the client reads what it just wrote
+    statements.clear()
+    response = client.get(f"/tests/{committed_test.id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "ERRORED"
+    assert statements["primary"] > 0
+    assert statements["replica"] == 0
+
+    # other clients still read from the replica
+    statements.clear()
+    response = TestClient(app=app).get("/tests")
+    assert response.status_code == status.HTTP_200_OK
+    assert statements["replica"] > 0
+    assert statements["primary"] == 0
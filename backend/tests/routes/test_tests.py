@@ -3,8 +3,10 @@ import uuid
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session as OrmSession
 
 from mirrors_qa_backend.db import models
+from mirrors_qa_backend.enums import StatusEnum
 
 
 def test_test_not_found(client: TestClient):
@@ -25,6 +27,61 @@ def test_tests_get(client: TestClient, tests: list[models.Test]):
     assert data["status"] == test.status.name
 
 
+@pytest.mark.num_tests(1, status=StatusEnum.PENDING)
+def test_tests_get_conditional(
+    client: TestClient, tests: list[models.Test], auth_headers: dict[str, str]
+):
+    response = client.get(f"/tests/{tests[0].id}")
+    assert response.headers["cache-control"] == "public, no-cache"
+    etag = response.headers["etag"]
+
+    # weak comparison of the tags
+    for if_none_match in (etag, etag.removeprefix("W/"), f'W/"other", {etag}', "*"):
+        response = client.get(
+            f"/tests/{tests[0].id}", headers={"If-None-Match": if_none_match}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+
+    client.patch(
+        f"/tests/{tests[0].id}", headers=auth_headers, json={"status": "SUCCEEDED"}
+    )
+    response = client.get(f"/tests/{tests[0].id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "SUCCEEDED"
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.num_tests(5, status=StatusEnum.PENDING)
+def test_tests_list_conditional(
+    client: TestClient, tests: list[models.Test], auth_headers: dict[str, str]
+):
+    response = client.get("/tests", params={"page_size": 2})
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/tests", params={"page_size": 2}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # another page is another representation
+    response = client.get(
+        "/tests",
+        params={"page_size": 2, "page_num": 2},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    etag = client.get("/tests", params={"page_size": 5}).headers["etag"]
+    client.patch(
+        f"/tests/{tests[0].id}", headers=auth_headers, json={"status": "SUCCEEDED"}
+    )
+    response = client.get(
+        "/tests", params={"page_size": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
 @pytest.mark.num_tests(100)
 def test_tests_list(client: TestClient, tests: list[models.Test]):
     response = client.get("/tests")
@@ -36,6 +93,75 @@ def test_tests_list(client: TestClient, tests: list[models.Test]):
     assert metadata["total_records"] == len(tests)
 
 
+@pytest.mark.num_tests(25)
+@pytest.mark.parametrize(
+    ["include_total", "expected_total"],
+    [
+        ("exact", 25),
+        ("estimated", 25),
+        ("none", None),
+    ],
+)
+def test_tests_list_include_total(
+    client: TestClient,
+    tests: list[models.Test],  # noqa: ARG001 [pytest fixture that saves tests]
+    include_total: str,
+    expected_total: int | None,
+):
+    response = client.get(
+        "/tests", params={"page_size": 10, "include_total": include_total}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    metadata = response.json()["metadata"]
+    assert metadata["total_records"] == expected_total
+    assert metadata["page_size"] == 10
+    assert metadata["next_cursor"] is not None
+
+
+@pytest.mark.num_tests(25)
+def test_tests_list_with_cursor(client: TestClient, tests: list[models.Test]):
+    response = client.get("/tests", params={"page_size": 10})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    test_ids = [test["id"] for test in data["tests"]]
+
+    while next_cursor := data["metadata"]["next_cursor"]:
+        response = client.get("/tests", params={"page_size": 10, "cursor": next_cursor})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["metadata"]["total_records"] is None
+        test_ids.extend(test["id"] for test in data["tests"])
+
+    assert sorted(test_ids) == sorted(str(test.id) for test in tests)
+
+
+@pytest.mark.parametrize(
+    ["params"],
+    [
+        ({"cursor": "not-a-cursor"},),
+        ({"cursor": "WyJyZXF1ZXN0ZWRfb24iXQ=="},),
+    ],
+)
+def test_tests_list_with_invalid_cursor(client: TestClient, params: dict[str, str]):
+    response = client.get("/tests", params=params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.num_tests(11)
+def test_tests_list_cursor_for_other_sort(
+    client: TestClient,
+    tests: list[models.Test],  # noqa: ARG001 [pytest fixture that saves tests]
+):
+    response = client.get("/tests", params={"page_size": 10})
+    next_cursor = response.json()["metadata"]["next_cursor"]
+    assert next_cursor is not None
+
+    response = client.get(
+        "/tests", params={"page_size": 10, "cursor": next_cursor, "order": "desc"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.num_tests(1)
 @pytest.mark.parametrize(
     ["with_auth", "expected_status"],
@@ -61,3 +187,129 @@ def test_test_patch(
         f"/tests/{test.id}", headers=headers, json={"status": test.status.name}
     )
     assert response.status_code == expected_status
+
+
+def test_test_patch_not_found(client: TestClient, access_token: str):
+    response = client.patch(
+        f"/tests/{uuid.uuid4()}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"status": "SUCCEEDED"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.num_tests(1, status=StatusEnum.PENDING)
+def test_test_patch_of_other_worker(
+    dbsession: OrmSession,
+    tests: list[models.Test],
+    client: TestClient,
+    access_token: str,
+):
+    other_worker = models.Worker(id="other", pubkey_pkcs8="", pubkey_fingerprint="")
+    other_test = models.Test(status=StatusEnum.PENDING)
+    other_test.worker = other_worker
+    dbsession.add(other_test)
+    dbsession.flush()
+
+    response = client.patch(
+        f"/tests/{other_test.id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"status": "SUCCEEDED"},
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.patch(
+        f"/tests/{tests[0].id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"status": "SUCCEEDED", "speed": 1_000},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "SUCCEEDED"
+    assert response.json()["speed"] == 1_000
+
+
+@pytest.mark.num_tests(2, status=StatusEnum.PENDING)
+def test_tests_bulk_patch(
+    tests: list[models.Test],
+    client: TestClient,
+    access_token: str,
+):
+    missing_id = str(uuid.uuid4())
+    response = client.patch(
+        "/tests",
+        headers={
+            "Content-type": "application/json",
+            "Authorization": f"Bearer {access_token}",
+        },
+        json={
+            "tests": [
+                {"id": str(tests[0].id), "status": "SUCCEEDED", "speed": 1_000},
+                {"id": str(tests[1].id), "status": "ERRORED", "error": "timeout"},
+                {"id": missing_id, "status": "ERRORED"},
+            ]
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["tests"] == [
+        {"id": str(tests[0].id), "result": "updated"},
+        {"id": str(tests[1].id), "result": "updated"},
+        {"id": missing_id, "result": "not_found"},
+    ]
+
+    response = client.get(f"/tests/{tests[0].id}")
+    assert response.json()["status"] == "SUCCEEDED"
+    assert response.json()["speed"] == 1_000
+
+
+def test_tests_bulk_patch_without_auth(client: TestClient):
+    response = client.patch(
+        "/tests",
+        headers={"Content-type": "application/json"},
+        json={"tests": [{"id": str(uuid.uuid4()), "status": "ERRORED"}]},
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.num_tests(1, status=StatusEnum.PENDING)
+def test_tests_percentiles(
+    client: TestClient,
+    dbsession: OrmSession,
+    tests: list[models.Test],
+    db_mirror: models.Mirror,
+    access_token: str,
+):
+    tests[0].mirror = db_mirror
+    dbsession.flush()
+    response = client.patch(
+        f"/tests/{tests[0].id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"status": "SUCCEEDED", "speed": 1_000_000, "latency": 100},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    day = tests[0].requested_on.date().isoformat()
+    response = client.get(
+        "/tests/percentiles",
+        params={"since": day, "until": day, "mirror_id": db_mirror.id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["speed"]["nb_values"] == 1
+    assert data["speed"]["p50"] == pytest.approx(1_000_000, rel=0.01)
+    assert data["latency"]["p99"] == pytest.approx(100, rel=0.01)
+
+    response = client.get("/tests/percentiles", params={"country_code": "ca"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["speed"] == {
+        "nb_values": 0,
+        "p50": None,
+        "p90": None,
+        "p99": None,
+    }
+
+
+def test_tests_percentiles_invalid_window(client: TestClient):
+    response = client.get(
+        "/tests/percentiles", params={"since": "2024-06-02", "until": "2024-06-01"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
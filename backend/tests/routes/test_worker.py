@@ -1,18 +1,18 @@
+import datetime
+from collections.abc import Generator
+from contextlib import contextmanager
+
 import pytest
 from fastapi import status as status_codes
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session as OrmSession
 
+from mirrors_qa_backend.db import get_dbsession_maker, models
 from mirrors_qa_backend.db.models import Worker
 from mirrors_qa_backend.db.worker import get_worker
-
-
-@pytest.fixture
-def auth_headers(access_token: str) -> dict[str, str]:
-    return {
-        "Content-type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
+from mirrors_qa_backend.enums import StatusEnum
+from mirrors_qa_backend.main import app
+from mirrors_qa_backend.routes import worker as worker_routes
 
 
 def test_list_worker_countries(worker: Worker, client: TestClient) -> None:
@@ -30,6 +30,32 @@ def test_list_worker_countries(worker: Worker, client: TestClient) -> None:
         assert country["code"] in worker_country_codes
 
 
+def test_list_worker_countries_conditional_get(
+    worker: Worker, auth_headers: dict[str, str], client: TestClient
+) -> None:
+    response = client.get(f"/workers/{worker.id}/countries")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    response = client.get(
+        f"/workers/{worker.id}/countries", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == status_codes.HTTP_304_NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    client.put(
+        f"/workers/{worker.id}/countries",
+        headers=auth_headers,
+        json={"country_codes": ["ng"]},
+    )
+    response = client.get(
+        f"/workers/{worker.id}/countries", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == status_codes.HTTP_200_OK
+    assert response.headers["etag"] != etag
+
+
 def test_update_worker_with_non_existent_country_code(
     worker: Worker, auth_headers: dict[str, str], client: TestClient
 ):
@@ -78,3 +104,95 @@ def test_update_worker_countries(
     worker_country_codes = [country.code for country in worker.countries]
     for country in countries:
         assert country["code"] in worker_country_codes
+
+
+@pytest.mark.num_tests(5, status=StatusEnum.PENDING)
+def test_lease_tests(
+    worker: Worker,
+    tests: list[models.Test],
+    auth_headers: dict[str, str],
+    client: TestClient,
+) -> None:
+    response = client.post(f"/workers/{worker.id}/lease?n=3", headers=auth_headers)
+    assert response.status_code == status_codes.HTTP_200_OK
+
+    data = response.json()
+    assert "lease_expires_on" in data
+    assert len(data["tests"]) == 3
+    test_ids = {str(test.id) for test in tests}
+    for test in data["tests"]:
+        assert test["id"] in test_ids
+        assert "mirror_url" in test
+        assert "country_code" in test
+
+    response = client.post(f"/workers/{worker.id}/lease?n=3", headers=auth_headers)
+    assert response.status_code == status_codes.HTTP_200_OK
+    assert len(response.json()["tests"]) == 2
+
+
+def test_lease_tests_for_another_worker(
+    auth_headers: dict[str, str], client: TestClient
+) -> None:
+    response = client.post("/workers/another-worker/lease?n=3", headers=auth_headers)
+    assert response.status_code == status_codes.HTTP_401_UNAUTHORIZED
+
+
+def test_lease_tests_without_authentication(worker: Worker, client: TestClient) -> None:
+    response = client.post(f"/workers/{worker.id}/lease?n=3")
+    assert response.status_code == status_codes.HTTP_403_FORBIDDEN
+
+
+def test_lease_tests_wait_without_new_tests(
+    worker: Worker,
+    auth_headers: dict[str, str],
+    client: TestClient,
+) -> None:
+    response = client.post(
+        f"/workers/{worker.id}/lease?n=3&wait=0.5", headers=auth_headers
+    )
+    assert response.status_code == status_codes.HTTP_200_OK
+    assert response.json()["tests"] == []
+
+
+def test_lease_tests_wait_without_open_session(
+    dbsession: OrmSession,
+    worker: Worker,
+    auth_headers: dict[str, str],
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    open_sessions: list[OrmSession] = []
+
+    @contextmanager
+    def begin_session() -> Generator[OrmSession, None, None]:
+        open_sessions.append(dbsession)
+        try:
+            yield dbsession
+        finally:
+            open_sessions.pop()
+
+    class NewTestsCreated:
+        async def wait(self) -> bool:
+            assert not open_sessions
+            test = models.Test(
+                requested_on=datetime.datetime.now(),
+                status=StatusEnum.PENDING,
+                country_code="fr",
+            )
+            test.worker = worker
+            dbsession.add(test)
+            dbsession.flush()
+            return True
+
+    @contextmanager
+    def subscribe(_worker_id: str) -> Generator[NewTestsCreated, None, None]:
+        yield NewTestsCreated()
+
+    app.dependency_overrides[get_dbsession_maker] = lambda: begin_session
+    monkeypatch.setattr(worker_routes.new_tests_waiters, "subscribe", subscribe)
+
+    response = client.post(
+        f"/workers/{worker.id}/lease?n=3&wait=5", headers=auth_headers
+    )
+    assert response.status_code == status_codes.HTTP_200_OK
+    assert len(response.json()["tests"]) == 1
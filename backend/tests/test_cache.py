@@ -0,0 +1,34 @@
+import time
+
+from mirrors_qa_backend.cache import TTLCache
+
+
+def test_ttl_cache_expiry():
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0.1)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.15)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_pop_and_clear():
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
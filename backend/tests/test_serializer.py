@@ -0,0 +1,43 @@
+import datetime
+from ipaddress import IPv4Address
+
+import pytest
+from faker import Faker
+from sqlalchemy.orm import Session as OrmSession
+
+from mirrors_qa_backend import schemas
+from mirrors_qa_backend.db import models
+from mirrors_qa_backend.db.tests import list_tests
+from mirrors_qa_backend.serializer import serialize_test, serialize_tests_list
+
+
+@pytest.mark.num_tests(5)
+def test_serialize_tests_list(
+    dbsession: OrmSession, tests: list[models.Test], data_gen: Faker
+):
+    for test in tests[:3]:
+        test.started_on = datetime.datetime(2024, 6, 1, 12, 30, 15, 123456)
+        test.ip_address = IPv4Address(data_gen.ipv4())
+        test.download_size = 1_000_000
+        test.duration = 2.5
+        test.speed = 400_000
+        test.latency = 120
+        test.isp = "isp"
+        test.city = "Lagos"
+    dbsession.flush()
+
+    result = list_tests(dbsession)
+    metadata = schemas.calculate_pagination_metadata(
+        result.nb_tests or 0, page_size=20, current_page=1
+    )
+    expected = schemas.TestsList(
+        tests=[
+            serialize_test(dbsession.get_one(models.Test, (row.id, row.requested_on)))
+            for row in result.tests
+        ],
+        metadata=metadata,
+    )
+
+    assert serialize_tests_list(result.tests, metadata) == (
+        expected.model_dump_json().encode()
+    )
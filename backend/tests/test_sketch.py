@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from mirrors_qa_backend.sketch import LogHistogram
+
+
+@pytest.fixture
+def values() -> list[float]:
+    rng = random.Random(123)
+    return [rng.lognormvariate(13, 1.5) for _ in range(10_000)]
+
+
+def get_quantile(values: list[float], q: float) -> float:
+    return sorted(values)[int(q * (len(values) - 1))]
+
+
+@pytest.mark.parametrize("q", [0, 0.5, 0.9, 0.99, 1])
+def test_quantile_relative_error(values: list[float], q: float):
+    histogram = LogHistogram()
+    for value in values:
+        histogram.add(value)
+
+    assert histogram.count == len(values)
+    assert histogram.quantile(q) == pytest.approx(
+        get_quantile(values, q), rel=LogHistogram.relative_accuracy
+    )
+
+
+def test_merge(values: list[float]):
+    histograms = [LogHistogram() for _ in range(3)]
+    for index, value in enumerate(values):
+        histograms[index % len(histograms)].add(value)
+    merged = LogHistogram()
+    for histogram in histograms:
+        merged.merge(histogram)
+
+    whole = LogHistogram()
+    for value in values:
+        whole.add(value)
+    assert merged.counts == whole.counts
+
+
+def test_remove_values():
+    histogram = LogHistogram()
+    for value in (0, 10, 100, 1_000):
+        histogram.add(value)
+    histogram.add(1_000, -1)
+    histogram.add(0, -1)
+
+    assert histogram.count == 2
+    assert len(histogram.counts) == 2
+    assert histogram.quantile(1) == pytest.approx(
+        100, rel=LogHistogram.relative_accuracy
+    )
+
+
+def test_empty_histogram():
+    assert LogHistogram().quantile(0.5) is None
+
+
+def test_serialization(values: list[float]):
+    histogram = LogHistogram(zero_count=2)
+    for value in values:
+        histogram.add(value)
+    histogram.add(1, -1)
+
+    data = histogram.to_bytes()
+    deserialized = LogHistogram.from_bytes(data)
+    assert deserialized.counts == histogram.counts
+    assert deserialized.zero_count == histogram.zero_count
+    assert len(data) == 5 + 8 * len(histogram.counts)
+
+
+def test_unsupported_serialization_version():
+    with pytest.raises(ValueError, match="Unsupported version"):
+        LogHistogram.from_bytes(b"\x02" + LogHistogram().to_bytes()[1:])
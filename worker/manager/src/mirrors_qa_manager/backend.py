@@ -1,9 +1,11 @@
 import datetime
+import threading
 from dataclasses import dataclass
 from typing import Any
 
 import requests
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+from requests.adapters import HTTPAdapter
 
 from mirrors_qa_manager import logger
 from mirrors_qa_manager.cryptography import generate_auth_message
@@ -16,51 +18,125 @@ class AuthCredentials:
     expires_in: datetime.datetime
 
 
-def authenticate(private_key: RSAPrivateKey, worker_id: str) -> AuthCredentials:
-    logger.info("Authenticating with Backend API")
-    auth_message = generate_auth_message(worker_id, private_key)
-    data = query_api(
-        "/auth/authenticate",
-        "POST",
-        headers={
-            "Content-Type": "application/json",
-            "X-SSHAuth-Message": auth_message.body,
-            "X-SSHAuth-Signature": auth_message.signature,
-        },
-    )
-    return AuthCredentials(
-        access_token=data["access_token"],
-        expires_in=datetime.datetime.now()
-        + datetime.timedelta(seconds=(data["expires_in"])),
-    )
-
-
-def query_api(
-    endpoint: str,
-    method: str = "get",
-    *,
-    headers: dict[str, Any] | None = None,
-    payload: dict[str, Any] | None = None,
-) -> dict[str, Any]:
-    if endpoint.startswith("/"):
-        endpoint = endpoint[1:]
-
-    req_headers: dict[str, Any] = {}
-
-    req_headers.update(  # pyright: ignore[reportUnknownMemberType]
-        headers if headers else {}
-    )
-    url = Settings.BACKEND_API_URI
-    if endpoint:
-        url = f"{Settings.BACKEND_API_URI}/{endpoint}"
-    func = {
-        "GET": requests.get,
-        "POST": requests.post,
-        "PATCH": requests.patch,
-        "DELETE": requests.delete,
-        "PUT": requests.put,
-    }.get(method.upper(), requests.get)
-
-    resp = func(url, headers=req_headers, json=payload)
-    resp.raise_for_status()
-    return resp.json()
+class BackendClient:
+    """Client of the Backend API authenticated as a worker.
+
+    Requests go through a single keep-alive session. The access token is
+    refreshed in the background shortly before it expires so that requests
+    don't have to wait for it.
+    """
+
+    def __init__(self, worker_id: str, private_key: RSAPrivateKey) -> None:
+        self.worker_id = worker_id
+        self.private_key = private_key
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=Settings.BACKEND_API_POOL_SIZE
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self.auth_credentials: AuthCredentials | None = None
+        self._refresh_timer: threading.Timer | None = None
+
+    def authenticate(self) -> AuthCredentials:
+        """Get a new access token and schedule its refresh."""
+        logger.info("Authenticating with Backend API")
+        auth_message = generate_auth_message(self.worker_id, self.private_key)
+        data = self._request(
+            "/auth/authenticate",
+            "POST",
+            headers={
+                "Content-Type": "application/json",
+                "X-SSHAuth-Message": auth_message.body,
+                "X-SSHAuth-Signature": auth_message.signature,
+            },
+        )
+        auth_credentials = AuthCredentials(
+            access_token=data["access_token"],
+            expires_in=datetime.datetime.now()
+            + datetime.timedelta(seconds=(data["expires_in"])),
+        )
+        with self._lock:
+            self.auth_credentials = auth_credentials
+            self._schedule_refresh(
+                max(
+                    data["expires_in"] - Settings.TOKEN_REFRESH_MARGIN_SECONDS,
+                    0,
+                )
+            )
+        return auth_credentials
+
+    def _schedule_refresh(self, delay: float) -> None:
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        self._refresh_timer = threading.Timer(delay, self._refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh(self) -> None:
+        try:
+            self.authenticate()
+        except Exception as exc:
+            # Requests authenticate themselves once the token has expired
+            logger.error(f"error while refreshing access token: {exc!s}")
+
+    def get_access_token(self) -> str:
+        with self._lock:
+            auth_credentials = self.auth_credentials
+        if (
+            auth_credentials is None
+            or auth_credentials.expires_in <= datetime.datetime.now()
+        ):
+            auth_credentials = self.authenticate()
+        return auth_credentials.access_token
+
+    def query_api(
+        self,
+        endpoint: str,
+        method: str = "get",
+        *,
+        payload: dict[str, Any] | None = None,
+        read_timeout: float = Settings.BACKEND_API_READ_TIMEOUT_SECONDS,
+    ) -> dict[str, Any]:
+        """Query the Backend API as the worker."""
+        return self._request(
+            endpoint,
+            method,
+            headers={"Authorization": f"Bearer {self.get_access_token()}"},
+            payload=payload,
+            read_timeout=read_timeout,
+        )
+
+    def _request(
+        self,
+        endpoint: str,
+        method: str = "get",
+        *,
+        headers: dict[str, Any] | None = None,
+        payload: dict[str, Any] | None = None,
+        read_timeout: float = Settings.BACKEND_API_READ_TIMEOUT_SECONDS,
+    ) -> dict[str, Any]:
+        if endpoint.startswith("/"):
+            endpoint = endpoint[1:]
+
+        url = Settings.BACKEND_API_URI
+        if endpoint:
+            url = f"{Settings.BACKEND_API_URI}/{endpoint}"
+
+        resp = self.session.request(
+            method.upper(),
+            url,
+            headers=headers,
+            json=payload,
+            timeout=(Settings.BACKEND_API_CONNECT_TIMEOUT_SECONDS, read_timeout),
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+        self.session.close()
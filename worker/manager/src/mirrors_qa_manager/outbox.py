@@ -0,0 +1,73 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+
+class ResultsOutbox:
+    """Durable queue of test results waiting to be uploaded to the Backend API.
+
+    Results are journaled in a SQLite database so they survive failed uploads
+    and restarts of the manager. Results which fail to upload are retried with
+    an exponential backoff.
+    """
+
+    def __init__(
+        self, fpath: Path, *, retry_seconds: float, max_retry_seconds: float
+    ) -> None:
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.conn = sqlite3.connect(fpath)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS result ("
+                "test_id TEXT PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "next_attempt_on REAL NOT NULL DEFAULT 0)"
+            )
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT count(*) FROM result").fetchone()[0]
+
+    def add(self, test_id: str, payload: dict[str, Any]) -> None:
+        """Journal the results of a test, replacing any previous results."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO result (test_id, payload) VALUES (?, ?)",
+                (test_id, json.dumps(payload)),
+            )
+
+    def due(self, limit: int) -> list[tuple[str, dict[str, Any]]]:
+        """Oldest results whose next upload attempt is due."""
+        return [
+            (test_id, json.loads(payload))
+            for test_id, payload in self.conn.execute(
+                "SELECT test_id, payload FROM result WHERE next_attempt_on <= ? "
+                "ORDER BY rowid LIMIT ?",
+                (time.time(), limit),
+            )
+        ]
+
+    def remove(self, test_ids: list[str]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM result WHERE test_id = ?",
+                [(test_id,) for test_id in test_ids],
+            )
+
+    def postpone(self, test_ids: list[str]) -> None:
+        """Delay the next upload attempt of results which failed to upload."""
+        now = time.time()
+        with self.conn:
+            for test_id in test_ids:
+                (attempts,) = self.conn.execute(
+                    "SELECT attempts FROM result WHERE test_id = ?", (test_id,)
+                ).fetchone()
+                delay = min(self.retry_seconds * 2**attempts, self.max_retry_seconds)
+                self.conn.execute(
+                    "UPDATE result SET attempts = ?, next_attempt_on = ? "
+                    "WHERE test_id = ?",
+                    (attempts + 1, now + delay, test_id),
+                )
@@ -17,10 +17,36 @@ def getenv(key: str, *, mandatory: bool = False, default: Any = None) -> Any:
 class Settings:
     """Worker manager configuration"""
 
-    # number of seconds between each poll to the Backend API
-    SLEEP_SECONDS = parse_timespan(getenv("SLEEP_DURATION", default="1h"))
+    # number of seconds to sleep before retrying after an error
+    SLEEP_SECONDS = parse_timespan(getenv("SLEEP_DURATION", default="1m"))
+    # number of seconds the Backend API waits for new tests when none is pending.
+    # Must not exceed the TEST_LEASE_MAX_WAIT_DURATION of the Backend API.
+    TESTS_WAIT_SECONDS = parse_timespan(getenv("TESTS_WAIT_DURATION", default="5m"))
+    # number of tests to lease from the Backend API at once
+    TESTS_LEASE_SIZE = int(getenv("TESTS_LEASE_SIZE", default=5))
+    # number of test results to upload to the Backend API at once
+    RESULTS_BATCH_SIZE = int(getenv("RESULTS_BATCH_SIZE", default=5))
+    # number of seconds before retrying to upload results, doubled on each failure
+    RESULTS_RETRY_SECONDS = parse_timespan(
+        getenv("RESULTS_RETRY_DURATION", default="30s")
+    )
+    RESULTS_MAX_RETRY_SECONDS = parse_timespan(
+        getenv("RESULTS_MAX_RETRY_DURATION", default="1h")
+    )
     DEBUG = bool(getenv("DEBUG", default=False))
     BACKEND_API_URI = getenv("BACKEND_API_URI", mandatory=True)
+    # maximum number of connections to keep alive to the Backend API
+    BACKEND_API_POOL_SIZE = int(getenv("BACKEND_API_POOL_SIZE", default=2))
+    BACKEND_API_CONNECT_TIMEOUT_SECONDS = parse_timespan(
+        getenv("BACKEND_API_CONNECT_TIMEOUT_DURATION", default="10s")
+    )
+    BACKEND_API_READ_TIMEOUT_SECONDS = parse_timespan(
+        getenv("BACKEND_API_READ_TIMEOUT_DURATION", default="1m")
+    )
+    # number of seconds before expiry at which access tokens are refreshed
+    TOKEN_REFRESH_MARGIN_SECONDS = parse_timespan(
+        getenv("TOKEN_REFRESH_MARGIN_DURATION", default="5m")
+    )
     # in-container directory for worker manager
     WORKDIR_FPATH = Path(getenv("WORKDIR", default="/data"))
     DOCKER_SOCKET = Path(getenv("DOCKER_SOCKET", default="/var/run/docker.sock"))
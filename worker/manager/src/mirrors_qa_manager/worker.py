@@ -1,5 +1,4 @@
 # pyright: strict, reportMissingTypeStubs=false, reportUnknownMemberType=false, reportOptionalSubscript=false, reportUnknownVariableType=false, reportUnknownArgumentType=false
-import datetime
 import json
 import random
 import re
@@ -20,8 +19,7 @@ from docker.models.containers import Container, ExecResult
 from docker.types import Mount
 
 from mirrors_qa_manager import logger
-from mirrors_qa_manager.backend import AuthCredentials, authenticate
-from mirrors_qa_manager.backend import query_api as query_backend_api
+from mirrors_qa_manager.backend import BackendClient
 from mirrors_qa_manager.cryptography import load_private_key_from_path
 from mirrors_qa_manager.docker import (
     exec_command,
@@ -30,6 +28,7 @@ from mirrors_qa_manager.docker import (
     remove_container,
     run_container,
 )
+from mirrors_qa_manager.outbox import ResultsOutbox
 from mirrors_qa_manager.settings import Settings
 
 
@@ -88,6 +87,14 @@ class WorkerManager:
         self.instance_dir = self.base_dir / worker_id
         self.instance_dir.mkdir(exist_ok=True)
 
+        # Results are journaled before being uploaded so that they are not lost
+        # if the Backend API can't be reached.
+        self.outbox = ResultsOutbox(
+            self.instance_dir / "outbox.sqlite",
+            retry_seconds=Settings.RESULTS_RETRY_SECONDS,
+            max_retry_seconds=Settings.RESULTS_MAX_RETRY_SECONDS,
+        )
+
         self.private_key = load_private_key_from_path(Settings.PRIVATE_KEY_FPATH)
         self.docker = get_docker_client()
 
@@ -127,7 +134,7 @@ class WorkerManager:
         self.task_container_names = set()
         # location of the test file on the from the mirror's root
 
-        self.auth_credentials: None | AuthCredentials = None
+        self.backend = BackendClient(self.worker_id, self.private_key)
 
         # register exit signals
         self.register_signals()
@@ -286,21 +293,10 @@ class WorkerManager:
         method: str = "get",
         *,
         payload: dict[str, Any] | None = None,
+        read_timeout: float = Settings.BACKEND_API_READ_TIMEOUT_SECONDS,
     ) -> dict[str, Any]:
-        if self.auth_credentials is None:
-            self.auth_credentials = authenticate(self.private_key, self.worker_id)
-
-        if self.auth_credentials.expires_in <= datetime.datetime.now():
-            self.auth_credentials = authenticate(self.private_key, self.worker_id)
-
-        req_headers = {
-            "Authorization": f"Bearer {self.auth_credentials.access_token}",
-        }
-        return query_backend_api(
-            endpoint,
-            method,
-            headers=req_headers,
-            payload=payload,
+        return self.backend.query_api(
+            endpoint, method, payload=payload, read_timeout=read_timeout
         )
 
     def merge_data(
@@ -313,6 +309,36 @@ class WorkerManager:
             "isp": ip_data["organization"],
         }
 
+    def upload_results(self) -> None:
+        """Upload the results from the outbox whose upload is due, in batches."""
+        while results := self.outbox.due(Settings.RESULTS_BATCH_SIZE):
+            test_ids = [test_id for test_id, _ in results]
+            logger.info(f"Uploading results of {len(results)} test(s) to Backend API")
+            try:
+                data = self.query_api(
+                    "/tests",
+                    method="patch",
+                    payload={
+                        "tests": [
+                            {**payload, "id": test_id} for test_id, payload in results
+                        ]
+                    },
+                )
+            except Exception as exc:
+                logger.error(f"error while uploading results to Backend API: {exc!s}")
+                self.outbox.postpone(test_ids)
+                return
+
+            for test in data["tests"]:
+                if test["result"] != "updated":
+                    logger.warning(
+                        f"Results of test {test['id']} were rejected by Backend API: "
+                        f"{test['result']}"
+                    )
+            # Rejected results would be rejected again, no need to retry them.
+            self.outbox.remove(test_ids)
+            logger.info(f"Uploaded results of {len(results)} test(s) to Backend API")
+
     def update_countries_list(self):
         """Update the list of countries from config files if there are any."""
         country_codes = self.get_country_codes_from_config_files()
@@ -335,28 +361,32 @@ class WorkerManager:
         )
 
     def fetch_tests(self) -> Generator[dict[str, str], None, None]:
-        logger.debug("Fetching tasks from backend API")
-        # Fetch tasks that were assigned to the worker that haven't been expired
-        params = urlencode({"worker_id": self.worker_id, "status": "PENDING"})
+        logger.debug("Leasing tasks from backend API")
+        # Tests are leased in small batches so that the backend does not hand
+        # them out again while they are being run. Leases of tests which are
+        # not reported in time are released and the tests become pending again.
+        # If no test is pending, the first request waits for the scheduler to
+        # create new ones.
+        params = {"n": Settings.TESTS_LEASE_SIZE, "wait": Settings.TESTS_WAIT_SECONDS}
         while True:
-            data = self.query_api(f"/tests?{params}")
-            nb_tests = data["metadata"]["page_size"]
-            if nb_tests == 0:  # No more pending tests to fetch
+            data = self.query_api(
+                f"/workers/{self.worker_id}/lease?{urlencode(params)}",
+                method="post",
+                # the Backend API holds the request while waiting for new tests
+                read_timeout=Settings.BACKEND_API_READ_TIMEOUT_SECONDS + params["wait"],
+            )
+            nb_tests = len(data["tests"])
+            if nb_tests == 0:  # No more pending tests to lease
                 break
 
-            logger.info(f"Fetched {nb_tests} test(s) from Backend API")
-
-            current_page = data["metadata"]["current_page"]
-            last_page = data["metadata"]["last_page"]
-
-            logger.debug(
-                f"Fetched page {current_page} of {last_page} of pending tests."
+            logger.info(
+                f"Leased {nb_tests} test(s) from Backend API until "
+                f"{data['lease_expires_on']}"
             )
 
             yield from data["tests"]
-
-            if current_page == last_page:
-                break
+            # Only wait for new tests before the first batch
+            params["wait"] = 0
 
     def sleep(self) -> None:
         logger.info(f"Sleeping for {Settings.SLEEP_SECONDS}s")
@@ -486,23 +516,16 @@ class WorkerManager:
                         ip_data=ip_data,
                         metrics_data=json.loads(results),
                     )
-                    logger.info(f"Uploading results for {test_id} to Backend API")
-                    try:
-                        self.query_api(
-                            f"/tests/{test_id}", method="patch", payload=payload
-                        )
-                    except Exception as exc:
-                        logger.error(
-                            f"error while uploading results to Backend API: {exc!s}"
-                        )
-                        continue
-                    finally:
-                        output_fpath.unlink()
-                    logger.info(f"Uploaded results for {test_id} to Backend API")
+                    self.outbox.add(test_id, payload)
+                    output_fpath.unlink()
+                    if len(self.outbox) >= Settings.RESULTS_BATCH_SIZE:
+                        self.upload_results()
+
+                # Upload what is left before waiting for new tests
+                self.upload_results()
             except Exception as exc:
                 logger.error(f"error while processing tasks {exc!s}")
-
-            self.sleep()
+                self.sleep()
 
     def remove_container(
         self, container_name: str, *, force: bool = True, not_found_ok: bool = True
@@ -525,6 +548,7 @@ class WorkerManager:
 
         logger.info("Closing Docker client.")
         self.docker.close()
+        self.backend.close()
 
         sys.exit(exit_code)
 